@@ -0,0 +1,287 @@
+"""Офлайн-бенчмарки парсера и загрузки в БД.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.run --scale 10000 100000
+    python -m benchmarks.run --db bench_db --scale 10000
+    python -m benchmarks.run --compare benchmarks/results/<прошлый>.json
+
+Бенчмарк БД очищает таблицы вакансий, поэтому запускается только на
+отдельной одноразовой базе (например, `docker run --rm -p 55432:5432
+-e POSTGRES_PASSWORD=bench -e POSTGRES_DB=bench_db postgres:16-alpine`
+и DB_PORT=55432).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks import FIXTURES_DIR, RESULTS_DIR
+from benchmarks.stub_server import StubHHServer
+from benchmarks.synthetic import SyntheticVacancies
+
+from config import DB_CONFIG, HH_API_CONFIG, INGEST_CONFIG, SCHEMA_FILE
+from parser import HHParser
+from rate_limiter import TokenBucket
+from columnar import normalize_page
+from records import decode_vacancies_page, loads
+
+logger = logging.getLogger('benchmarks')
+
+# Бенчмарки не должны упираться в ограничение скорости
+UNLIMITED = TokenBucket(1e9, 1e9)
+
+# Относительное падение метрики, которое считается регрессией
+REGRESSION_THRESHOLD = 0.10
+
+
+def bench_normalize(total: int) -> Dict:
+    """Скорость HHParser.normalize_vacancy (генерация вакансий не учитывается)"""
+    parser = HHParser(rate_limiter=UNLIMITED)
+    synthetic = SyntheticVacancies(total)
+    per_page = HH_API_CONFIG['per_page']
+    elapsed = 0.0
+    for offset in range(0, total, per_page):
+        items = synthetic.items(offset, per_page)
+        started = time.perf_counter()
+        for item in items:
+            parser.normalize_vacancy(item)
+        elapsed += time.perf_counter() - started
+    return {'items': total, 'seconds': round(elapsed, 3), 'items_per_sec': round(total / elapsed, 1)}
+
+
+def bench_decode(total: int) -> Dict:
+    """JSON страницы -> записи: json + normalize_vacancy против records и columnar"""
+    parser = HHParser(rate_limiter=UNLIMITED, decoder='dict')
+    synthetic = SyntheticVacancies(total)
+    per_page = HH_API_CONFIG['per_page']
+    pages = [
+        json.dumps(synthetic.page(0, page, per_page, total), ensure_ascii=False).encode('utf-8')
+        for page in range((total + per_page - 1) // per_page)
+    ]
+
+    started = time.perf_counter()
+    for raw in pages:
+        for item in json.loads(raw)['items']:
+            parser.normalize_vacancy(item)
+    dict_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for raw in pages:
+        decode_vacancies_page(raw, parser.parsed_at)
+    records_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for raw in pages:
+        normalize_page(loads(raw)['items'], parser.parsed_at)
+    columnar_seconds = time.perf_counter() - started
+
+    return {
+        'items': total,
+        'dict': {'seconds': round(dict_seconds, 3), 'items_per_sec': round(total / dict_seconds, 1)},
+        'records': {'seconds': round(records_seconds, 3), 'items_per_sec': round(total / records_seconds, 1)},
+        'columnar': {'seconds': round(columnar_seconds, 3), 'items_per_sec': round(total / columnar_seconds, 1)},
+        'speedup': round(dict_seconds / records_seconds, 2),
+        'columnar_speedup': round(dict_seconds / columnar_seconds, 2)
+    }
+
+
+def bench_crawl(total: int, mode: str = 'sync', latency: float = 0.0) -> Dict:
+    """Сквозной обход через локальный stub-сервер"""
+    limit = HH_API_CONFIG['max_pages'] * HH_API_CONFIG['per_page']
+    searches = [{'area': [str(area)]} for area in range((total + limit - 1) // limit)]
+
+    with StubHHServer(total=total, per_search=limit, latency=latency) as stub:
+        if mode == 'async':
+            from async_parser import AsyncHHParser
+            parser = AsyncHHParser(rate_limiter=UNLIMITED)
+        else:
+            parser = HHParser(rate_limiter=UNLIMITED)
+        parser.base_url = stub.url
+
+        started = time.perf_counter()
+        items = sum(1 for _ in parser.parse_all_vacancies(searches))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'mode': mode,
+        'latency': latency,
+        'items': items,
+        'requests': stub.requests,
+        'seconds': round(elapsed, 3),
+        'items_per_sec': round(items / elapsed, 1),
+        'requests_per_sec': round(stub.requests / elapsed, 1)
+    }
+
+
+def bench_db(total: int, batch_size: int) -> Dict:
+    """Скорость Database.ingest_batch на одноразовой базе"""
+    from database import Database
+
+    with StubHHServer(total=0) as stub:
+        parser = HHParser(rate_limiter=UNLIMITED)
+        parser.base_url = stub.url
+        areas = parser.fetch_areas()
+        categories, roles = parser.fetch_professional_roles()
+
+    synthetic = SyntheticVacancies(total)
+    with Database() as db:
+        db.execute_script(SCHEMA_FILE)
+        with db.connection() as conn:
+            with conn.cursor() as cur:
+                # Все таблицы, которые пишет ingest_batch, иначе прогоны не сравнимы
+                cur.execute("""
+                    TRUNCATE vacancy_professional_roles, vacancies, vacancy_content_hashes,
+                        vacancy_current_professional_roles, vacancies_current,
+                        salary_rollups, salary_rollup_buckets,
+                        vacancy_key_skills, vacancy_details,
+                        crawl_checkpoints, crawl_runs, employers
+                """)
+            conn.commit()
+        db.upsert_areas(areas)
+        db.upsert_professional_roles(categories, roles)
+
+        inserted = 0
+        elapsed = 0.0
+        batches = []
+        for offset in range(0, total, batch_size):
+            records = [parser.normalize_vacancy(item) for item in synthetic.items(offset, batch_size)]
+            started = time.perf_counter()
+            stats = db.ingest_batch(records)
+            batch_seconds = time.perf_counter() - started
+            elapsed += batch_seconds
+            batches.append(batch_seconds)
+            inserted += stats['vacancies_inserted']
+
+    batches.sort()
+    return {
+        'rows': inserted,
+        'batch_size': batch_size,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(inserted / elapsed, 1) if elapsed else 0.0,
+        'batch_p50_seconds': round(batches[len(batches) // 2], 4) if batches else 0.0,
+        'batch_max_seconds': round(batches[-1], 4) if batches else 0.0
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    """Сводит вложенные результаты к {'normalize.10000.items_per_sec': ...}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and name.endswith('_per_sec'):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict, baseline_path: str) -> List[str]:
+    """Сравнивает метрики пропускной способности с прошлым запуском"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = flatten(baseline['results'])
+    new = flatten(current['results'])
+    regressions = []
+    for name in sorted(set(old) & set(new)):
+        change = (new[name] - old[name]) / old[name] if old[name] else 0.0
+        marker = ''
+        if change < -REGRESSION_THRESHOLD:
+            marker = '  <-- регрессия'
+            regressions.append(name)
+        print(f"{name:60} {old[name]:>14.1f} -> {new[name]:>14.1f} ({change:+.1%}){marker}")
+    return regressions
+
+
+def record_fixtures() -> None:
+    """Перезаписывает fixtures свежими ответами api.hh.ru"""
+    parser = HHParser()
+    for name, endpoint, params in (
+        ('areas', HH_API_CONFIG['areas_endpoint'], None),
+        ('professional_roles', HH_API_CONFIG['professional_roles_endpoint'], None),
+        ('vacancies', HH_API_CONFIG['vacancies_endpoint'], {'area': '113', 'per_page': 20}),
+    ):
+        data = parser._make_request(endpoint, params)
+        if not data:
+            raise RuntimeError(f"Не удалось записать {name}")
+        with open(os.path.join(FIXTURES_DIR, f'{name}.json'), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        logger.info(f"Записан {name}.json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Офлайн-бенчмарки HH парсера')
+    parser.add_argument('--scale', type=int, nargs='+', default=[10_000, 100_000],
+                        help='Количество синтетических вакансий')
+    parser.add_argument('--crawl-modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа stub-сервера, с')
+    parser.add_argument('--db', metavar='DBNAME', help='Одноразовая база для бенчмарка загрузки')
+    parser.add_argument('--batch-size', type=int, default=INGEST_CONFIG['batch_size'])
+    parser.add_argument('--output', help='Файл результатов (по умолчанию benchmarks/results/)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Сравнить с прошлым файлом результатов')
+    parser.add_argument('--record', action='store_true', help='Записать fixtures с api.hh.ru и выйти')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    if args.record:
+        record_fixtures()
+        return 0
+
+    results: Dict[str, Dict] = {'normalize': {}, 'decode': {}, 'crawl': {}, 'db': {}}
+    for total in args.scale:
+        logger.info(f"normalize_vacancy: {total} вакансий")
+        results['normalize'][str(total)] = bench_normalize(total)
+        logger.info(f"Декодирование страниц: {total} вакансий")
+        results['decode'][str(total)] = bench_decode(total)
+        for mode in args.crawl_modes:
+            logger.info(f"Обход ({mode}): {total} вакансий")
+            results['crawl'][f"{mode}.{total}"] = bench_crawl(total, mode, args.latency)
+        if args.db:
+            DB_CONFIG['dbname'] = args.db
+            logger.info(f"Загрузка в БД {args.db}: {total} вакансий")
+            results['db'][str(total)] = bench_db(total, args.batch_size)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    logger.info(f"Результаты сохранены в {output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare)
+        if regressions:
+            logger.warning(f"Регрессии: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
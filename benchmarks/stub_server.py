@@ -0,0 +1,98 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import SyntheticVacancies, load_fixture
+
+logger = logging.getLogger(__name__)
+
+
+class StubHHServer:
+    """Локальный HTTP-сервер, отдающий записанные и синтетические ответы HH API.
+
+    /areas и /professional_roles отдаются из fixtures как есть. Для /vacancies
+    каждый регион из параметра area получает свой блок из `per_search`
+    синтетических вакансий, так что поиски по разным регионам не пересекаются.
+    """
+
+    def __init__(
+        self,
+        total: int = 2000,
+        per_search: int = 2000,
+        latency: float = 0.0,
+        host: str = '127.0.0.1',
+        port: int = 0
+    ):
+        self.vacancies = SyntheticVacancies(total)
+        self.per_search = per_search
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._areas = json.dumps(load_fixture('areas'), ensure_ascii=False).encode('utf-8')
+        self._roles = json.dumps(load_fixture('professional_roles'), ensure_ascii=False).encode('utf-8')
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _vacancies(self, query: dict) -> bytes:
+        page = int(query.get('page', ['0'])[0])
+        per_page = int(query.get('per_page', ['20'])[0])
+        area = int(query.get('area', ['0'])[0])
+        offset = (area * self.per_search) % max(self.vacancies.total, 1)
+        found = max(0, min(self.per_search, self.vacancies.total - offset))
+        data = self.vacancies.page(offset, page, per_page, found)
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                if url.path == '/areas':
+                    body = stub._areas
+                elif url.path == '/professional_roles':
+                    body = stub._roles
+                elif url.path == '/vacancies':
+                    body = stub._vacancies(parse_qs(url.query))
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> 'StubHHServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-hh', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
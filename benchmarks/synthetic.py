@@ -0,0 +1,62 @@
+import json
+import os
+from typing import Dict, List
+
+from benchmarks import FIXTURES_DIR
+
+
+def load_fixture(name: str):
+    """Загружает записанный ответ API из benchmarks/fixtures"""
+    with open(os.path.join(FIXTURES_DIR, f'{name}.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SyntheticVacancies:
+    """Масштабирует записанную страницу /vacancies до произвольного объёма.
+
+    Вакансии строятся на лету из шаблонов fixtures/vacancies.json: у каждой
+    уникальный id, а работодатель и зарплата варьируются, поэтому даже
+    миллион вакансий не требует держать их в памяти.
+    """
+
+    BASE_ID = 200_000_000
+    BASE_EMPLOYER_ID = 10_000_000
+
+    def __init__(self, total: int, employers: int = 5000):
+        self.total = total
+        self.employers = employers
+        self._templates = [
+            json.dumps(item, ensure_ascii=False)
+            for item in load_fixture('vacancies')['items']
+        ]
+
+    def item(self, index: int) -> Dict:
+        vacancy = json.loads(self._templates[index % len(self._templates)])
+        vacancy['id'] = str(self.BASE_ID + index)
+        employer = vacancy.get('employer')
+        if employer:
+            employer['id'] = str(self.BASE_EMPLOYER_ID + index % self.employers)
+        for key in ('salary', 'salary_range'):
+            salary = vacancy.get(key)
+            if salary:
+                factor = 1 + (index % 50) / 100
+                for bound in ('from', 'to'):
+                    if salary.get(bound):
+                        salary[bound] = int(salary[bound] * factor)
+        return vacancy
+
+    def items(self, offset: int, count: int) -> List[Dict]:
+        end = min(self.total, offset + count)
+        return [self.item(index) for index in range(offset, end)]
+
+    def page(self, offset: int, page: int, per_page: int, found: int) -> Dict:
+        """Страница в формате ответа /vacancies"""
+        start = offset + page * per_page
+        count = max(0, min(per_page, found - page * per_page))
+        return {
+            'items': self.items(start, count),
+            'found': found,
+            'pages': (found + per_page - 1) // per_page,
+            'page': page,
+            'per_page': per_page
+        }
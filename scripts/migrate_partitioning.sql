@@ -0,0 +1,21 @@
+-- scripts/migrate_partitioning.sql
+-- Подготовка существующей БД к переходу на партиционированные vacancies.
+-- Старые таблицы переименовываются, после чего Database.migrate_to_partitioned()
+-- выполняет schema.sql, создаёт партиции под имеющиеся данные и переносит их.
+SET search_path TO headhunter, public;
+
+ALTER TABLE headhunter.vacancy_professional_roles RENAME TO vacancy_professional_roles_unpartitioned;
+ALTER TABLE headhunter.vacancy_professional_roles_unpartitioned
+    RENAME CONSTRAINT vacancy_professional_roles_pkey TO vacancy_professional_roles_unpartitioned_pkey;
+
+ALTER TABLE headhunter.vacancies RENAME TO vacancies_unpartitioned;
+ALTER TABLE headhunter.vacancies_unpartitioned
+    RENAME CONSTRAINT vacancies_pkey TO vacancies_unpartitioned_pkey;
+
+-- Имена индексов должны освободиться для новых таблиц
+DROP INDEX IF EXISTS headhunter.idx_vacancies_area;
+DROP INDEX IF EXISTS headhunter.idx_vacancies_employer;
+DROP INDEX IF EXISTS headhunter.idx_vacancies_archived;
+DROP INDEX IF EXISTS headhunter.idx_vacancies_published;
+DROP INDEX IF EXISTS headhunter.idx_vacancies_parsed;
+DROP INDEX IF EXISTS headhunter.idx_vacancies_salary_from;
@@ -32,6 +32,16 @@ CREATE TABLE IF NOT EXISTS headhunter.areas (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Таблица замыкания иерархии регионов: все пары (предок, потомок), включая
+-- (id, id, 0). Пересобирается при загрузке справочников (см. areas.py), поэтому
+-- фильтр по поддереву - индексное равенство вместо рекурсии по parent_id
+CREATE TABLE IF NOT EXISTS headhunter.area_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
 -- Таблица работодателей
 CREATE TABLE IF NOT EXISTS headhunter.employers (
     id INTEGER PRIMARY KEY,
@@ -49,7 +59,7 @@ CREATE TABLE IF NOT EXISTS headhunter.employers (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Основная таблица вакансий
+-- Основная таблица вакансий (история снимков, помесячные партиции по parsed_at)
 CREATE TABLE IF NOT EXISTS headhunter.vacancies (
     id BIGINT,
     published_at TIMESTAMP NOT NULL,
@@ -114,7 +124,7 @@ CREATE TABLE IF NOT EXISTS headhunter.vacancies (
     work_format TEXT,
     
     PRIMARY KEY (id, published_at, created_at, parsed_at)
-);
+) PARTITION BY RANGE (parsed_at);
 
 -- Связующая таблица для professional_roles (many-to-many)
 CREATE TABLE IF NOT EXISTS headhunter.vacancy_professional_roles (
@@ -126,6 +136,209 @@ CREATE TABLE IF NOT EXISTS headhunter.vacancy_professional_roles (
     PRIMARY KEY (vacancy_id, vacancy_published_at, vacancy_created_at, vacancy_parsed_at, professional_role_id),
     FOREIGN KEY (vacancy_id, vacancy_published_at, vacancy_created_at, vacancy_parsed_at) 
         REFERENCES headhunter.vacancies(id, published_at, created_at, parsed_at) ON DELETE CASCADE
+) PARTITION BY RANGE (vacancy_parsed_at);
+
+-- Создание помесячных партиций vacancies и vacancy_professional_roles.
+-- Партиция называется <таблица>_yYYYYmMM и покрывает [начало месяца, начало следующего)
+CREATE OR REPLACE FUNCTION headhunter.create_vacancy_partitions(p_from DATE, p_months INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_from)::date;
+    month_end DATE;
+    suffix TEXT;
+    parent TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN 1..p_months LOOP
+        month_end := (month_start + INTERVAL '1 month')::date;
+        suffix := to_char(month_start, '"y"YYYY"m"MM');
+        FOREACH parent IN ARRAY ARRAY['vacancies', 'vacancy_professional_roles'] LOOP
+            IF to_regclass(format('headhunter.%I', parent || '_' || suffix)) IS NULL THEN
+                BEGIN
+                    EXECUTE format(
+                        'CREATE TABLE headhunter.%I PARTITION OF headhunter.%I FOR VALUES FROM (%L) TO (%L)',
+                        parent || '_' || suffix, parent, month_start, month_end
+                    );
+                    created := created + 1;
+                EXCEPTION WHEN duplicate_table THEN
+                    -- Партицию параллельно создал другой процесс
+                    NULL;
+                END;
+            END IF;
+        END LOOP;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Партиции на текущий и следующий месяцы
+SELECT headhunter.create_vacancy_partitions(CURRENT_DATE, 2);
+
+-- Последний хеш содержимого каждой вакансии.
+-- Полная версия в vacancies пишется только при изменении хеша,
+-- иначе обновляется только время последнего наблюдения.
+CREATE TABLE IF NOT EXISTS headhunter.vacancy_content_hashes (
+    vacancy_id BIGINT PRIMARY KEY,
+    content_hash CHAR(40) NOT NULL,
+    last_changed_at TIMESTAMP NOT NULL,
+    last_seen_at TIMESTAMP NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1
+);
+
+-- Состояние инкрементального обхода (водяной знак по каждому поисковому запросу)
+CREATE TABLE IF NOT EXISTS headhunter.crawl_state (
+    query_key VARCHAR(64) PRIMARY KEY,
+    query_params JSONB NOT NULL,
+    watermark TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Запуски парсинга (для продолжения прерванного запуска с тем же parsed_at)
+CREATE TABLE IF NOT EXISTS headhunter.crawl_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    parsed_at TIMESTAMP NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',  -- running, finished, abandoned
+    job_name VARCHAR(100),                          -- задание из файла заданий (NULL - PARSER_CONFIG)
+    searches JSONB NOT NULL,
+    watermark JSONB,
+    incremental BOOLEAN NOT NULL DEFAULT FALSE,     -- только опубликованное после водяного знака
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Записанные страницы запуска; сдвигаются в одной транзакции с данными
+CREATE TABLE IF NOT EXISTS headhunter.crawl_checkpoints (
+    run_id BIGINT NOT NULL REFERENCES headhunter.crawl_runs(run_id) ON DELETE CASCADE,
+    search_key CHAR(40) NOT NULL,
+    page INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    items INTEGER NOT NULL DEFAULT 0,
+    committed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, search_key, page)
+);
+
+-- Состояние заданий планировщика (интервалы обновления)
+CREATE TABLE IF NOT EXISTS headhunter.crawl_jobs (
+    job_name VARCHAR(100) PRIMARY KEY,
+    last_started_at TIMESTAMP,
+    last_finished_at TIMESTAMP,
+    last_status VARCHAR(20),
+    last_stats JSONB
+);
+
+-- Последняя версия каждой вакансии (без истории) для запросов "что открыто сейчас".
+-- Обновляется в одной транзакции с vacancies; last_run_id - запуск, последним
+-- видевший вакансию, closed_at - время завершённого полного обхода того же
+-- задания, в котором вакансия не нашлась (NULL - открыта)
+CREATE TABLE IF NOT EXISTS headhunter.vacancies_current (
+    LIKE headhunter.vacancies INCLUDING DEFAULTS,
+    last_seen_at TIMESTAMP NOT NULL,
+    last_run_id BIGINT,
+    closed_at TIMESTAMP,
+    PRIMARY KEY (id)
+);
+
+-- Полнотекстовый поиск по названию (вес A) и сниппетам (вес B). Конфигурация
+-- russian стеммит русские слова, а латиницу (asciiword) - английским стеммером;
+-- HTML-теги подсветки в сниппетах парсер пропускает
+ALTER TABLE headhunter.vacancies_current ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', COALESCE(name, '')), 'A') ||
+        setweight(to_tsvector('russian',
+            COALESCE(snippet_requirement, '') || ' ' || COALESCE(snippet_responsibility, '')
+        ), 'B')
+    ) STORED;
+
+-- Профессиональные роли текущих версий
+CREATE TABLE IF NOT EXISTS headhunter.vacancy_current_professional_roles (
+    vacancy_id BIGINT REFERENCES headhunter.vacancies_current(id) ON DELETE CASCADE,
+    professional_role_id INTEGER REFERENCES headhunter.professional_roles(id),
+    PRIMARY KEY (vacancy_id, professional_role_id)
+);
+
+-- Первичное заполнение из истории (выполняется, только пока таблица пуста)
+INSERT INTO headhunter.vacancies_current
+SELECT DISTINCT ON (v.id) v.*, COALESCE(h.last_seen_at, v.parsed_at), NULL::BIGINT, NULL::TIMESTAMP
+FROM headhunter.vacancies v
+LEFT JOIN headhunter.vacancy_content_hashes h ON h.vacancy_id = v.id
+WHERE NOT EXISTS (SELECT 1 FROM headhunter.vacancies_current)
+ORDER BY v.id, v.parsed_at DESC;
+
+INSERT INTO headhunter.vacancy_current_professional_roles (vacancy_id, professional_role_id)
+SELECT DISTINCT r.vacancy_id, r.professional_role_id
+FROM headhunter.vacancy_professional_roles r
+JOIN headhunter.vacancies_current c ON c.id = r.vacancy_id AND c.parsed_at = r.vacancy_parsed_at
+WHERE NOT EXISTS (SELECT 1 FROM headhunter.vacancy_current_professional_roles)
+ON CONFLICT DO NOTHING;
+
+-- Сводки по текущим версиям вакансий: день публикации x регион x роль x опыт x валюта.
+-- Обновляются при каждой загрузке (старая версия вычитается, новая прибавляется),
+-- поэтому хранят только аддитивные агрегаты. Вакансия без ролей попадает в роль 0,
+-- без зарплаты - в валюту ''
+CREATE TABLE IF NOT EXISTS headhunter.salary_rollups (
+    day DATE NOT NULL,
+    area_id INTEGER NOT NULL,
+    professional_role_id INTEGER NOT NULL,
+    experience_id VARCHAR(50) NOT NULL,
+    currency VARCHAR(10) NOT NULL,
+    vacancies INTEGER NOT NULL DEFAULT 0,
+    salary_from_count INTEGER NOT NULL DEFAULT 0,
+    salary_from_sum BIGINT NOT NULL DEFAULT 0,
+    salary_to_count INTEGER NOT NULL DEFAULT 0,
+    salary_to_sum BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (day, area_id, professional_role_id, experience_id, currency)
+);
+
+-- Скетч квантилей зарплат: число значений в логарифмических корзинах
+-- (корзина i покрывает (gamma^(i-1), gamma^i], см. rollups.py); скетчи складываются
+CREATE TABLE IF NOT EXISTS headhunter.salary_rollup_buckets (
+    day DATE NOT NULL,
+    area_id INTEGER NOT NULL,
+    professional_role_id INTEGER NOT NULL,
+    experience_id VARCHAR(50) NOT NULL,
+    currency VARCHAR(10) NOT NULL,
+    field VARCHAR(4) NOT NULL,  -- from, to
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, area_id, professional_role_id, experience_id, currency, field, bucket)
+);
+
+-- Полные карточки вакансий (/vacancies/{id}): то, чего нет в выдаче поиска.
+-- content_hash - хеш версии из поиска, для которой загружена карточка: при его
+-- изменении карточка запрашивается снова (не чаще DETAILS_CONFIG['freshness_hours']).
+-- status: 200 - карточка получена, 404 - вакансия удалена или скрыта
+CREATE TABLE IF NOT EXISTS headhunter.vacancy_details (
+    vacancy_id BIGINT PRIMARY KEY,
+    content_hash CHAR(40),
+    status SMALLINT NOT NULL,
+    description TEXT,
+    branded_description TEXT,
+    contacts JSONB,
+    languages JSONB,
+    driver_license_types TEXT,
+    billing_type_id VARCHAR(50),
+    code VARCHAR(255),
+    allow_messages BOOLEAN,
+    archived BOOLEAN,
+    fetched_at TIMESTAMP NOT NULL
+);
+
+-- Ключевые навыки из карточек (заменяются целиком при каждой загрузке карточки)
+CREATE TABLE IF NOT EXISTS headhunter.vacancy_key_skills (
+    vacancy_id BIGINT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    PRIMARY KEY (vacancy_id, name)
+);
+
+-- Снимки (parsed_at), уже выгруженные в Parquet (export.py)
+CREATE TABLE IF NOT EXISTS headhunter.export_snapshots (
+    parsed_at TIMESTAMP PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Индексы для оптимизации запросов
@@ -134,8 +347,19 @@ CREATE INDEX IF NOT EXISTS idx_vacancies_employer ON headhunter.vacancies(employ
 CREATE INDEX IF NOT EXISTS idx_vacancies_archived ON headhunter.vacancies(archived);
 CREATE INDEX IF NOT EXISTS idx_vacancies_published ON headhunter.vacancies(published_at DESC);
 CREATE INDEX IF NOT EXISTS idx_vacancies_parsed ON headhunter.vacancies(parsed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_crawl_runs_status ON headhunter.crawl_runs(status, started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_vacancies_salary_from ON headhunter.vacancies(salary_from) WHERE salary_from IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_employers_name ON headhunter.employers(name);
 CREATE INDEX IF NOT EXISTS idx_areas_name ON headhunter.areas(name);
 CREATE INDEX IF NOT EXISTS idx_areas_parent ON headhunter.areas(parent_id);
+CREATE INDEX IF NOT EXISTS idx_area_closure_descendant ON headhunter.area_closure(descendant_id, depth);
 CREATE INDEX IF NOT EXISTS idx_areas_coordinates ON headhunter.areas(lat, lng) WHERE lat IS NOT NULL AND lng IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_vacancies_current_open ON headhunter.vacancies_current(published_at DESC) WHERE closed_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_vacancies_current_area ON headhunter.vacancies_current(area_id) WHERE closed_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_vacancies_current_employer ON headhunter.vacancies_current(employer_id);
+CREATE INDEX IF NOT EXISTS idx_vacancies_current_run ON headhunter.vacancies_current(last_run_id);
+CREATE INDEX IF NOT EXISTS idx_vacancy_current_roles_role ON headhunter.vacancy_current_professional_roles(professional_role_id);
+CREATE INDEX IF NOT EXISTS idx_salary_rollups_area ON headhunter.salary_rollups(area_id, day);
+CREATE INDEX IF NOT EXISTS idx_salary_rollups_role ON headhunter.salary_rollups(professional_role_id, day);
+CREATE INDEX IF NOT EXISTS idx_vacancy_key_skills_name ON headhunter.vacancy_key_skills(name);
+CREATE INDEX IF NOT EXISTS idx_vacancies_current_search ON headhunter.vacancies_current USING GIN (search_vector);
@@ -0,0 +1,194 @@
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import metrics
+from config import ARCHIVE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BYTES = metrics.REGISTRY.register(metrics.Counter(
+    'hh_archive_bytes_total', 'Байты сырых ответов, записанные в архив', ('kind',)
+))
+
+SEGMENT_SUFFIX = '.gz'
+INDEX_SUFFIX = '.idx'
+
+# Параметры, не входящие в ключ запроса (совпадает с parser.query_key)
+_NON_IDENTITY_PARAMS = ('page', 'per_page', 'date_from', 'date_to')
+
+
+def params_key(params: Optional[Dict]) -> Optional[str]:
+    """Ключ запроса по параметрам без пагинации и окна дат"""
+    if not params:
+        return None
+    identity = {key: value for key, value in params.items() if key not in _NON_IDENTITY_PARAMS}
+    payload = json.dumps(identity, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseArchive:
+    """Дописываемый архив сырых ответов API.
+
+    Каждый ответ сжимается отдельным gzip-членом и дописывается в текущий
+    сегмент, поэтому оборванная запись не портит предыдущие, а любой ответ
+    читается по смещению. Рядом с сегментом ведётся индекс (JSON-строки):
+    endpoint, параметры, ключ запроса, страница, время загрузки и parsed_at
+    запуска. По достижении segment_mb начинается новый сегмент.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        segment_mb: Optional[int] = None,
+        compression_level: Optional[int] = None
+    ):
+        self.directory = directory or ARCHIVE_CONFIG['dir']
+        self.segment_bytes = (segment_mb or ARCHIVE_CONFIG['segment_mb']) * 1024 * 1024
+        self.compression_level = compression_level or ARCHIVE_CONFIG['compression_level']
+        self._lock = threading.Lock()
+        self._segment = None
+        self._index = None
+        self._segment_name = None
+        self._sequence = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _rotate(self) -> None:
+        self.close()
+        self._sequence += 1
+        self._segment_name = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{self._sequence:04d}"
+        base = os.path.join(self.directory, self._segment_name)
+        self._segment = open(base + SEGMENT_SUFFIX, 'ab')
+        self._index = open(base + INDEX_SUFFIX, 'a', encoding='utf-8')
+        logger.info(f"Новый сегмент архива: {base}{SEGMENT_SUFFIX}")
+
+    def append(
+        self,
+        endpoint: str,
+        params: Optional[Dict],
+        body: bytes,
+        parsed_at: Optional[datetime] = None
+    ) -> None:
+        """Дописывает сырой ответ и строку индекса"""
+        fetched_at = datetime.now()
+        compressed = gzip.compress(body, compresslevel=self.compression_level)
+        entry = {
+            'endpoint': endpoint,
+            'params': params,
+            'query_key': params_key(params),
+            'page': (params or {}).get('page'),
+            'fetched_at': fetched_at.isoformat(),
+            'parsed_at': parsed_at.isoformat() if parsed_at else None,
+            'length': len(compressed)
+        }
+        with self._lock:
+            if self._segment is None or self._segment.tell() >= self.segment_bytes:
+                self._rotate()
+            entry['segment'] = self._segment_name
+            entry['offset'] = self._segment.tell()
+            self._segment.write(compressed)
+            self._segment.flush()
+            # Индекс пишется после данных: строка индекса всегда указывает на целую запись
+            self._index.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            self._index.flush()
+        ARCHIVE_BYTES.inc(len(body), kind='raw')
+        ARCHIVE_BYTES.inc(len(compressed), kind='compressed')
+
+    def close(self) -> None:
+        for handle in (self._segment, self._index):
+            if handle:
+                handle.close()
+        self._segment = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ArchiveReader:
+    """Чтение архива по индексам сегментов"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or ARCHIVE_CONFIG['dir']
+
+    def entries(
+        self,
+        endpoint: Optional[str] = None,
+        query_key: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Строки индекса, отфильтрованные и упорядоченные по времени загрузки"""
+        result = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*' + INDEX_SUFFIX))):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Пропущена повреждённая строка индекса {path}")
+                        continue
+                    if endpoint and entry['endpoint'] != endpoint:
+                        continue
+                    if query_key and entry['query_key'] != query_key:
+                        continue
+                    fetched_at = datetime.fromisoformat(entry['fetched_at'])
+                    if since and fetched_at < since:
+                        continue
+                    if until and fetched_at >= until:
+                        continue
+                    result.append(entry)
+        result.sort(key=lambda entry: (entry['fetched_at'], entry['segment'], entry['offset']))
+        return result
+
+    def read(self, entry: Dict) -> bytes:
+        """Сырой ответ по строке индекса"""
+        path = os.path.join(self.directory, entry['segment'] + SEGMENT_SUFFIX)
+        with open(path, 'rb') as f:
+            f.seek(entry['offset'])
+            return gzip.decompress(f.read(entry['length']))
+
+    def stream(self, entries: List[Dict]) -> Iterator[Tuple[Dict, bytes]]:
+        """Последовательно отдаёт (строка индекса, ответ), держа сегмент открытым"""
+        handle = None
+        current = None
+        try:
+            for entry in entries:
+                if entry['segment'] != current:
+                    if handle:
+                        handle.close()
+                    current = entry['segment']
+                    handle = open(os.path.join(self.directory, current + SEGMENT_SUFFIX), 'rb')
+                handle.seek(entry['offset'])
+                yield entry, gzip.decompress(handle.read(entry['length']))
+        finally:
+            if handle:
+                handle.close()
+
+    def latest(self, endpoint: str) -> Optional[bytes]:
+        """Последний сохранённый ответ endpoint (справочники)"""
+        entries = self.entries(endpoint=endpoint)
+        return self.read(entries[-1]) if entries else None
+
+
+_shared_archive: Optional[ResponseArchive] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_archive() -> Optional[ResponseArchive]:
+    """Общий для процесса архив из ARCHIVE_CONFIG (None, если выключен)"""
+    global _shared_archive
+    if not ARCHIVE_CONFIG['enabled']:
+        return None
+    with _shared_lock:
+        if _shared_archive is None:
+            _shared_archive = ResponseArchive()
+        return _shared_archive
@@ -0,0 +1,102 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class AreaTree:
+    """Дерево регионов в памяти с запросами за O(1).
+
+    Строится один раз из плоского списка (id, parent_id): для каждого узла
+    хранятся цепочка предков, глубина и интервал [enter, exit) в порядке
+    обхода в глубину. Потомки узла занимают в этом порядке непрерывный
+    отрезок, поэтому проверка "является ли предком" - два сравнения, а
+    поддерево - срез списка без рекурсии. Эти же интервалы и цепочки предков
+    дают строки таблицы замыкания area_closure.
+    """
+
+    __slots__ = ('parents', '_children', '_ancestors', '_enter', '_exit', '_order')
+
+    def __init__(self, areas: Iterable[Dict]):
+        self.parents: Dict[int, Optional[int]] = {}
+        for area in areas:
+            self.parents[int(area['id'])] = int(area['parent_id']) if area.get('parent_id') else None
+
+        self._children: Dict[Optional[int], List[int]] = {}
+        for area_id, parent_id in self.parents.items():
+            # Регион с неизвестным родителем считается корнем
+            parent = parent_id if parent_id in self.parents else None
+            self._children.setdefault(parent, []).append(area_id)
+        for children in self._children.values():
+            children.sort()
+
+        self._ancestors: Dict[int, Tuple[int, ...]] = {}
+        self._enter: Dict[int, int] = {}
+        self._exit: Dict[int, int] = {}
+        self._order: List[int] = []
+        # Итеративный обход в глубину (без ограничения глубины рекурсии)
+        stack: List[Tuple[int, Tuple[int, ...], bool]] = [
+            (root, (), False) for root in reversed(self._children.get(None, []))
+        ]
+        while stack:
+            area_id, ancestors, done = stack.pop()
+            if done:
+                self._exit[area_id] = len(self._order)
+                continue
+            self._ancestors[area_id] = ancestors
+            self._enter[area_id] = len(self._order)
+            self._order.append(area_id)
+            stack.append((area_id, ancestors, True))
+            chain = (area_id,) + ancestors
+            for child in reversed(self._children.get(area_id, [])):
+                stack.append((child, chain, False))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, area_id: int) -> bool:
+        return area_id in self._enter
+
+    def roots(self) -> List[int]:
+        return list(self._children.get(None, []))
+
+    def children(self, area_id: int) -> List[int]:
+        return list(self._children.get(area_id, []))
+
+    def depth(self, area_id: int) -> int:
+        """Глубина узла (0 - корень, например страна)"""
+        return len(self._ancestors[area_id])
+
+    def ancestors(self, area_id: int) -> Tuple[int, ...]:
+        """Предки от ближайшего к корню"""
+        return self._ancestors[area_id]
+
+    def root(self, area_id: int) -> int:
+        ancestors = self._ancestors[area_id]
+        return ancestors[-1] if ancestors else area_id
+
+    def ancestor_at(self, area_id: int, depth: int) -> Optional[int]:
+        """Предок на заданной глубине (сам узел при depth == depth(area_id))"""
+        chain = (area_id,) + self._ancestors[area_id]
+        index = len(chain) - 1 - depth
+        return chain[index] if 0 <= index < len(chain) else None
+
+    def is_ancestor(self, ancestor_id: int, area_id: int) -> bool:
+        """True, если area_id входит в поддерево ancestor_id (включая его самого)"""
+        enter = self._enter.get(ancestor_id)
+        position = self._enter.get(area_id)
+        if enter is None or position is None:
+            return False
+        return enter <= position < self._exit[ancestor_id]
+
+    def descendants(self, area_id: int, include_self: bool = True) -> List[int]:
+        """Все регионы поддерева (срез порядка обхода)"""
+        enter = self._enter[area_id]
+        return self._order[enter if include_self else enter + 1:self._exit[area_id]]
+
+    def subtree_size(self, area_id: int) -> int:
+        return self._exit[area_id] - self._enter[area_id]
+
+    def closure_rows(self) -> Iterator[Tuple[int, int, int]]:
+        """Строки area_closure: (предок, потомок, расстояние), включая (id, id, 0)"""
+        for area_id, ancestors in self._ancestors.items():
+            yield area_id, area_id, 0
+            for distance, ancestor_id in enumerate(ancestors, 1):
+                yield ancestor_id, area_id, distance
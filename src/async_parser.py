@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple
+
+import aiohttp
+
+import metrics
+from config import HH_API_CONFIG
+from dedup import SeenVacancies
+from parser import HEADERS, HHParser, build_search_params, search_key
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Маркер окончания потока в синхронном адаптере
+_DONE = object()
+
+
+class AsyncHHParser(HHParser):
+    """Асинхронный краулер поверх пула HTTP-соединений aiohttp.
+
+    Страницы и поисковые запросы загружаются конкурентно, а все обращения к
+    API проходят через общий token bucket из HH_API_CONFIG. Нормализация
+    наследуется от HHParser, поэтому на выходе те же словари, что и у
+    HHParser.parse_all_vacancies.
+    """
+
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None, concurrency: Optional[int] = None):
+        super().__init__(rate_limiter)
+        self.concurrency = concurrency or HH_API_CONFIG['concurrency']
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._http = aiohttp.ClientSession(
+            headers=HEADERS,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HH_API_CONFIG['timeout'])
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._http:
+            await self._http.close()
+            self._http = None
+
+    @staticmethod
+    def _to_query(params: Optional[Dict]) -> List[tuple]:
+        """Раскрывает списковые параметры (area=1&area=2) как это делает requests"""
+        query = []
+        for key, value in (params or {}).items():
+            if isinstance(value, (list, tuple)):
+                query.extend((key, str(item)) for item in value)
+            else:
+                query.append((key, str(value)))
+        return query
+
+    async def _make_request_async(
+        self, endpoint: str, params: Optional[Dict] = None, allow_missing: bool = False
+    ) -> Optional[Dict]:
+        """Асинхронный GET-запрос с ограничением скорости и повторами.
+
+        Разбор ответов и задержки повторов общие с HHParser._make_request
+        (_handle_response и _failed_attempt).
+        """
+        url = f"{self.base_url}{endpoint}"
+        query = self._to_query(params)
+        label = metrics.endpoint_label(endpoint)
+        attempts = HH_API_CONFIG['max_retries'] + 1
+
+        for attempt in range(attempts):
+            self.rate_limiter.check()
+            metrics.RATE_LIMIT_WAIT_SECONDS.inc(await self.rate_limiter.acquire_async())
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    async with self._http.get(url, params=query) as response:
+                        status = response.status
+                        body = await response.read()
+                        retry_after = response.headers.get('Retry-After')
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                kind = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'connection'
+                data, delay = None, self._failed_attempt(
+                    url, label, kind, time.perf_counter() - started, attempt, attempts, e
+                )
+            else:
+                data, delay = self._handle_response(
+                    endpoint, params, label, status, time.perf_counter() - started,
+                    body, retry_after, attempt, attempts, allow_missing
+                )
+
+            if delay is None:
+                return data
+            await asyncio.sleep(delay)
+            if self.stop_event.is_set():
+                return None
+
+        return None
+
+    async def fetch_vacancies_async(self, page: int = 0, search: Optional[Dict] = None) -> Optional[Dict]:
+        """Асинхронно получает страницу вакансий"""
+        params = build_search_params(page, search)
+        logger.debug(f"Загрузка страницы {page} с параметрами: {params}")
+        data = await self._make_request_async(HH_API_CONFIG['vacancies_endpoint'], params)
+        if page == 0 and data:
+            self.found[search_key(search)] = data.get('found', 0)
+        return data
+
+    async def fetch_page_async(self, page: int, search: Optional[Dict] = None) -> Optional[Dict]:
+        """Асинхронная страница поиска с возвратом сдвинутых вакансий (как HHParser.fetch_page).
+
+        Страницы поиска загружаются конкурентно, поэтому перечитываются только
+        уже полученные предыдущие страницы: ещё не запрошенные получат
+        сдвинутые вакансии сами.
+        """
+        data = await self.fetch_vacancies_async(page, search)
+        if not data or not data.get('items'):
+            return data
+        shifted = self._accept_page(search, page, data)
+        if not shifted or self.stop_event.is_set():
+            return data
+
+        recovered = []
+        pages, truncated = self._rewalk_pages(search, page)
+        for previous in pages:
+            previous_data = await self.fetch_vacancies_async(previous, search)
+            if not previous_data or not previous_data.get('items'):
+                truncated = True
+                break
+            items = self._take_shifted(search, previous_data)
+            recovered.extend(items)
+            if not items or len(recovered) >= shifted:
+                truncated = False
+                break
+        if truncated:
+            self._lost_shift(page, shifted, len(recovered))
+        data['items'] = data['items'] + recovered
+        return data
+
+    async def _crawl_search(
+        self, search: Optional[Dict], out: asyncio.Queue, done: Optional[Dict] = None
+    ) -> int:
+        """Загружает все страницы одного поиска и кладёт (поиск, страница, всего, данные) в очередь"""
+        skip = done['done'] if done else set()
+        if self.stop_event.is_set():
+            return 0
+        if 0 in skip:
+            found = None
+            pages = done['pages']
+            logger.info(f"Продолжение поиска {search or 'по умолчанию'}: записано {len(skip)} из {pages} страниц")
+        else:
+            first = await self.fetch_page_async(0, search)
+            if not first or 'items' not in first:
+                logger.warning(f"Нет данных для поиска {search}")
+                return 0
+
+            found = first.get('found', 0)
+            pages = min(first.get('pages', 1), HH_API_CONFIG['max_pages'])
+            logger.info(f"Поиск {search or 'по умолчанию'}: найдено {found}, страниц {pages}")
+            await out.put((search, 0, pages, first))
+
+        # Новые вакансии сдвигают выдачу вниз: если страниц стало больше,
+        # хвост дочитывается, как в HHParser._parse_search
+        pending: List[asyncio.Task] = []
+
+        def schedule(first: int, last: int) -> None:
+            pending.extend(
+                asyncio.ensure_future(fetch_page(page)) for page in range(first, last) if page not in skip
+            )
+
+        async def fetch_page(page: int):
+            nonlocal pages
+            if self.stop_event.is_set():
+                return
+            data = await self.fetch_page_async(page, search)
+            if not data or not data.get('items'):
+                logger.warning(f"Нет данных на странице {page}")
+                return
+            grown = min(data.get('pages', pages), HH_API_CONFIG['max_pages'])
+            if grown > pages:
+                logger.info(f"Поиск {search or 'по умолчанию'}: страниц стало {grown} вместо {pages}")
+                schedule(pages, grown)
+                pages = grown
+            await out.put((search, page, pages, data))
+
+        schedule(1, pages)
+        try:
+            while pending:
+                batch, pending[:] = list(pending), []
+                await asyncio.gather(*batch)
+        finally:
+            for task in pending:
+                task.cancel()
+        self.finish_search(search)
+        return found or 0
+
+    async def iter_pages_async(
+        self,
+        searches: Optional[List[Dict]] = None,
+        committed: Optional[Dict[str, Dict]] = None,
+        seen: Optional[SeenVacancies] = None
+    ) -> AsyncGenerator[Tuple[Optional[Dict], int, int, list], None]:
+        """Конкурентно обходит все страницы всех поисков: (поиск, страница, всего, записи).
+
+        Порядок страниц не гарантируется: они отдаются по мере загрузки.
+        Вакансии, уже попавшие в seen, отбрасываются до нормализации.
+        """
+        searches = searches or [None]
+        committed = committed or {}
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        total_parsed = 0
+
+        async def produce():
+            cancelled = False
+            try:
+                await asyncio.gather(*(
+                    self._crawl_search(search, pages, committed.get(search_key(search)))
+                    for search in searches
+                ))
+            except asyncio.CancelledError:
+                # Отменяет сам потребитель, маркер окончания ему не нужен
+                cancelled = True
+                raise
+            finally:
+                if not cancelled:
+                    await pages.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await pages.get()
+                if item is _DONE:
+                    break
+                search, page, total, data = item
+                records = self.normalize_page(data['items'], seen)
+                total_parsed += len(records)
+                yield search, page, total, records
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+        logger.info(f"Парсинг завершен. Всего обработано: {total_parsed} вакансий")
+
+    async def parse_all_vacancies_async(
+        self, searches: Optional[List[Dict]] = None
+    ) -> AsyncGenerator[Dict, None]:
+        """Конкурентно парсит все страницы всех поисков.
+
+        Порядок вакансий не гарантируется: страницы отдаются по мере загрузки.
+        """
+        async for _, _, _, records in self.iter_pages_async(searches):
+            for record in records:
+                yield record
+
+    async def _pump(
+        self,
+        searches: Optional[List[Dict]],
+        committed: Optional[Dict[str, Dict]],
+        seen: Optional[SeenVacancies],
+        out: queue.Queue
+    ) -> None:
+        async with self:
+            async for page in self.iter_pages_async(searches, committed, seen):
+                out.put(page)
+
+    def iter_pages(
+        self,
+        searches: Optional[List[Dict]] = None,
+        committed: Optional[Dict[str, Dict]] = None,
+        seen: Optional[SeenVacancies] = None
+    ) -> Generator[Tuple[Optional[Dict], int, int, list], None, None]:
+        """Синхронный адаптер: запускает event loop в отдельном потоке.
+
+        Позволяет использовать асинхронный краулер везде, где ожидается
+        HHParser.iter_pages или parse_all_vacancies (например, в parse_vacancies).
+        """
+        out: queue.Queue = queue.Queue(maxsize=self.concurrency * 2)
+        errors: List[BaseException] = []
+        loop = asyncio.new_event_loop()
+        pump = loop.create_task(self._pump(searches, committed, seen, out))
+
+        def run():
+            try:
+                loop.run_until_complete(pump)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+                out.put(_DONE)
+
+        worker = threading.Thread(target=run, name='hh-async-crawler', daemon=True)
+        worker.start()
+        finished = False
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                yield item
+        finally:
+            if not finished:
+                # Потребитель остановился раньше: обход отменяется, а очередь
+                # вычерпывается, чтобы поток не завис на заполненной очереди
+                try:
+                    loop.call_soon_threadsafe(pump.cancel)
+                except RuntimeError:
+                    # Цикл уже завершён, поток лишь дописывает маркер окончания
+                    pass
+                while out.get() is not _DONE:
+                    pass
+            worker.join()
+        if errors:
+            raise errors[0]
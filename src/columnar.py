@@ -0,0 +1,233 @@
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from records import (
+    EMPLOYER_FIELDS, VACANCY_FIELDS, EmployerRecord, ParsedVacancy, VacancyRecord, record_hash
+)
+
+_EMPTY: Dict = {}
+
+# Поля верхнего уровня вакансии: колонка -> (ключ в ответе API, значение по умолчанию)
+_TOP_LEVEL = {
+    'premium': ('premium', False),
+    'has_test': ('has_test', False),
+    'response_letter_required': ('response_letter_required', False),
+    'archived': ('archived', False),
+    'url': ('url', None),
+    'alternate_url': ('alternate_url', None),
+    'apply_alternate_url': ('apply_alternate_url', None),
+    'response_url': ('response_url', None),
+    'accept_temporary': ('accept_temporary', False),
+    'accept_incomplete_resumes': ('accept_incomplete_resumes', False),
+    'show_logo_in_search': ('show_logo_in_search', None),
+    'show_contacts': ('show_contacts', False),
+    'is_adv_vacancy': ('is_adv_vacancy', False),
+    'internship': ('internship', False),
+    'night_shifts': ('night_shifts', False),
+}
+
+# Поля вложенных объектов: объект -> ((колонка, ключ), ...)
+_NESTED = {
+    'type': (('vacancy_type', 'id'), ('vacancy_type_name', 'name')),
+    'schedule': (('schedule_id', 'id'), ('schedule_name', 'name')),
+    'experience': (('experience_id', 'id'), ('experience_name', 'name')),
+    'employment': (('employment_id', 'id'), ('employment_name', 'name')),
+    'employment_form': (('employment_form_id', 'id'), ('employment_form_name', 'name')),
+    'address': (
+        ('address_city', 'city'), ('address_street', 'street'), ('address_building', 'building'),
+        ('address_lat', 'lat'), ('address_lng', 'lng'), ('address_raw', 'raw'), ('address_id', 'id')
+    ),
+    'snippet': (('snippet_requirement', 'requirement'), ('snippet_responsibility', 'responsibility')),
+}
+
+# Списки словарей, которые склеиваются в строку через запятую
+_JOINED = (
+    'working_days', 'working_time_intervals', 'working_time_modes', 'working_hours',
+    'work_schedule_by_days', 'fly_in_fly_out_duration', 'work_format'
+)
+
+_EMPLOYER_PLAIN = {
+    'name': None, 'url': None, 'alternate_url': None, 'vacancies_url': None,
+    'country_id': None, 'accredited_it_employer': False, 'trusted': False
+}
+
+
+def _objects(items: Sequence[Dict], key: str) -> List[Dict]:
+    return [item.get(key) or _EMPTY for item in items]
+
+
+def _ids(objects: Sequence[Dict]) -> List[Optional[int]]:
+    return [int(obj['id']) if obj.get('id') else None for obj in objects]
+
+
+def _joined(lists: Sequence) -> List[Optional[str]]:
+    return [
+        ', '.join([entry['name'] for entry in value if entry.get('name')]) if value else None
+        for value in lists
+    ]
+
+
+class VacancyBatch:
+    """Нормализованная страница (или пакет) в колоночном виде.
+
+    vacancy и employer - словари колонка -> список значений в порядке
+    VACANCY_FIELDS / EMPLOYER_FIELDS, professional_roles и content_hash -
+    списки той же длины. Значения совпадают с результатом
+    HHParser.normalize_vacancy для тех же вакансий.
+    """
+
+    __slots__ = ('vacancy', 'employer', 'professional_roles', 'content_hash')
+
+    def __init__(
+        self,
+        vacancy: Dict[str, list],
+        employer: Dict[str, list],
+        professional_roles: List[List[int]],
+        content_hash: List[str]
+    ):
+        self.vacancy = vacancy
+        self.employer = employer
+        self.professional_roles = professional_roles
+        self.content_hash = content_hash
+
+    @classmethod
+    def empty(cls) -> 'VacancyBatch':
+        return cls(
+            {name: [] for name in VACANCY_FIELDS},
+            {name: [] for name in EMPLOYER_FIELDS},
+            [], []
+        )
+
+    def __len__(self) -> int:
+        return len(self.content_hash)
+
+    def rows(self) -> Iterator[Tuple]:
+        """Строки vacancies в порядке VACANCY_FIELDS (для COPY)"""
+        return zip(*(self.vacancy[name] for name in VACANCY_FIELDS))
+
+    def employer_rows(self) -> Iterator[Tuple]:
+        return zip(*(self.employer[name] for name in EMPLOYER_FIELDS))
+
+    def __iter__(self) -> Iterator[ParsedVacancy]:
+        """Построчное представление: записи ParsedVacancy"""
+        for vacancy, employer, roles, digest in zip(
+            self.rows(), self.employer_rows(), self.professional_roles, self.content_hash
+        ):
+            yield ParsedVacancy(VacancyRecord._make(vacancy), EmployerRecord._make(employer), roles, digest)
+
+    def extend(self, other: Iterable) -> None:
+        """Дописывает другой пакет (или записи ParsedVacancy/словари normalize_vacancy)"""
+        if not isinstance(other, VacancyBatch):
+            other = VacancyBatch.from_records(other)
+        for name, values in other.vacancy.items():
+            self.vacancy[name].extend(values)
+        for name, values in other.employer.items():
+            self.employer[name].extend(values)
+        self.professional_roles.extend(other.professional_roles)
+        self.content_hash.extend(other.content_hash)
+
+    def take(self, indices: Sequence[int]) -> 'VacancyBatch':
+        """Подмножество строк по индексам"""
+        return VacancyBatch(
+            {name: [values[i] for i in indices] for name, values in self.vacancy.items()},
+            {name: [values[i] for i in indices] for name, values in self.employer.items()},
+            [self.professional_roles[i] for i in indices],
+            [self.content_hash[i] for i in indices]
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> 'VacancyBatch':
+        batch = cls.empty()
+        for record in records:
+            vacancy, employer = record['vacancy'], record['employer']
+            for name in VACANCY_FIELDS:
+                batch.vacancy[name].append(vacancy.get(name))
+            for name in EMPLOYER_FIELDS:
+                batch.employer[name].append(employer.get(name))
+            batch.professional_roles.append(record['professional_roles'])
+            batch.content_hash.append(record['content_hash'])
+        return batch
+
+    def ingest_rows(self) -> Tuple[Dict[int, EmployerRecord], List[Tuple], List[Tuple], List[Tuple], Set[datetime]]:
+        """Данные для Database.ingest_batch: работодатели, вакансии, роли, хеши, parsed_at"""
+        employers = {
+            employer[0]: EmployerRecord._make(employer)
+            for employer in self.employer_rows() if employer[0]
+        }
+        ids = self.vacancy['id']
+        published = self.vacancy['published_at']
+        created = self.vacancy['created_at']
+        parsed = self.vacancy['parsed_at']
+        roles = [
+            (ids[i], published[i], created[i], parsed[i], role_id)
+            for i, role_ids in enumerate(self.professional_roles)
+            for role_id in role_ids
+        ]
+        hashes = [
+            (vacancy_id, digest, parsed_at)
+            for vacancy_id, digest, parsed_at in zip(ids, self.content_hash, parsed)
+            if digest
+        ]
+        return employers, list(self.rows()), roles, hashes, set(parsed)
+
+
+def normalize_page(items: Sequence[Dict], parsed_at: datetime) -> VacancyBatch:
+    """Колоночная нормализация всего списка items ответа /vacancies.
+
+    Каждое правило (подстановка зарплаты, склейка списков, приведение id)
+    применяется ко всей колонке сразу. Отсутствие обязательного поля
+    (id, name, даты) приводит к KeyError для всей страницы.
+    """
+    count = len(items)
+    vacancy: Dict[str, list] = {}
+
+    vacancy['id'] = [int(item['id']) for item in items]
+    vacancy['published_at'] = [item['published_at'] for item in items]
+    vacancy['created_at'] = [item['created_at'] for item in items]
+    vacancy['parsed_at'] = [parsed_at] * count
+    vacancy['name'] = [item['name'] for item in items]
+
+    for column, (key, default) in _TOP_LEVEL.items():
+        vacancy[column] = [item.get(key, default) for item in items]
+
+    for key, columns in _NESTED.items():
+        objects = _objects(items, key)
+        for column, field in columns:
+            vacancy[column] = [obj.get(field) for obj in objects]
+
+    vacancy['area_id'] = _ids(_objects(items, 'area'))
+
+    # Зарплата: приоритет salary_range, пропущенная граница берётся из другой
+    salaries = [item.get('salary_range') or item.get('salary') or _EMPTY for item in items]
+    lower = [salary.get('from') for salary in salaries]
+    upper = [salary.get('to') for salary in salaries]
+    vacancy['salary_from'] = [low if low is not None else high for low, high in zip(lower, upper)]
+    vacancy['salary_to'] = [high if high is not None else low for low, high in zip(lower, upper)]
+    vacancy['salary_currency'] = [salary.get('currency') for salary in salaries]
+    vacancy['salary_gross'] = [salary.get('gross') for salary in salaries]
+
+    for key in _JOINED:
+        vacancy[key] = _joined([item.get(key) for item in items])
+
+    employers = _objects(items, 'employer')
+    employer: Dict[str, list] = {'id': _ids(employers)}
+    for key, default in _EMPLOYER_PLAIN.items():
+        employer[key] = [obj.get(key, default) for obj in employers]
+    logos = [obj.get('logo_urls') or _EMPTY for obj in employers]
+    employer['logo_original'] = [logo.get('original') for logo in logos]
+    employer['logo_90'] = [logo.get('90') for logo in logos]
+    employer['logo_240'] = [logo.get('240') for logo in logos]
+    vacancy['employer_id'] = list(employer['id'])
+
+    professional_roles = [
+        [int(role['id']) for role in item.get('professional_roles', []) if role and role.get('id')]
+        for item in items
+    ]
+
+    vacancy = {name: vacancy[name] for name in VACANCY_FIELDS}
+    employer = {name: employer[name] for name in EMPLOYER_FIELDS}
+    content_hash = [
+        record_hash(values, roles)
+        for values, roles in zip(zip(*vacancy.values()), professional_roles)
+    ]
+    return VacancyBatch(vacancy, employer, professional_roles, content_hash)
@@ -7,6 +7,7 @@ load_dotenv()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SCRIPTS_DIR = os.path.join(BASE_DIR, 'scripts')
 SCHEMA_FILE = os.path.join(SCRIPTS_DIR, 'schema.sql')
+MIGRATE_PARTITIONING_FILE = os.path.join(SCRIPTS_DIR, 'migrate_partitioning.sql')
 
 # Database configuration
 DB_CONFIG = {
@@ -15,7 +16,10 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD'),
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': os.getenv('DB_PORT', '5432'),
-    'options': f"-c search_path={os.getenv('DB_SCHEMA', 'headhunter')},public"  # Установка search_path
+    'options': f"-c search_path={os.getenv('DB_SCHEMA', 'headhunter')},public",  # Установка search_path
+    # Размер пула соединений (не передаются в psycopg2.connect)
+    'pool_min': int(os.getenv('DB_POOL_MIN', '1')),
+    'pool_max': int(os.getenv('DB_POOL_MAX', '8'))
 }
 
 # Schema configuration
@@ -23,14 +27,34 @@ DB_SCHEMA = os.getenv('DB_SCHEMA', 'headhunter')
 
 # HeadHunter API configuration
 HH_API_CONFIG = {
-    'base_url': 'https://api.hh.ru',
+    'base_url': os.getenv('HH_API_BASE_URL', 'https://api.hh.ru'),
     'vacancies_endpoint': '/vacancies',
     'areas_endpoint': '/areas',
     'professional_roles_endpoint': '/professional_roles',
     'timeout': 10,
     'per_page': 100,
     'max_pages': 20,
-    'delay_between_requests': 0.25
+    # Token bucket: средняя скорость (запросов/с) и допустимый всплеск
+    'rate_limit': float(os.getenv('HH_RATE_LIMIT', '4')),
+    'rate_burst': int(os.getenv('HH_RATE_BURST', '4')),
+    # Количество одновременных запросов в асинхронном режиме
+    'concurrency': int(os.getenv('HH_CONCURRENCY', '8')),
+    # Повторы при 429/5xx, таймаутах и ошибках соединения (экспоненциально, со случайным разбросом)
+    'max_retries': int(os.getenv('HH_MAX_RETRIES', '3')),
+    'retry_base_seconds': float(os.getenv('HH_RETRY_BASE_SECONDS', '1')),
+    'retry_max_seconds': float(os.getenv('HH_RETRY_MAX_SECONDS', '30')),
+    # Верхняя граница ожидания по Retry-After
+    'retry_after_max_seconds': float(os.getenv('HH_RETRY_AFTER_MAX_SECONDS', '300')),
+    # Адаптивный лимитер: скорость меняется в пределах [rate_min, rate_max]
+    'adaptive': os.getenv('HH_RATE_ADAPTIVE', 'true').lower() in ('1', 'true', 'yes'),
+    'rate_min': float(os.getenv('HH_RATE_MIN', '0.5')),
+    'rate_max': float(os.getenv('HH_RATE_MAX', '8')),
+    'rate_increase': float(os.getenv('HH_RATE_INCREASE', '0.1')),
+    # Ответы дольше этого (секунд) считаются признаком перегрузки
+    'latency_target': float(os.getenv('HH_LATENCY_TARGET', '2')),
+    # Circuit breaker: отказов подряд до размыкания и длительность паузы
+    'circuit_failures': int(os.getenv('HH_CIRCUIT_FAILURES', '10')),
+    'circuit_open_seconds': float(os.getenv('HH_CIRCUIT_OPEN_SECONDS', '60'))
 }
 
 # Parser configuration
@@ -40,7 +64,103 @@ PARSER_CONFIG = {
     'search_field': os.getenv('HH_SEARCH_FIELD', 'name'),
     'experience': os.getenv('HH_EXPERIENCE', ''),
     'employment': os.getenv('HH_EMPLOYMENT', ''),
-    'schedule': os.getenv('HH_SCHEDULE', '')
+    'schedule': os.getenv('HH_SCHEDULE', ''),
+    # sync - HHParser, async - AsyncHHParser
+    'mode': os.getenv('HH_CRAWLER_MODE', 'sync'),
+    # dict - словари normalize_vacancy, records - компактные записи (records.py),
+    # columnar - колоночные пакеты страниц (columnar.py)
+    'decoder': os.getenv('HH_DECODER', 'dict'),
+    # Разбивать поиск на срезы, чтобы обойти лимит в 2000 результатов
+    'partition': os.getenv('HH_PARTITION', 'false').lower() in ('1', 'true', 'yes'),
+    # Инкрементальный режим: только вакансии, опубликованные после водяного знака
+    'incremental': os.getenv('HH_INCREMENTAL', 'false').lower() in ('1', 'true', 'yes'),
+    'incremental_overlap_minutes': int(os.getenv('HH_INCREMENTAL_OVERLAP_MINUTES', '15')),
+    # Сдвиг выдачи во время обхода: сколько уже полученных предыдущих страниц поиска
+    # перечитывается, чтобы вернуть ушедшие на них вакансии
+    'drift_retries': int(os.getenv('HH_DRIFT_RETRIES', '2'))
+}
+
+# Ingest configuration
+INGEST_CONFIG = {
+    'batch_size': int(os.getenv('INGEST_BATCH_SIZE', '500')),
+    # Размер LRU-кеша уже записанных работодателей
+    'employer_cache_size': int(os.getenv('EMPLOYER_CACHE_SIZE', '100000'))
+}
+
+# Pipeline configuration (загрузка -> нормализация -> запись)
+PIPELINE_CONFIG = {
+    'enabled': os.getenv('PIPELINE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'fetchers': int(os.getenv('PIPELINE_FETCHERS', '4')),
+    'normalizers': int(os.getenv('PIPELINE_NORMALIZERS', '2')),
+    # Писатели берут соединения из пула Database (DB_POOL_MAX)
+    'writers': int(os.getenv('PIPELINE_WRITERS', '2')),
+    # Ёмкость очередей между стадиями (в страницах)
+    'queue_size': int(os.getenv('PIPELINE_QUEUE_SIZE', '16'))
+}
+
+# Partitioning configuration (помесячные партиции vacancies по parsed_at)
+PARTITION_CONFIG = {
+    # Сколько месяцев вперёд создавать партиции перед загрузкой
+    'months_ahead': int(os.getenv('PARTITION_MONTHS_AHEAD', '2')),
+    # Сколько месяцев истории хранить (0 - хранить всё)
+    'retention_months': int(os.getenv('PARTITION_RETENTION_MONTHS', '0')),
+    # detach - отсоединить старые партиции, drop - удалить
+    'retention_mode': os.getenv('PARTITION_RETENTION_MODE', 'detach')
+}
+
+# Metrics configuration (Prometheus endpoint, 0 - выключен)
+METRICS_CONFIG = {
+    'host': os.getenv('METRICS_HOST', '127.0.0.1'),
+    'port': int(os.getenv('METRICS_PORT', '0'))
+}
+
+# Scheduler configuration (несколько сохранённых поисков в одном процессе)
+SCHEDULER_CONFIG = {
+    'jobs_file': os.getenv('HH_JOBS_FILE', os.path.join(BASE_DIR, 'jobs.json')),
+    'default_interval_minutes': int(os.getenv('HH_JOB_INTERVAL_MINUTES', '60'))
+}
+
+# Archive configuration (сжатые сырые ответы API для офлайн-пересборки БД)
+ARCHIVE_CONFIG = {
+    'enabled': os.getenv('HH_ARCHIVE', 'false').lower() in ('1', 'true', 'yes'),
+    'dir': os.getenv('HH_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive')),
+    # Размер сегмента (сжатых байт), после которого начинается новый файл
+    'segment_mb': int(os.getenv('HH_ARCHIVE_SEGMENT_MB', '256')),
+    'compression_level': int(os.getenv('HH_ARCHIVE_COMPRESSION', '6'))
+}
+
+# Rollup configuration (сводки зарплат и спроса, обновляемые при каждой загрузке)
+ROLLUP_CONFIG = {
+    'enabled': os.getenv('HH_ROLLUPS', 'true').lower() in ('1', 'true', 'yes'),
+    # Относительная точность квантилей скетча; при изменении нужен --backfill
+    'relative_accuracy': float(os.getenv('HH_ROLLUP_ACCURACY', '0.01'))
+}
+
+# Details configuration (полные карточки /vacancies/{id}: описание, key_skills, контакты)
+DETAILS_CONFIG = {
+    'enabled': os.getenv('HH_DETAILS', 'false').lower() in ('1', 'true', 'yes'),
+    # Потоки загрузки; общий темп всё равно задаёт лимитер HH_API_CONFIG
+    'workers': int(os.getenv('HH_DETAILS_WORKERS', '8')),
+    'batch_size': int(os.getenv('HH_DETAILS_BATCH_SIZE', '200')),
+    # Карточки, загруженные не раньше этого срока, не перезапрашиваются даже при изменении вакансии
+    'freshness_hours': int(os.getenv('HH_DETAILS_FRESHNESS_HOURS', '24'))
+}
+
+# Export configuration (инкрементальная выгрузка истории в Parquet)
+EXPORT_CONFIG = {
+    'dir': os.getenv('HH_EXPORT_DIR', os.path.join(BASE_DIR, 'export')),
+    # Строк в порции серверного курсора (и не больше - в группе строк Parquet)
+    'chunk_size': int(os.getenv('HH_EXPORT_CHUNK_SIZE', '50000')),
+    'compression': os.getenv('HH_EXPORT_COMPRESSION', 'zstd')
+}
+
+# Daemon configuration (долгоживущий процесс с периодическими циклами обхода)
+DAEMON_CONFIG = {
+    'cycle_minutes': int(os.getenv('HH_DAEMON_CYCLE_MINUTES', '30')),
+    # Случайный сдвиг начала цикла (±секунд), чтобы запуски не совпадали по фазе
+    'jitter_seconds': int(os.getenv('HH_DAEMON_JITTER_SECONDS', '60')),
+    # Период обновления справочников (регионы, профессиональные роли)
+    'reference_hours': int(os.getenv('HH_DAEMON_REFERENCE_HOURS', '24'))
 }
 
 # Logging configuration
@@ -0,0 +1,276 @@
+"""Обход вакансий: подготовка запуска, парсинг, запись и завершение.
+
+Общие шаги main.py, scheduler.py и daemon.py; модуль не настраивает
+логирование при импорте (см. configure_logging).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config import INGEST_CONFIG, LOG_CONFIG, PARSER_CONFIG, PIPELINE_CONFIG, SCHEMA_FILE
+from database import Database
+from dedup import SeenVacancies
+from jobs import CrawlJob
+from parser import HHParser, query_key, search_identity, search_key
+
+logger = logging.getLogger(__name__)
+
+# Advisory-блокировка, исключающая одновременные запуски парсинга
+CRAWL_LOCK = 'headhunter-crawl'
+
+def initialize_database(db: Database):
+    """Инициализация БД и загрузка справочников"""
+    logger.info("Инициализация базы данных...")
+    
+    # Выполнение schema.sql
+    db.execute_script(SCHEMA_FILE)
+    
+    load_reference_data(db)
+    
+    logger.info("Инициализация завершена")
+
+def load_reference_data(db: Database, parser: Optional[HHParser] = None):
+    """Загрузка справочников (регионы и профессиональные роли)"""
+    parser = parser or HHParser()
+    
+    # Загрузка регионов
+    areas = parser.fetch_areas()
+    if areas:
+        db.upsert_areas(areas)
+        db.rebuild_area_closure()
+    
+    # Загрузка профессиональных ролей
+    categories, roles = parser.fetch_professional_roles()
+    if categories and roles:
+        db.upsert_professional_roles(categories, roles)
+
+def create_parser() -> HHParser:
+    """Создаёт парсер в соответствии с PARSER_CONFIG['mode']"""
+    if PARSER_CONFIG['mode'] == 'async':
+        # Конвейер загружает страницы своими потоками через синхронный fetch_page,
+        # и асинхронный краулер в нём молча заменился бы синхронным
+        if PIPELINE_CONFIG['enabled']:
+            raise ValueError("Асинхронный режим (HH_CRAWLER_MODE=async) несовместим с конвейером (PIPELINE_ENABLED)")
+        from async_parser import AsyncHHParser
+        return AsyncHHParser()
+    return HHParser()
+
+def prepare_crawl(db: Database, parser: HHParser, job: Optional[CrawlJob] = None):
+    """Определяет поиски для обхода и водяной знак инкрементального режима.
+
+    Возвращает (поиски, водяной знак, incremental): incremental - обход
+    только опубликованного после прошлого водяного знака, он не видит
+    остальные вакансии задания. Окна date_from/date_to срезов планировщика
+    вместе покрывают весь поиск и инкрементальным обход не делают.
+    """
+    job = job or CrawlJob()
+    # Инкрементальный режим: запрашиваем только опубликованное после водяного знака
+    root_search = job.search
+    watermark = None
+    incremental = False
+    if job.incremental:
+        key = query_key(job.search)
+        started_at = datetime.now().astimezone().replace(microsecond=0)
+        previous = db.get_watermark(key)
+        if previous:
+            overlap = timedelta(minutes=PARSER_CONFIG['incremental_overlap_minutes'])
+            root_search = {
+                **(job.search or {}),
+                'date_from': (previous - overlap).isoformat(timespec='seconds')
+            }
+            incremental = True
+            logger.info(f"Инкрементальный обход с {root_search['date_from']}")
+        else:
+            logger.info("Водяной знак не найден, выполняется полный обход")
+        watermark = (key, search_identity(job.search), started_at)
+    
+    searches = [root_search] if root_search else None
+    if job.partition:
+        from planner import PartitionPlanner
+        plan = PartitionPlanner(parser).plan(root_search)
+        searches = PartitionPlanner.searches(plan)
+    
+    return searches, watermark, incremental
+
+def start_crawl(db: Database, parser: HHParser, resume: bool = False, job: Optional[CrawlJob] = None):
+    """Новый запуск или продолжение прерванного.
+
+    Возвращает (run_id, поиски, водяной знак, записанные страницы, incremental).
+    """
+    job = job or CrawlJob()
+    parser.reset_run()
+    run = db.find_resumable_run(job.name) if resume else None
+    if resume and not run:
+        logger.info("Незавершённых запусков нет, начинается новый")
+    if run:
+        # Тот же parsed_at и те же срезы, что и у прерванного запуска
+        parser.parsed_at = run['parsed_at']
+        pages = sum(len(entry['done']) for entry in run['committed'].values())
+        logger.info(
+            f"Продолжение запуска {run['run_id']} (parsed_at {run['parsed_at']}), "
+            f"уже записано страниц: {pages}"
+        )
+        return run['run_id'], run['searches'], run['watermark'], run['committed'], run['incremental']
+
+    searches, watermark, incremental = prepare_crawl(db, parser, job)
+    run_id = db.start_run(parser.parsed_at, searches or [None], watermark, job.name, incremental)
+    return run_id, searches, watermark, {}, incremental
+
+def parse_vacancies(
+    db: Database,
+    parser: HHParser = None,
+    resume: bool = False,
+    job: Optional[CrawlJob] = None,
+    seen: Optional[SeenVacancies] = None
+) -> Dict:
+    """Парсинг вакансий.
+
+    job - сохранённый поиск (по умолчанию PARSER_CONFIG), seen - общее для
+    нескольких заданий множество уже записанных в этом запуске вакансий.
+    """
+    logger.info(f"Начало парсинга вакансий{f' (задание {job.name})' if job and job.name else ''}...")
+    
+    parser = parser or create_parser()
+    seen = seen if seen is not None else SeenVacancies()
+    run_id, searches, watermark, committed, incremental = start_crawl(db, parser, resume, job)
+    # Повторы могли быть записаны предыдущими заданиями с тем же seen
+    seen.track_repeats()
+    
+    if PIPELINE_CONFIG['enabled']:
+        from pipeline import PipelineRunner
+        report = PipelineRunner(db, parser, seen=seen).run(searches, watermark, run_id, committed)
+        db.mark_seen_vacancies(run_id, seen.take_repeats())
+        finish_crawl(db, run_id, report['errors'] or report['stopped'], is_full_crawl(parser, searches, incremental))
+        return report
+    
+    batch_size = INGEST_CONFIG['batch_size']
+    batch = []
+    pages = []
+    processed = 0
+    unchanged = 0
+    errors = 0
+    skipped = 0
+    duplicates_before = seen.duplicates
+    
+    def flush(watermark=None):
+        nonlocal processed, unchanged, errors, skipped
+        if not batch and not pages and not watermark:
+            return
+        try:
+            # Страницы пакета отмечаются записанными в той же транзакции
+            stats = db.ingest_batch(batch, watermark, (run_id, pages))
+            processed += stats['vacancies_inserted']
+            skipped += stats['vacancies_skipped']
+            unchanged += stats['vacancies_unchanged']
+            logger.info(
+                f"Обработано {processed} вакансий (без изменений: {unchanged}, "
+                f"ошибок: {errors}, пропущено: {skipped}); "
+                f"пакет: {stats}"
+            )
+        except Exception as e:
+            errors += len(batch)
+            logger.error(f"Ошибка загрузки пакета из {len(batch)} вакансий: {e}")
+            # Незаписанные вакансии могут быть записаны следующими поисками
+            seen.discard(data['vacancy']['id'] for data in batch)
+        batch.clear()
+        pages.clear()
+    
+    # Повторы (другие поиски, сдвиг выдачи) отбрасываются парсером до нормализации
+    completed = False
+    try:
+        for search, page, total, records in parser.iter_pages(searches, committed, seen):
+            kept = 0
+            for data in records:
+                try:
+                    # Вакансии без работодателя пропускаем
+                    if not data['employer']['id']:
+                        logger.warning(f"Вакансия {data['vacancy']['id']} без работодателя")
+                        skipped += 1
+                        continue
+                
+                    batch.append(data)
+                    kept += 1
+                    
+                except KeyError as e:
+                    errors += 1
+                    logger.error(f"Отсутствует обязательное поле в вакансии: {e}")
+                    logger.debug(f"Проблемная вакансия: {data.get('vacancy', {}).get('id', 'unknown')}")
+                    continue
+        
+            pages.append((search_key(search), page, total, kept))
+            if len(batch) >= batch_size:
+                flush()
+    
+        completed = True
+    finally:
+        # Обход прерван исключением (например, CircuitOpenError): полученные
+        # страницы записываются, а водяной знак не сдвигается, запуск остаётся
+        # незавершённым и продолжается без повторной загрузки записанного
+        if not completed:
+            flush()
+    
+    # Водяной знак сдвигается вместе с последним пакетом и только если не было ошибок,
+    # иначе потерянные вакансии не будут перезапрошены в следующем запуске
+    stopped = parser.stop_event.is_set()
+    flush(watermark if errors == 0 and not stopped else None)
+    if watermark and (errors or stopped):
+        logger.warning("Водяной знак не сдвинут из-за ошибок загрузки или остановки")
+    db.mark_seen_vacancies(run_id, seen.take_repeats())
+    finish_crawl(db, run_id, errors or stopped, is_full_crawl(parser, searches, incremental))
+    duplicates = seen.duplicates - duplicates_before
+    logger.info(
+        f"Парсинг завершен. Обработано: {processed}, без изменений: {unchanged}, "
+        f"ошибок: {errors}, пропущено: {skipped}, повторов: {duplicates}, "
+        f"сдвиг выдачи: {parser.drift}, память id: {seen.nbytes()} байт"
+    )
+    return {
+        'inserted': processed,
+        'unchanged': unchanged,
+        'errors': errors,
+        'skipped': skipped,
+        'duplicates': duplicates,
+        'drift': dict(parser.drift),
+        'seen_bytes': seen.nbytes(),
+        'stopped': stopped
+    }
+
+def is_full_crawl(parser: HHParser, searches, incremental: bool = False) -> bool:
+    """Обход видел все вакансии своих поисков: не инкрементальный, без обрезки и сдвига выдачи"""
+    from planner import SEARCH_DEPTH_LIMIT
+    if incremental:
+        return False
+    # Выдача сдвигалась, и сдвинутые вакансии возвращены не полностью
+    if parser.drift['lost']:
+        return False
+    for search in searches or [None]:
+        # Неизвестно (первая страница записана до продолжения) или не помещается в выдачу
+        found = parser.found.get(search_key(search))
+        if found is None or found > SEARCH_DEPTH_LIMIT:
+            return False
+    return True
+
+def finish_crawl(db: Database, run_id: int, incomplete, full: bool = False) -> None:
+    """Закрывает запуск; при ошибках он остаётся доступным для --resume.
+
+    После полного обхода вакансии задания, которые он не нашёл, помечаются закрытыми.
+    """
+    if incomplete:
+        logger.warning(f"Запуск {run_id} завершён не полностью, продолжить: python src/main.py --resume")
+        return
+    if full:
+        db.close_missing_vacancies(run_id)
+    else:
+        logger.info(f"Запуск {run_id} не полный (инкрементальный, выдача обрезана или сдвигалась), вакансии не закрываются")
+    db.finish_run(run_id)
+
+
+def configure_logging() -> None:
+    """Логирование точек входа обхода: в консоль и в LOG_CONFIG['file']"""
+    logging.basicConfig(
+        level=getattr(logging, LOG_CONFIG['level']),
+        format=LOG_CONFIG['format'],
+        handlers=[
+            logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
@@ -0,0 +1,183 @@
+"""Долгоживущий режим: периодические циклы обхода без перезапуска процесса.
+
+    python src/daemon.py                     # циклы каждые DAEMON_CONFIG['cycle_minutes']
+    python src/daemon.py --cycle-minutes 15
+    python src/daemon.py --once              # один цикл (удобно для проверки)
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import metrics
+from config import DAEMON_CONFIG, DETAILS_CONFIG, METRICS_CONFIG, SCHEDULER_CONFIG
+from crawl import CRAWL_LOCK, configure_logging, create_parser, load_reference_data, parse_vacancies
+from database import Database
+from details import DetailFetcher
+from jobs import load_jobs
+from parser import HHParser
+from scheduler import CrawlScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlDaemon:
+    """Выполняет циклы обхода по расписанию в одном процессе.
+
+    Пул соединений с БД, HTTP-сессии парсера, token bucket и кеш
+    работодателей живут всё время работы демона: пулы потоков загрузки
+    создаются в каждом цикле, но берут уже открытые сессии парсера,
+    которые закрываются при остановке демона. Циклы идут строго
+    последовательно, а между процессами их разводит advisory-блокировка.
+    По SIGTERM/SIGINT новые страницы не запрашиваются, уже полученные
+    записываются, запуск остаётся незавершённым и продолжается при
+    следующем старте.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        parser: Optional[HHParser] = None,
+        cycle_minutes: Optional[int] = None,
+        jitter_seconds: Optional[int] = None,
+        reference_hours: Optional[int] = None,
+        jobs_file: Optional[str] = None
+    ):
+        self.db = db
+        self.parser = parser or create_parser()
+        self.cycle_seconds = 60 * (cycle_minutes or DAEMON_CONFIG['cycle_minutes'])
+        self.jitter_seconds = DAEMON_CONFIG['jitter_seconds'] if jitter_seconds is None else jitter_seconds
+        self.reference_seconds = 3600 * (reference_hours or DAEMON_CONFIG['reference_hours'])
+        self.jobs_file = jobs_file or SCHEDULER_CONFIG['jobs_file']
+        self.reference_loaded_at: Optional[float] = None
+        self.cycles = 0
+
+    @property
+    def stopping(self) -> bool:
+        return self.parser.stop_event.is_set()
+
+    def stop(self, signum=None, frame=None) -> None:
+        """Обработчик сигнала: текущий пакет дописывается, новые циклы не начинаются"""
+        if not self.stopping:
+            logger.warning(f"Получен сигнал {signum}, остановка после записи загруженных страниц")
+        self.parser.stop()
+
+    def install_signal_handlers(self) -> None:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+    def refresh_reference(self, force: bool = False) -> bool:
+        """Обновляет справочники, если с прошлой загрузки прошло reference_hours"""
+        now = time.monotonic()
+        if not force and self.reference_loaded_at is not None \
+                and now - self.reference_loaded_at < self.reference_seconds:
+            return False
+        try:
+            load_reference_data(self.db, self.parser)
+        except Exception as e:
+            # Справочники не критичны для обхода: повторим в следующем цикле
+            logger.error(f"Ошибка обновления справочников: {e}", exc_info=True)
+            return False
+        self.reference_loaded_at = now
+        logger.info("Справочники обновлены")
+        return True
+
+    def run_cycle(self) -> Optional[Dict]:
+        """Один цикл: справочники, задания (или поиск по умолчанию), карточки, хранение истории"""
+        with self.db.advisory_lock(CRAWL_LOCK) as acquired:
+            if not acquired:
+                logger.warning("Обход выполняется другим процессом, цикл пропущен")
+                return None
+
+            self.refresh_reference()
+            if self.stopping:
+                return None
+
+            self.parser.parsed_at = datetime.now()
+            # Незавершённые (в том числе остановленные) запуски продолжаются
+            if os.path.exists(self.jobs_file):
+                jobs = load_jobs(self.jobs_file)
+                results = CrawlScheduler(self.db, jobs, self.parser).run_once(resume=True)
+            else:
+                results = parse_vacancies(self.db, self.parser, resume=True)
+
+            # Карточки дозагружаются в следующих циклах, если этот остановлен
+            if DETAILS_CONFIG['enabled'] and not self.stopping:
+                DetailFetcher(self.db, self.parser).run()
+            if not self.stopping:
+                self.db.apply_retention()
+            return results
+
+    def next_delay(self, started: float) -> float:
+        """Пауза до следующего цикла: от начала текущего плюс случайный сдвиг"""
+        jitter = random.uniform(-self.jitter_seconds, self.jitter_seconds)
+        return max(0.0, started + self.cycle_seconds + jitter - time.monotonic())
+
+    def run(self, once: bool = False) -> None:
+        self.install_signal_handlers()
+        self.db.warm_employer_cache()
+        logger.info(
+            f"Демон запущен: цикл {self.cycle_seconds // 60} мин (±{self.jitter_seconds} с), "
+            f"справочники каждые {self.reference_seconds // 3600} ч"
+        )
+
+        try:
+            self._loop(once)
+        finally:
+            self.parser.close()
+        logger.info(f"Демон остановлен после {self.cycles} циклов")
+
+    def _loop(self, once: bool) -> None:
+        while not self.stopping:
+            started = time.monotonic()
+            self.cycles += 1
+            try:
+                self.run_cycle()
+            except Exception as e:
+                # Ошибка цикла не останавливает демон: запуск продолжится в следующем
+                logger.error(f"Ошибка цикла {self.cycles}: {e}", exc_info=True)
+            logger.info(
+                f"Цикл {self.cycles} завершён за {time.monotonic() - started:.1f} с, "
+                f"лимитер: {self.parser.rate_limiter.state()}, метрики: {metrics.REGISTRY.summary()}"
+            )
+            if once or self.stopping:
+                break
+
+            delay = self.next_delay(started)
+            logger.info(f"Следующий цикл через {delay:.0f} с")
+            # Ожидание прерывается сигналом остановки
+            self.parser.stop_event.wait(delay)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Демон парсера вакансий HH.ru')
+    arg_parser.add_argument('--cycle-minutes', type=int, help='Период циклов (по умолчанию DAEMON_CONFIG)')
+    arg_parser.add_argument('--jitter-seconds', type=int, help='Случайный сдвиг начала цикла')
+    arg_parser.add_argument('--reference-hours', type=int, help='Период обновления справочников')
+    arg_parser.add_argument('--jobs', help='Файл заданий (по умолчанию SCHEDULER_CONFIG)')
+    arg_parser.add_argument('--once', action='store_true', help='Выполнить один цикл и выйти')
+    args = arg_parser.parse_args()
+
+    configure_logging()
+    metrics.start_http_server(METRICS_CONFIG['port'], METRICS_CONFIG['host'])
+    try:
+        with Database() as db:
+            CrawlDaemon(
+                db,
+                cycle_minutes=args.cycle_minutes,
+                jitter_seconds=args.jitter_seconds,
+                reference_hours=args.reference_hours,
+                jobs_file=args.jobs
+            ).run(once=args.once)
+    except Exception as e:
+        logger.critical(f"Критическая ошибка: {e}", exc_info=True)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
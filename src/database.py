@@ -1,54 +1,275 @@
+import io
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-from psycopg2 import sql, extras
+from psycopg2 import sql, extras, pool
 from psycopg2.extensions import connection
 import logging
-from typing import List, Dict, Optional, Any
-from datetime import datetime
-from config import DB_CONFIG, DB_SCHEMA
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Sequence, Tuple, Union
+from datetime import date, datetime
+import metrics
+from config import (
+    DB_CONFIG, DB_SCHEMA, INGEST_CONFIG, PARTITION_CONFIG, ROLLUP_CONFIG, SCHEMA_FILE,
+    MIGRATE_PARTITIONING_FILE
+)
+from employer_cache import EmployerCache
+from areas import AreaTree
+from columnar import VacancyBatch
+from records import EMPLOYER_FIELDS, VACANCY_FIELDS
+from rollups import ROLLUP_DIMENSIONS, SKETCH_LN_GAMMA
 
 logger = logging.getLogger(__name__)
 
+# Колонки, которые заполняются из HHParser.normalize_vacancy (порядок полей записей records)
+EMPLOYER_COLUMNS = EMPLOYER_FIELDS
+
+VACANCY_COLUMNS = VACANCY_FIELDS
+
+# Партиционированные по parsed_at таблицы; связи удаляются/отсоединяются первыми
+PARTITIONED_TABLES = ('vacancy_professional_roles', 'vacancies')
+
+PARTITION_SUFFIX_RE = re.compile(r'_y(\d{4})m(\d{2})$')
+
+DETAIL_COLUMNS = (
+    'vacancy_id', 'content_hash', 'status', 'description', 'branded_description', 'contacts',
+    'languages', 'driver_license_types', 'billing_type_id', 'code', 'allow_messages', 'archived',
+    'fetched_at'
+)
+
+KEY_SKILL_COLUMNS = ('vacancy_id', 'name')
+
+# Колонки выгрузки истории в Parquet (export.py)
+EXPORT_COLUMNS = VACANCY_COLUMNS
+
+AREA_CLOSURE_COLUMNS = ('ancestor_id', 'descendant_id', 'depth')
+
+# Регион с учётом всех вложенных (по таблице замыкания, без рекурсии)
+AREA_SUBTREE = "{column} IN (SELECT descendant_id FROM area_closure WHERE ancestor_id = ANY(%s))"
+
+VACANCY_HASH_COLUMNS = ('vacancy_id', 'content_hash', 'parsed_at')
+
+VACANCY_ROLE_COLUMNS = (
+    'vacancy_id', 'vacancy_published_at', 'vacancy_created_at', 'vacancy_parsed_at',
+    'professional_role_id'
+)
+
+# Колонки vacancies_current в результатах поиска
+SEARCH_COLUMNS = (
+    'id', 'name', 'area_id', 'employer_id', 'salary_from', 'salary_to', 'salary_currency',
+    'experience_id', 'published_at', 'alternate_url', 'snippet_requirement',
+    'snippet_responsibility', 'closed_at'
+)
+
+# Порядок выдачи поиска: выражение сортировки (по убыванию, затем id)
+SEARCH_ORDERS = {
+    'relevance': "ts_rank_cd(c.search_vector, q.query)",
+    'published_at': "c.published_at",
+}
+
+# Вклад текущих версий в сводки: по строке на вакансию и роль (без ролей - роль 0)
+ROLLUP_CONTRIBUTIONS = """
+    SELECT c.published_at::date AS day,
+           COALESCE(c.area_id, 0) AS area_id,
+           COALESCE(r.professional_role_id, 0) AS professional_role_id,
+           COALESCE(c.experience_id, '') AS experience_id,
+           COALESCE(c.salary_currency, '') AS currency,
+           {sign}::INTEGER AS sign,
+           c.salary_from,
+           c.salary_to
+    FROM vacancies_current c
+    LEFT JOIN vacancy_current_professional_roles r ON r.vacancy_id = c.id
+"""
+
+
+def _copy_value(value: Any) -> str:
+    """Преобразует значение в поле текстового формата COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value)
+    return (
+        text.replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+    )
+
+
+def _copy_buffer(rows: Iterable[Sequence[Any]]) -> io.StringIO:
+    """Собирает строки в буфер для COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+class _SearchPathPool(pool.ThreadedConnectionPool):
+    """Пул соединений, в котором у каждого нового соединения задан search_path"""
+
+    def __init__(self, minconn: int, maxconn: int, schema: str, **kwargs):
+        self.schema = schema
+        super().__init__(minconn, maxconn, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        with conn.cursor() as cur:
+            cur.execute(f"SET search_path TO {self.schema}, public;")
+        conn.commit()
+        return conn
+
+
 class Database:
+    """Доступ к БД через потокобезопасный пул соединений.
+
+    Каждый метод берёт соединение из пула на время своей транзакции, поэтому
+    методы загрузки можно вызывать из нескольких потоков одновременно.
+    """
+
     def __init__(self):
-        self.conn: Optional[connection] = None
+        self.pool: Optional[_SearchPathPool] = None
         self.schema = DB_SCHEMA
+        self.pool_min = int(DB_CONFIG['pool_min'])
+        self.pool_max = int(DB_CONFIG['pool_max'])
+        # Ограничивает число одновременно выданных соединений: при исчерпании
+        # пула поток ждёт, а не получает PoolError
+        self._slots = threading.BoundedSemaphore(self.pool_max)
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._borrows = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        # Месяцы, для которых партиции уже гарантированно созданы
+        self._partition_months: set = set()
+        self._partition_lock = threading.Lock()
+        # Уже записанные версии работодателей
+        self.employer_cache = EmployerCache(EMPLOYER_COLUMNS, INGEST_CONFIG['employer_cache_size'])
         
     def connect(self) -> None:
-        """Устанавливает соединение с БД и устанавливает search_path"""
+        """Создаёт пул соединений (search_path задаётся каждому соединению)"""
+        connect_params = {k: v for k, v in DB_CONFIG.items() if not k.startswith('pool_')}
         try:
-            self.conn = psycopg2.connect(**DB_CONFIG)
-            
-            # Явная установка search_path для сессии
-            with self.conn.cursor() as cur:
-                cur.execute(f"SET search_path TO {self.schema}, public;")
-                self.conn.commit()
-            
-            logger.info(f"Успешное подключение к базе данных (schema: {self.schema})")
+            self.pool = _SearchPathPool(self.pool_min, self.pool_max, self.schema, **connect_params)
+            logger.info(
+                f"Успешное подключение к базе данных (schema: {self.schema}, "
+                f"пул: {self.pool_min}-{self.pool_max})"
+            )
         except psycopg2.Error as e:
             logger.error(f"Ошибка подключения к БД: {e}")
             raise
     
     def disconnect(self) -> None:
-        """Закрывает соединение с БД"""
-        if self.conn:
-            self.conn.close()
-            logger.info("Соединение с БД закрыто")
+        """Закрывает все соединения пула"""
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            logger.info(f"Соединения с БД закрыты. Пул: {self.pool_stats()}")
+            logger.info(f"Кеш работодателей: {self.employer_cache.stats()}")
+    
+    @contextmanager
+    def connection(self) -> Iterator[connection]:
+        """Выдаёт соединение из пула на время блока with"""
+        started = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - started
+        try:
+            conn = self.pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        
+        with self._stats_lock:
+            self._borrows += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            yield conn
+        finally:
+            # Незавершённая транзакция откатывается пулом при возврате
+            self.pool.putconn(conn, close=bool(conn.closed))
+            with self._stats_lock:
+                self._in_use -= 1
+            self._slots.release()
+    
+    @contextmanager
+    def advisory_lock(self, name: str) -> Iterator[bool]:
+        """Сессионная advisory-блокировка на время блока with.
+
+        Выдаёт False, если блокировку держит другой процесс; соединение с
+        блокировкой занимает один слот пула до выхода из блока.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (name,))
+                acquired = cur.fetchone()[0]
+            conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired and not conn.closed:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (name,))
+                    conn.commit()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Ожидание и загрузка пула соединений"""
+        with self._stats_lock:
+            return {
+                'min': self.pool_min,
+                'max': self.pool_max,
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'utilisation': round(self._in_use / self.pool_max, 3),
+                'peak_utilisation': round(self._peak_in_use / self.pool_max, 3),
+                'borrows': self._borrows,
+                'wait_total_seconds': round(self._wait_total, 3),
+                'wait_avg_seconds': round(self._wait_total / self._borrows, 6) if self._borrows else 0.0,
+                'wait_max_seconds': round(self._wait_max, 6)
+            }
+    
+    def warm_employer_cache(self, limit: Optional[int] = None) -> int:
+        """Заполняет кеш работодателей последними обновлёнными строками employers"""
+        limit = limit or self.employer_cache.max_size
+        query = sql.SQL("SELECT {} FROM employers ORDER BY updated_at DESC NULLS LAST LIMIT %s").format(
+            sql.SQL(', ').join(map(sql.Identifier, EMPLOYER_COLUMNS))
+        )
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(query, (limit,))
+                rows = cur.fetchall()
+            conn.commit()
+        # Самые свежие должны оказаться в конце LRU
+        loaded = self.employer_cache.warm(reversed(rows))
+        logger.info(f"Кеш работодателей прогрет: {loaded} записей")
+        return loaded
     
     def execute_script(self, script_path: str) -> None:
         """Выполняет SQL-скрипт из файла"""
-        try:
-            with open(script_path, 'r', encoding='utf-8') as f:
-                script = f.read()
+        with self.connection() as conn:
+            try:
+                with open(script_path, 'r', encoding='utf-8') as f:
+                    script = f.read()
             
-            with self.conn.cursor() as cur:
-                cur.execute(script)
-                self.conn.commit()
-                logger.info(f"Скрипт {script_path} успешно выполнен")
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка выполнения скрипта: {e}")
-            raise
+                with conn.cursor() as cur:
+                    cur.execute(script)
+                    conn.commit()
+                    logger.info(f"Скрипт {script_path} успешно выполнен")
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка выполнения скрипта: {e}")
+                raise
     
+    @metrics.timed_db('upsert_areas')
     def upsert_areas(self, areas_data: List[Dict]) -> None:
         """Вставка/обновление регионов"""
         insert_query = """
@@ -57,21 +278,52 @@ class Database:
             ON CONFLICT (id) 
             DO UPDATE SET 
                 name = EXCLUDED.name,
+                parent_id = EXCLUDED.parent_id,
                 url = EXCLUDED.url,
                 utc_offset = EXCLUDED.utc_offset,
                 lat = EXCLUDED.lat,
                 lng = EXCLUDED.lng
         """
-        try:
-            with self.conn.cursor() as cur:
-                extras.execute_batch(cur, insert_query, areas_data, page_size=1000)
-                self.conn.commit()
-                logger.info(f"Вставлено/обновлено {len(areas_data)} регионов")
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка при вставке регионов: {e}")
-            raise
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    extras.execute_batch(cur, insert_query, areas_data, page_size=1000)
+                    conn.commit()
+                    logger.info(f"Вставлено/обновлено {len(areas_data)} регионов")
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка при вставке регионов: {e}")
+                raise
     
+    def get_area_tree(self) -> AreaTree:
+        """Дерево регионов из таблицы areas"""
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute("SELECT id, parent_id FROM areas")
+                rows = cur.fetchall()
+            conn.commit()
+        return AreaTree(rows)
+
+    @metrics.timed_db('rebuild_area_closure')
+    def rebuild_area_closure(self) -> int:
+        """Пересобирает area_closure по текущей иерархии areas"""
+        tree = self.get_area_tree()
+        rows = list(tree.closure_rows())
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    # DELETE, а не TRUNCATE: читатели видят старое замыкание до коммита
+                    cur.execute("DELETE FROM area_closure")
+                    self._copy_rows(cur, 'area_closure', AREA_CLOSURE_COLUMNS, rows)
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка пересборки иерархии регионов: {e}")
+                raise
+        logger.info(f"Иерархия регионов пересобрана: {len(tree)} регионов, {len(rows)} пар")
+        return len(rows)
+
+    @metrics.timed_db('upsert_professional_roles')
     def upsert_professional_roles(self, categories_data: List[Dict], roles_data: List[Dict]) -> None:
         """Вставка/обновление профессиональных ролей"""
         cat_query = """
@@ -89,17 +341,19 @@ class Database:
                 accept_incomplete_resumes = EXCLUDED.accept_incomplete_resumes
         """
         
-        try:
-            with self.conn.cursor() as cur:
-                extras.execute_batch(cur, cat_query, categories_data, page_size=100)
-                extras.execute_batch(cur, role_query, roles_data, page_size=1000)
-                self.conn.commit()
-                logger.info(f"Вставлено {len(categories_data)} категорий и {len(roles_data)} ролей")
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка при вставке профессиональных ролей: {e}")
-            raise
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    extras.execute_batch(cur, cat_query, categories_data, page_size=100)
+                    extras.execute_batch(cur, role_query, roles_data, page_size=1000)
+                    conn.commit()
+                    logger.info(f"Вставлено {len(categories_data)} категорий и {len(roles_data)} ролей")
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка при вставке профессиональных ролей: {e}")
+                raise
     
+    @metrics.timed_db('upsert_employer')
     def upsert_employer(self, employer_data: Dict) -> None:
         """Вставка/обновление работодателя"""
         # Пропускаем, если нет ID работодателя
@@ -107,6 +361,11 @@ class Database:
             logger.warning("Пропуск работодателя без ID")
             return
         
+        # Пропускаем, если эта версия работодателя уже записана
+        pending = self.employer_cache.filter_changed({employer_data['id']: employer_data})
+        if not pending:
+            return
+        
         query = """
             INSERT INTO employers (
                 id, name, url, alternate_url, logo_original, logo_90, logo_240,
@@ -130,16 +389,19 @@ class Database:
                 updated_at = CURRENT_TIMESTAMP
         """
         
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute(query, employer_data)
-                self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка при вставке работодателя {employer_data.get('id')}: {e}")
-            raise
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(query, employer_data)
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка при вставке работодателя {employer_data.get('id')}: {e}")
+                raise
+        self.employer_cache.store(pending)
 
     
+    @metrics.timed_db('upsert_vacancy')
     def upsert_vacancy(self, vacancy_data: Dict, professional_roles: List[int]) -> None:
         """Вставка/обновление вакансии с версионированием"""
         vacancy_query = """
@@ -175,6 +437,8 @@ class Database:
             ON CONFLICT (id, published_at, created_at, parsed_at) DO NOTHING
         """
         
+        self.ensure_partitions(vacancy_data['parsed_at'])
+        
         roles_query = """
             INSERT INTO vacancy_professional_roles (
                 vacancy_id, vacancy_published_at, vacancy_created_at, vacancy_parsed_at, professional_role_id
@@ -182,26 +446,1160 @@ class Database:
             ON CONFLICT DO NOTHING
         """
         
-        try:
-            with self.conn.cursor() as cur:
-                cur.execute(vacancy_query, vacancy_data)
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(vacancy_query, vacancy_data)
                 
-                # Вставка связей с профессиональными ролями
-                for role_id in professional_roles:
-                    cur.execute(roles_query, (
-                        vacancy_data['id'],
-                        vacancy_data['published_at'],
-                        vacancy_data['created_at'],
-                        vacancy_data['parsed_at'],
-                        role_id
-                    ))
+                    # Вставка связей с профессиональными ролями
+                    for role_id in professional_roles:
+                        cur.execute(roles_query, (
+                            vacancy_data['id'],
+                            vacancy_data['published_at'],
+                            vacancy_data['created_at'],
+                            vacancy_data['parsed_at'],
+                            role_id
+                        ))
                 
-                self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Ошибка при вставке вакансии {vacancy_data.get('id')}: {e}")
-            raise
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка при вставке вакансии {vacancy_data.get('id')}: {e}")
+                raise
     
+    def ensure_partitions(self, start: datetime, months: Optional[int] = None) -> int:
+        """Создаёт помесячные партиции начиная с месяца `start`"""
+        months = months or PARTITION_CONFIG['months_ahead']
+        month = (start.year, start.month)
+        with self._partition_lock:
+            if month in self._partition_months:
+                return 0
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT create_vacancy_partitions(%s, %s)",
+                        (date(start.year, start.month, 1), months)
+                    )
+                    created = cur.fetchone()[0]
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка создания партиций: {e}")
+                raise
+        
+        year, month_num = month
+        with self._partition_lock:
+            for _ in range(months):
+                self._partition_months.add((year, month_num))
+                year, month_num = (year + 1, 1) if month_num == 12 else (year, month_num + 1)
+        if created:
+            logger.info(f"Создано партиций: {created} (с {start:%Y-%m})")
+        return created
+
+    def _list_partitions(self, cur, parent: str) -> List[str]:
+        cur.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace n ON n.oid = p.relnamespace
+            WHERE p.relname = %s AND n.nspname = %s
+            ORDER BY c.relname
+        """, (parent, self.schema))
+        return [row[0] for row in cur.fetchall()]
+
+    def _drop_foreign_keys(self, cur, table: str, referenced: str) -> None:
+        """Удаляет внешние ключи отсоединённой партиции table на referenced.
+
+        После DETACH партиция сохраняет унаследованный внешний ключ на
+        родительскую таблицу, и он не даёт отсоединить партицию, на строки
+        которой ссылается.
+        """
+        cur.execute("""
+            SELECT con.conname
+            FROM pg_constraint con
+            JOIN pg_class c ON c.oid = con.conrelid
+            JOIN pg_class r ON r.oid = con.confrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE con.contype = 'f' AND c.relname = %s AND r.relname = %s AND n.nspname = %s
+        """, (table, referenced, self.schema))
+        for (name,) in cur.fetchall():
+            cur.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                sql.Identifier(table), sql.Identifier(name)
+            ))
+
+    def apply_retention(self, keep_months: Optional[int] = None, mode: Optional[str] = None) -> List[str]:
+        """Отсоединяет или удаляет партиции старше `keep_months` месяцев.
+
+        Вместе с партициями из индекса хешей удаляются записи, чья последняя
+        версия попала под удаление, чтобы следующий обход записал её заново,
+        а из текущего состояния - давно закрытые вакансии (их хеши и вклад в сводки).
+        """
+        keep_months = keep_months if keep_months is not None else PARTITION_CONFIG['retention_months']
+        mode = mode or PARTITION_CONFIG['retention_mode']
+        if keep_months <= 0:
+            return []
+        if mode not in ('detach', 'drop'):
+            raise ValueError(f"Неизвестный режим хранения: {mode}")
+        
+        today = date.today()
+        total = today.year * 12 + today.month - 1 - keep_months
+        cutoff = date(total // 12, total % 12 + 1, 1)
+        
+        expired = []
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    for parent in PARTITIONED_TABLES:
+                        for name in self._list_partitions(cur, parent):
+                            match = PARTITION_SUFFIX_RE.search(name)
+                            if not match or date(int(match[1]), int(match[2]), 1) >= cutoff:
+                                continue
+                            cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                                sql.Identifier(parent), sql.Identifier(name)
+                            ))
+                            if mode == 'drop':
+                                cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+                            elif parent == 'vacancy_professional_roles':
+                                # Отсоединённые роли остаются рядом с отсоединённой партицией vacancies
+                                self._drop_foreign_keys(cur, name, 'vacancies')
+                            expired.append(name)
+                
+                    cur.execute(
+                        "DELETE FROM vacancy_content_hashes WHERE last_changed_at < %s",
+                        (cutoff,)
+                    )
+                    # Давно закрытые вакансии не нужны и в текущем состоянии;
+                    # их вклад вычитается из сводок до удаления (роли удаляются каскадом)
+                    if ROLLUP_CONFIG['enabled']:
+                        self._create_staging_tables(cur)
+                        cur.execute(
+                            "INSERT INTO stage_rollup_delta " + ROLLUP_CONTRIBUTIONS.format(sign=-1)
+                            + " WHERE c.closed_at < %s",
+                            (cutoff,)
+                        )
+                        self._apply_rollups(cur, 'stage_rollup_delta')
+                    # Хеш удалённой вакансии пропускал бы её неизменную версию
+                    # при повторном появлении, и в текущее состояние она бы не вернулась
+                    cur.execute("""
+                        DELETE FROM vacancy_content_hashes h
+                        USING vacancies_current c
+                        WHERE h.vacancy_id = c.id AND c.closed_at < %s
+                    """, (cutoff,))
+                    cur.execute(
+                        "DELETE FROM vacancies_current WHERE closed_at < %s",
+                        (cutoff,)
+                    )
+                    # Вместе с ними - их карточки
+                    cur.execute("""
+                        DELETE FROM vacancy_details d
+                        WHERE NOT EXISTS (SELECT 1 FROM vacancies_current c WHERE c.id = d.vacancy_id)
+                    """)
+                    cur.execute("""
+                        DELETE FROM vacancy_key_skills s
+                        WHERE NOT EXISTS (SELECT 1 FROM vacancies_current c WHERE c.id = s.vacancy_id)
+                    """)
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка применения политики хранения: {e}")
+                raise
+        
+        if expired:
+            action = 'удалено' if mode == 'drop' else 'отсоединено'
+            logger.info(f"Партиций старше {cutoff}: {action} {len(expired)} ({', '.join(expired)})")
+        return expired
+
+    def migrate_to_partitioned(self) -> None:
+        """Переносит непартиционированные vacancies в партиционированную схему"""
+        logger.info("Миграция vacancies на партиционированную схему...")
+        self.execute_script(MIGRATE_PARTITIONING_FILE)
+        self.execute_script(SCHEMA_FILE)
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT min(parsed_at), max(parsed_at) FROM vacancies_unpartitioned")
+                    first, last = cur.fetchone()
+                    if first:
+                        months = (last.year - first.year) * 12 + last.month - first.month + 1
+                        cur.execute(
+                            "SELECT create_vacancy_partitions(%s, %s)",
+                            (date(first.year, first.month, 1), months)
+                        )
+                    cur.execute("INSERT INTO vacancies SELECT * FROM vacancies_unpartitioned")
+                    logger.info(f"Перенесено {cur.rowcount} вакансий")
+                    cur.execute(
+                        "INSERT INTO vacancy_professional_roles "
+                        "SELECT * FROM vacancy_professional_roles_unpartitioned"
+                    )
+                    cur.execute("DROP TABLE vacancy_professional_roles_unpartitioned")
+                    cur.execute("DROP TABLE vacancies_unpartitioned")
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка миграции на партиции: {e}")
+                raise
+        with self._partition_lock:
+            self._partition_months.clear()
+        logger.info("Миграция завершена")
+
+    def _create_staging_tables(self, cur) -> None:
+        """Создаёт временные staging-таблицы для текущего соединения.
+
+        Временные таблицы не пишутся в WAL (как UNLOGGED) и видны только
+        своему соединению, поэтому параллельные писатели не мешают друг другу.
+        Строки очищаются автоматически при COMMIT.
+        """
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS stage_employers
+                (LIKE employers INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_vacancies
+                (LIKE vacancies INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_vacancy_professional_roles
+                (LIKE vacancy_professional_roles) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_vacancy_hashes (
+                vacancy_id BIGINT,
+                content_hash CHAR(40),
+                parsed_at TIMESTAMP
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_current_ids (
+                id BIGINT,
+                parsed_at TIMESTAMP
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_seen_ids (
+                id BIGINT
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_vacancy_details
+                (LIKE vacancy_details) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_vacancy_key_skills
+                (LIKE vacancy_key_skills) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS stage_rollup_delta (
+                day DATE,
+                area_id INTEGER,
+                professional_role_id INTEGER,
+                experience_id VARCHAR(50),
+                currency VARCHAR(10),
+                sign INTEGER,
+                salary_from INTEGER,
+                salary_to INTEGER
+            ) ON COMMIT DELETE ROWS;
+        """)
+
+    @staticmethod
+    def _copy_rows(cur, table: str, columns: Sequence[str], rows: List[Sequence[Any]]) -> None:
+        """Загружает строки в таблицу через COPY"""
+        if not rows:
+            return
+        query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        cur.copy_expert(query.as_string(cur), _copy_buffer(rows))
+
+    def get_watermark(self, query_key: str) -> Optional[datetime]:
+        """Возвращает водяной знак инкрементального обхода для запроса"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT watermark FROM crawl_state WHERE query_key = %s", (query_key,))
+                row = cur.fetchone()
+            conn.commit()
+        return row[0] if row else None
+
+    @staticmethod
+    def _advance_watermark(cur, watermark: Tuple[str, Dict, datetime]) -> None:
+        """Сдвигает водяной знак вперёд (никогда назад)"""
+        query_key, query_params, value = watermark
+        cur.execute("""
+            INSERT INTO crawl_state (query_key, query_params, watermark, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (query_key) DO UPDATE SET
+                query_params = EXCLUDED.query_params,
+                watermark = GREATEST(crawl_state.watermark, EXCLUDED.watermark),
+                updated_at = CURRENT_TIMESTAMP
+        """, (query_key, json.dumps(query_params, ensure_ascii=False, default=str), value))
+
+    def advance_watermark(self, query_key: str, query_params: Dict, value: datetime) -> None:
+        """Сдвигает водяной знак отдельной транзакцией (если последний пакет пуст)"""
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    self._advance_watermark(cur, (query_key, query_params, value))
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка обновления водяного знака {query_key}: {e}")
+                raise
+
+    # --- Запуски и контрольные точки ---
+
+    def start_run(
+        self,
+        parsed_at: datetime,
+        searches: List[Optional[Dict]],
+        watermark: Optional[Tuple[str, Dict, datetime]] = None,
+        job_name: Optional[str] = None,
+        incremental: bool = False
+    ) -> int:
+        """Регистрирует запуск; незавершённые прошлые запуски задания помечаются abandoned"""
+        watermark_json = None
+        if watermark:
+            query_key, query_params, value = watermark
+            watermark_json = json.dumps(
+                {'query_key': query_key, 'query_params': query_params, 'value': value.isoformat()},
+                ensure_ascii=False, default=str
+            )
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE crawl_runs SET status = 'abandoned', updated_at = CURRENT_TIMESTAMP
+                        WHERE status = 'running' AND job_name IS NOT DISTINCT FROM %s
+                    """, (job_name,))
+                    if cur.rowcount:
+                        logger.warning(f"Незавершённых запусков помечено abandoned: {cur.rowcount}")
+                    cur.execute("""
+                        INSERT INTO crawl_runs (parsed_at, job_name, searches, watermark, incremental)
+                        VALUES (%s, %s, %s, %s, %s)
+                        RETURNING run_id
+                    """, (
+                        parsed_at, job_name,
+                        json.dumps(searches, ensure_ascii=False, default=str), watermark_json, incremental
+                    ))
+                    run_id = cur.fetchone()[0]
+                    conn.commit()
+                logger.info(f"Запуск {run_id}, parsed_at {parsed_at}")
+                return run_id
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка регистрации запуска: {e}")
+                raise
+
+    def find_resumable_run(self, job_name: Optional[str] = None) -> Optional[Dict]:
+        """Последний незавершённый запуск задания с его записанными страницами"""
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT run_id, parsed_at, searches, watermark, incremental FROM crawl_runs
+                    WHERE status = 'running' AND job_name IS NOT DISTINCT FROM %s
+                    ORDER BY started_at DESC
+                    LIMIT 1
+                """, (job_name,))
+                run = cur.fetchone()
+                if run:
+                    cur.execute("""
+                        SELECT search_key, page, pages FROM crawl_checkpoints WHERE run_id = %s
+                    """, (run['run_id'],))
+                    rows = cur.fetchall()
+            conn.commit()
+        if not run:
+            return None
+
+        committed: Dict[str, Dict] = {}
+        for row in rows:
+            entry = committed.setdefault(row['search_key'], {'pages': row['pages'], 'done': set()})
+            entry['done'].add(row['page'])
+        watermark = run['watermark']
+        return {
+            'run_id': run['run_id'],
+            'parsed_at': run['parsed_at'],
+            'searches': run['searches'],
+            'watermark': (
+                watermark['query_key'], watermark['query_params'],
+                datetime.fromisoformat(watermark['value'])
+            ) if watermark else None,
+            'committed': committed,
+            'incremental': run['incremental']
+        }
+
+    def finish_run(self, run_id: int, status: str = 'finished') -> None:
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE crawl_runs
+                        SET status = %s, updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                        WHERE run_id = %s
+                    """, (status, run_id))
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка завершения запуска {run_id}: {e}")
+                raise
+
+    def get_job_states(self) -> Dict[str, Dict]:
+        """Состояние заданий планировщика по имени"""
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute("SELECT * FROM crawl_jobs")
+                rows = cur.fetchall()
+            conn.commit()
+        return {row['job_name']: dict(row) for row in rows}
+
+    def update_job_state(
+        self,
+        job_name: str,
+        started_at: datetime,
+        finished_at: Optional[datetime] = None,
+        status: str = 'running',
+        stats: Optional[Dict] = None
+    ) -> None:
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO crawl_jobs (job_name, last_started_at, last_finished_at, last_status, last_stats)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (job_name) DO UPDATE SET
+                            last_started_at = EXCLUDED.last_started_at,
+                            last_finished_at = COALESCE(EXCLUDED.last_finished_at, crawl_jobs.last_finished_at),
+                            last_status = EXCLUDED.last_status,
+                            last_stats = COALESCE(EXCLUDED.last_stats, crawl_jobs.last_stats)
+                    """, (
+                        job_name, started_at, finished_at, status,
+                        json.dumps(stats, ensure_ascii=False, default=str) if stats else None
+                    ))
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка обновления состояния задания {job_name}: {e}")
+                raise
+
+    @staticmethod
+    def _commit_pages(cur, checkpoint: Tuple[int, List[Tuple[str, int, int, int]]]) -> None:
+        """Отмечает страницы (search_key, page, pages, items) запуска записанными"""
+        run_id, pages = checkpoint
+        if not pages:
+            return
+        extras.execute_values(cur, """
+            INSERT INTO crawl_checkpoints (run_id, search_key, page, pages, items)
+            VALUES %s
+            ON CONFLICT (run_id, search_key, page) DO UPDATE SET
+                items = EXCLUDED.items,
+                committed_at = CURRENT_TIMESTAMP
+        """, [(run_id, key, page, total, items) for key, page, total, items in pages])
+        cur.execute("UPDATE crawl_runs SET updated_at = CURRENT_TIMESTAMP WHERE run_id = %s", (run_id,))
+
+    def record_progress(
+        self,
+        watermark: Optional[Tuple[str, Dict, datetime]] = None,
+        checkpoint: Optional[Tuple[int, List[Tuple[str, int, int, int]]]] = None
+    ) -> None:
+        """Водяной знак и контрольная точка без данных (пустой пакет)"""
+        if not watermark and not (checkpoint and checkpoint[1]):
+            return
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    if watermark:
+                        self._advance_watermark(cur, watermark)
+                    if checkpoint:
+                        self._commit_pages(cur, checkpoint)
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка записи контрольной точки: {e}")
+                raise
+
+    @staticmethod
+    def _collect_rows(records: Iterable) -> Tuple[Dict, List, List, List, set]:
+        """Раскладывает построчные записи на строки таблиц для COPY"""
+        employers = {}
+        vacancies = []
+        roles = []
+        hashes = []
+        parsed_ats = set()
+        for record in records:
+            employer = record['employer']
+            if employer.get('id'):
+                employers[employer['id']] = employer
+            vacancy = record['vacancy']
+            # Записи из records уже упорядочены как VACANCY_COLUMNS
+            if isinstance(vacancy, tuple):
+                vacancies.append(vacancy)
+            else:
+                vacancies.append([vacancy.get(col) for col in VACANCY_COLUMNS])
+            for role_id in record['professional_roles']:
+                roles.append((
+                    vacancy['id'], vacancy['published_at'], vacancy['created_at'],
+                    vacancy['parsed_at'], role_id
+                ))
+            if record.get('content_hash'):
+                hashes.append((vacancy['id'], record['content_hash'], vacancy['parsed_at']))
+            parsed_ats.add(vacancy['parsed_at'])
+        return employers, vacancies, roles, hashes, parsed_ats
+
+    @staticmethod
+    def _update_current(cur, run_id: Optional[int] = None) -> int:
+        """Переносит новые версии пакета в vacancies_current и их роли.
+
+        Вызывается внутри транзакции ingest_batch после записи истории:
+        stage_vacancies к этому моменту содержит только изменившиеся версии,
+        а stage_vacancy_hashes - все вакансии пакета. Более старая версия
+        (например, при повторной загрузке архива) текущую не заменяет.
+        Возвращает число заменённых текущих версий.
+        """
+        vacancy_cols = ', '.join(VACANCY_COLUMNS)
+        vacancy_updates = ', '.join(
+            f"{col} = EXCLUDED.{col}" for col in VACANCY_COLUMNS if col != 'id'
+        )
+        if ROLLUP_CONFIG['enabled']:
+            # Вклад версий, которые будут заменены, вычитается из сводок
+            cur.execute(
+                "INSERT INTO stage_rollup_delta " + ROLLUP_CONTRIBUTIONS.format(sign=-1) + """
+                JOIN (
+                    SELECT id, max(parsed_at) AS parsed_at FROM stage_vacancies GROUP BY id
+                ) s ON s.id = c.id AND c.parsed_at <= s.parsed_at
+            """)
+        cur.execute(f"""
+            WITH upserted AS (
+                INSERT INTO vacancies_current ({vacancy_cols}, last_seen_at, last_run_id, closed_at)
+                SELECT DISTINCT ON (id) {vacancy_cols}, parsed_at, %s::BIGINT, NULL::TIMESTAMP
+                FROM stage_vacancies
+                ORDER BY id, parsed_at DESC
+                ON CONFLICT (id) DO UPDATE SET
+                    {vacancy_updates},
+                    last_seen_at = GREATEST(vacancies_current.last_seen_at, EXCLUDED.last_seen_at),
+                    last_run_id = COALESCE(EXCLUDED.last_run_id, vacancies_current.last_run_id),
+                    closed_at = NULL
+                WHERE vacancies_current.parsed_at <= EXCLUDED.parsed_at
+                RETURNING id, parsed_at
+            )
+            INSERT INTO stage_current_ids SELECT id, parsed_at FROM upserted
+        """, (run_id,))
+        updated = cur.rowcount
+
+        cur.execute("""
+            DELETE FROM vacancy_current_professional_roles r
+            USING stage_current_ids c
+            WHERE r.vacancy_id = c.id
+        """)
+        cur.execute("""
+            INSERT INTO vacancy_current_professional_roles (vacancy_id, professional_role_id)
+            SELECT DISTINCT s.vacancy_id, s.professional_role_id
+            FROM stage_vacancy_professional_roles s
+            JOIN stage_current_ids c ON c.id = s.vacancy_id AND c.parsed_at = s.vacancy_parsed_at
+            ON CONFLICT DO NOTHING
+        """)
+        if ROLLUP_CONFIG['enabled']:
+            cur.execute(
+                "INSERT INTO stage_rollup_delta " + ROLLUP_CONTRIBUTIONS.format(sign=1)
+                + " JOIN stage_current_ids u ON u.id = c.id"
+            )
+            Database._apply_rollups(cur, 'stage_rollup_delta')
+
+        # Неизменившиеся вакансии: только отметка о наблюдении (и повторное открытие)
+        cur.execute("""
+            UPDATE vacancies_current c
+            SET last_seen_at = GREATEST(c.last_seen_at, h.parsed_at),
+                last_run_id = COALESCE(%s, c.last_run_id),
+                closed_at = NULL
+            FROM (
+                SELECT vacancy_id, max(parsed_at) AS parsed_at
+                FROM stage_vacancy_hashes
+                GROUP BY vacancy_id
+            ) h
+            WHERE c.id = h.vacancy_id
+              AND NOT EXISTS (SELECT 1 FROM stage_current_ids u WHERE u.id = c.id)
+        """, (run_id,))
+        return updated
+
+    @staticmethod
+    def _apply_rollups(cur, source: str) -> None:
+        """Прибавляет к сводкам вклады (day, ..., sign, salary_from, salary_to) из source.
+
+        Строки обрабатываются в порядке ключа, чтобы параллельные писатели
+        блокировали общие строки сводок в одном порядке.
+        """
+        dims = ', '.join(ROLLUP_DIMENSIONS)
+        cur.execute(f"""
+            INSERT INTO salary_rollups (
+                {dims}, vacancies, salary_from_count, salary_from_sum,
+                salary_to_count, salary_to_sum
+            )
+            SELECT {dims},
+                   sum(sign),
+                   COALESCE(sum(sign) FILTER (WHERE salary_from > 0), 0),
+                   COALESCE(sum(sign * salary_from::BIGINT) FILTER (WHERE salary_from > 0), 0),
+                   COALESCE(sum(sign) FILTER (WHERE salary_to > 0), 0),
+                   COALESCE(sum(sign * salary_to::BIGINT) FILTER (WHERE salary_to > 0), 0)
+            FROM {source}
+            GROUP BY {dims}
+            ORDER BY {dims}
+            ON CONFLICT ({dims}) DO UPDATE SET
+                vacancies = salary_rollups.vacancies + EXCLUDED.vacancies,
+                salary_from_count = salary_rollups.salary_from_count + EXCLUDED.salary_from_count,
+                salary_from_sum = salary_rollups.salary_from_sum + EXCLUDED.salary_from_sum,
+                salary_to_count = salary_rollups.salary_to_count + EXCLUDED.salary_to_count,
+                salary_to_sum = salary_rollups.salary_to_sum + EXCLUDED.salary_to_sum,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+        cur.execute(f"""
+            INSERT INTO salary_rollup_buckets ({dims}, field, bucket, count)
+            SELECT {dims}, field, bucket, sum(sign)
+            FROM (
+                SELECT {dims}, 'from' AS field,
+                       CEIL(LN(salary_from) / %(ln_gamma)s)::INTEGER AS bucket, sign
+                FROM {source} WHERE salary_from > 0
+                UNION ALL
+                SELECT {dims}, 'to' AS field,
+                       CEIL(LN(salary_to) / %(ln_gamma)s)::INTEGER AS bucket, sign
+                FROM {source} WHERE salary_to > 0
+            ) values_
+            GROUP BY {dims}, field, bucket
+            HAVING sum(sign) <> 0
+            ORDER BY {dims}, field, bucket
+            ON CONFLICT ({dims}, field, bucket) DO UPDATE SET
+                count = salary_rollup_buckets.count + EXCLUDED.count
+        """, {'ln_gamma': SKETCH_LN_GAMMA})
+
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """Пересобирает сводки из vacancies_current (первичное заполнение или смена точности)"""
+        logger.info("Пересборка сводок зарплат...")
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("TRUNCATE salary_rollups, salary_rollup_buckets")
+                    self._apply_rollups(cur, f"({ROLLUP_CONTRIBUTIONS.format(sign=1)}) contributions")
+                    cur.execute("SELECT count(*), COALESCE(sum(vacancies), 0) FROM salary_rollups")
+                    groups, vacancies = cur.fetchone()
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка пересборки сводок: {e}")
+                raise
+        logger.info(f"Сводки пересобраны: групп {groups}, вакансий (с учётом ролей) {vacancies}")
+        return {'groups': groups, 'vacancies': vacancies}
+
+    def query_rollups(
+        self, group_by: Sequence[str], filters: Dict[str, Any]
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Агрегаты сводок и корзины скетчей, сгруппированные по group_by.
+
+        filters: date_from/date_to (день публикации) и значения измерений,
+        None - без фильтра. area_id включает вложенные регионы, если
+        include_subareas не False.
+        """
+        unknown = set(group_by) - set(ROLLUP_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Неизвестные измерения сводок: {sorted(unknown)}")
+
+        conditions = []
+        params = []
+        if filters.get('date_from'):
+            conditions.append("day >= %s")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            conditions.append("day <= %s")
+            params.append(filters['date_to'])
+        for dim in ROLLUP_DIMENSIONS[1:]:
+            if filters.get(dim) is None:
+                continue
+            if dim == 'area_id' and filters.get('include_subareas', True):
+                conditions.append(AREA_SUBTREE.format(column=dim))
+                params.append([filters[dim]])
+            else:
+                conditions.append(f"{dim} = %s")
+                params.append(filters[dim])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        dims = ', '.join(group_by)
+        select_dims = f"{dims}, " if group_by else ''
+        group = f"GROUP BY {dims}" if group_by else ''
+
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(f"""
+                    SELECT {select_dims}
+                           sum(vacancies) AS vacancies,
+                           sum(salary_from_count) AS salary_from_count,
+                           sum(salary_from_sum) AS salary_from_sum,
+                           sum(salary_to_count) AS salary_to_count,
+                           sum(salary_to_sum) AS salary_to_sum
+                    FROM salary_rollups
+                    {where}
+                    {group}
+                    HAVING sum(vacancies) > 0
+                    ORDER BY {dims or 1}
+                """, params)
+                totals = cur.fetchall()
+                cur.execute(f"""
+                    SELECT {select_dims} field, bucket, sum(count) AS count
+                    FROM salary_rollup_buckets
+                    {where}
+                    GROUP BY {select_dims} field, bucket
+                """, params)
+                buckets = cur.fetchall()
+            conn.commit()
+        return totals, buckets
+
+    def search_vacancies(
+        self,
+        text: str,
+        area_ids: Optional[Sequence[int]] = None,
+        professional_role_ids: Optional[Sequence[int]] = None,
+        salary_min: Optional[int] = None,
+        currency: Optional[str] = None,
+        published_from: Optional[datetime] = None,
+        published_to: Optional[datetime] = None,
+        include_closed: bool = False,
+        include_subareas: bool = True,
+        order_by: str = 'relevance',
+        limit: int = 20,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, int]]]:
+        """Полнотекстовый поиск по текущим версиям вакансий.
+
+        text разбирается websearch_to_tsquery ("python -django", "data OR ml",
+        фразы в кавычках). Выдача упорядочена по убыванию релевантности (или
+        даты публикации) и id; страницы листаются курсором из предыдущего
+        ответа (значение сортировки, id) без OFFSET. salary_min сравнивается
+        с верхней границей вилки, а если её нет - с нижней. area_ids по
+        умолчанию включают вложенные регионы (страна, округ, область).
+        Возвращает (вакансии, курсор следующей страницы или None).
+        """
+        if order_by not in SEARCH_ORDERS:
+            raise ValueError(f"Неизвестный порядок выдачи: {order_by}")
+        sort_expr = SEARCH_ORDERS[order_by]
+
+        conditions = ["c.search_vector @@ q.query"]
+        params: List[Any] = [text]
+        if not include_closed:
+            conditions.append("c.closed_at IS NULL")
+        if area_ids:
+            conditions.append(
+                AREA_SUBTREE.format(column='c.area_id') if include_subareas else "c.area_id = ANY(%s)"
+            )
+            params.append(list(area_ids))
+        if professional_role_ids:
+            conditions.append("""EXISTS (
+                SELECT 1 FROM vacancy_current_professional_roles r
+                WHERE r.vacancy_id = c.id AND r.professional_role_id = ANY(%s)
+            )""")
+            params.append(list(professional_role_ids))
+        if salary_min is not None:
+            conditions.append("COALESCE(c.salary_to, c.salary_from) >= %s")
+            params.append(salary_min)
+        if currency:
+            conditions.append("c.salary_currency = %s")
+            params.append(currency)
+        if published_from:
+            conditions.append("c.published_at >= %s")
+            params.append(published_from)
+        if published_to:
+            conditions.append("c.published_at < %s")
+            params.append(published_to)
+        if cursor:
+            # ts_rank_cd возвращает real: сравниваем в том же типе, что и сортировку
+            cast = '::real' if order_by == 'relevance' else ''
+            conditions.append(f"({sort_expr}, c.id) < (%s{cast}, %s)")
+            params.extend(cursor)
+        params.append(limit)
+
+        columns = ', '.join(f"c.{col}" for col in SEARCH_COLUMNS)
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                cur.execute(f"""
+                    SELECT {columns}, {sort_expr} AS sort_key
+                    FROM vacancies_current c,
+                         websearch_to_tsquery('russian', %s) AS q(query)
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY sort_key DESC, c.id DESC
+                    LIMIT %s
+                """, params)
+                rows = [dict(row) for row in cur.fetchall()]
+            conn.commit()
+
+        next_cursor = (rows[-1]['sort_key'], rows[-1]['id']) if len(rows) == limit else None
+        for row in rows:
+            if order_by == 'relevance':
+                row['rank'] = row['sort_key']
+            del row['sort_key']
+        return rows, next_cursor
+
+    def mark_seen_vacancies(self, run_id: int, vacancy_ids: Iterable[int]) -> int:
+        """Отмечает вакансии найденными запуском run_id, не записывая их заново.
+
+        Нужна для вакансий, которые запуск отбросил как уже записанные другим
+        заданием того же цикла: иначе их last_run_id остаётся чужим, и
+        close_missing_vacancies считает их по чужому заданию.
+        """
+        rows = [(vacancy_id,) for vacancy_id in set(vacancy_ids)]
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    self._create_staging_tables(cur)
+                    self._copy_rows(cur, 'stage_seen_ids', ('id',), rows)
+                    cur.execute("""
+                        UPDATE vacancies_current c
+                        SET last_run_id = r.run_id,
+                            last_seen_at = GREATEST(c.last_seen_at, r.parsed_at),
+                            closed_at = NULL
+                        FROM stage_seen_ids s, crawl_runs r
+                        WHERE r.run_id = %s
+                          AND c.id = s.id
+                    """, (run_id,))
+                    marked = cur.rowcount
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка отметки найденных вакансий запуска {run_id}: {e}")
+                raise
+        logger.info(f"Вакансий, найденных запуском {run_id} и записанных другими заданиями: {marked}")
+        return marked
+
+    def close_missing_vacancies(self, run_id: int) -> int:
+        """Закрывает вакансии, не найденные завершённым полным обходом run_id.
+
+        Закрываются открытые вакансии, которые последним видел предыдущий
+        запуск того же задания: область поиска у задания постоянна, поэтому
+        вакансии других заданий не затрагиваются.
+        """
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE vacancies_current c
+                        SET closed_at = r.parsed_at
+                        FROM crawl_runs r, crawl_runs prev
+                        WHERE r.run_id = %s
+                          AND prev.run_id = c.last_run_id
+                          AND prev.run_id <> r.run_id
+                          AND prev.job_name IS NOT DISTINCT FROM r.job_name
+                          AND c.closed_at IS NULL
+                    """, (run_id,))
+                    closed = cur.rowcount
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка закрытия вакансий запуска {run_id}: {e}")
+                raise
+        metrics.DB_ROWS.inc(closed, table='vacancies_current', result='closed')
+        logger.info(f"Вакансий закрыто по итогам запуска {run_id}: {closed}")
+        return closed
+
+    def get_detail_candidates(
+        self, after_id: int, limit: int, fresh_since: datetime
+    ) -> List[Tuple[int, Optional[str]]]:
+        """Открытые вакансии, которым нужна карточка: (id, хеш текущей версии).
+
+        Берутся вакансии без карточки и вакансии, изменившиеся после загрузки
+        карточки, если она загружена раньше fresh_since. Порядок по id,
+        следующая порция - с after_id последней вакансии предыдущей.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.id, h.content_hash
+                    FROM vacancies_current c
+                    LEFT JOIN vacancy_content_hashes h ON h.vacancy_id = c.id
+                    LEFT JOIN vacancy_details d ON d.vacancy_id = c.id
+                    WHERE c.closed_at IS NULL
+                      AND c.id > %s
+                      AND (d.vacancy_id IS NULL
+                           OR (d.content_hash IS DISTINCT FROM h.content_hash AND d.fetched_at < %s))
+                    ORDER BY c.id
+                    LIMIT %s
+                """, (after_id, fresh_since, limit))
+                rows = cur.fetchall()
+            conn.commit()
+        return rows
+
+    @metrics.timed_db('upsert_vacancy_details')
+    def upsert_vacancy_details(self, details: List[Sequence[Any]], skills: List[Sequence[Any]]) -> Dict[str, int]:
+        """Пакетная запись карточек (строки DETAIL_COLUMNS) и их ключевых навыков.
+
+        Навыки вакансий пакета заменяются целиком; у удалённых вакансий
+        (status 404) они просто удаляются.
+        """
+        stats = {'details': 0, 'key_skills': 0}
+        if not details:
+            return stats
+        detail_cols = ', '.join(DETAIL_COLUMNS)
+        detail_updates = ', '.join(
+            f"{col} = EXCLUDED.{col}" for col in DETAIL_COLUMNS if col != 'vacancy_id'
+        )
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    self._create_staging_tables(cur)
+                    self._copy_rows(cur, 'stage_vacancy_details', DETAIL_COLUMNS, details)
+                    self._copy_rows(cur, 'stage_vacancy_key_skills', KEY_SKILL_COLUMNS, skills)
+                    cur.execute(f"""
+                        INSERT INTO vacancy_details ({detail_cols})
+                        SELECT DISTINCT ON (vacancy_id) {detail_cols}
+                        FROM stage_vacancy_details
+                        ORDER BY vacancy_id, fetched_at DESC
+                        ON CONFLICT (vacancy_id) DO UPDATE SET {detail_updates}
+                    """)
+                    stats['details'] = cur.rowcount
+                    cur.execute("""
+                        DELETE FROM vacancy_key_skills s
+                        USING stage_vacancy_details d
+                        WHERE s.vacancy_id = d.vacancy_id
+                    """)
+                    cur.execute("""
+                        INSERT INTO vacancy_key_skills (vacancy_id, name)
+                        SELECT DISTINCT vacancy_id, name FROM stage_vacancy_key_skills
+                        ON CONFLICT DO NOTHING
+                    """)
+                    stats['key_skills'] = cur.rowcount
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка записи {len(details)} карточек вакансий: {e}")
+                raise
+        metrics.DB_ROWS.inc(stats['details'], table='vacancy_details', result='upserted')
+        metrics.DB_ROWS.inc(stats['key_skills'], table='vacancy_key_skills', result='inserted')
+        return stats
+
+    def get_export_snapshots(self) -> List[datetime]:
+        """Снимки (parsed_at) истории, ещё не выгруженные в Parquet.
+
+        Снимки незавершённых запусков пропускаются: --resume продолжает
+        их с тем же parsed_at и допишет строки.
+        """
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                # Различные parsed_at по индексу (loose index scan), без чтения всей истории
+                cur.execute("""
+                    WITH RECURSIVE snapshots AS (
+                        SELECT min(parsed_at) AS parsed_at FROM vacancies
+                        UNION ALL
+                        SELECT (SELECT min(parsed_at) FROM vacancies WHERE parsed_at > s.parsed_at)
+                        FROM snapshots s
+                        WHERE s.parsed_at IS NOT NULL
+                    )
+                    SELECT s.parsed_at
+                    FROM snapshots s
+                    WHERE s.parsed_at IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM export_snapshots e WHERE e.parsed_at = s.parsed_at)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM crawl_runs r
+                          WHERE r.parsed_at = s.parsed_at AND r.status = 'running'
+                      )
+                    ORDER BY s.parsed_at
+                """)
+                rows = [row[0] for row in cur.fetchall()]
+            conn.commit()
+        return rows
+
+    def iter_snapshot(self, parsed_at: datetime, chunk_size: int) -> Iterator[List[Tuple]]:
+        """Строки снимка (колонки EXPORT_COLUMNS) порциями по chunk_size.
+
+        Читает серверным курсором, поэтому в памяти одновременно только одна
+        порция. Строки упорядочены по area_id и id.
+        """
+        columns = ', '.join(
+            f"{col}::float8" if col in ('address_lat', 'address_lng') else col for col in EXPORT_COLUMNS
+        )
+        with self.connection() as conn:
+            try:
+                with conn.cursor(name='export_snapshot') as cur:
+                    cur.itersize = chunk_size
+                    cur.execute(f"""
+                        SELECT {columns}
+                        FROM vacancies
+                        WHERE parsed_at = %s
+                        ORDER BY area_id, id
+                    """, (parsed_at,))
+                    while True:
+                        rows = cur.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def mark_snapshot_exported(self, parsed_at: datetime, rows: int, files: int) -> None:
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO export_snapshots (parsed_at, rows, files)
+                        VALUES (%s, %s, %s)
+                        ON CONFLICT (parsed_at) DO UPDATE SET
+                            rows = EXCLUDED.rows,
+                            files = EXCLUDED.files,
+                            exported_at = CURRENT_TIMESTAMP
+                    """, (parsed_at, rows, files))
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка отметки выгрузки снимка {parsed_at}: {e}")
+                raise
+
+    @metrics.timed_db('ingest_batch')
+    def ingest_batch(
+        self,
+        records: Union[List[Dict], VacancyBatch],
+        watermark: Optional[Tuple[str, Dict, datetime]] = None,
+        checkpoint: Optional[Tuple[int, List[Tuple[str, int, int, int]]]] = None
+    ) -> Dict[str, int]:
+        """Пакетная загрузка нормализованных вакансий.
+
+        Принимает список результатов HHParser.normalize_vacancy (или записей
+        ParsedVacancy из records, или колоночный VacancyBatch - без
+        преобразования в словари), загружает их
+        через COPY во временные таблицы и переносит в employers, vacancies и
+        vacancy_professional_roles set-based запросами в одной транзакции.
+        Вакансии, хеш содержимого которых не изменился с прошлой версии, не
+        создают новых строк: для них обновляется только время последнего
+        наблюдения в vacancy_content_hashes.
+        Если передан watermark (query_key, параметры, значение), он сдвигается
+        в той же транзакции; так же фиксируется checkpoint - (run_id, список
+        страниц (search_key, page, pages, items)), целиком вошедших в пакет.
+        Возвращает количество вставленных и пропущенных строк.
+        """
+        if isinstance(records, VacancyBatch):
+            employers, vacancies, roles, hashes, parsed_ats = records.ingest_rows()
+        else:
+            employers, vacancies, roles, hashes, parsed_ats = self._collect_rows(records)
+
+        stats = {
+            'vacancies_inserted': 0,
+            'vacancies_skipped': 0,
+            'vacancies_unchanged': 0,
+            'employers_inserted': 0,
+            'employers_updated': 0,
+            'employers_cached': 0,
+            'roles_inserted': 0,
+            'roles_skipped': 0,
+            'current_updated': 0,
+        }
+        if not vacancies:
+            self.record_progress(watermark, checkpoint)
+            return stats
+
+        # Работодатели, уже записанные в этой версии, повторно не пишутся
+        pending_employers = self.employer_cache.filter_changed(employers)
+        stats['employers_cached'] = len(employers) - len(pending_employers)
+        employer_rows = [
+            employer if isinstance(employer, tuple) else [employer.get(col) for col in EMPLOYER_COLUMNS]
+            for employer in (employers[employer_id] for employer_id in pending_employers)
+        ]
+
+        # Партиции под все месяцы пакета должны существовать до загрузки
+        for parsed_at in parsed_ats:
+            self.ensure_partitions(parsed_at)
+
+        employer_cols = ', '.join(EMPLOYER_COLUMNS)
+        employer_updates = ', '.join(
+            f"{col} = EXCLUDED.{col}" for col in EMPLOYER_COLUMNS if col != 'id'
+        )
+        vacancy_cols = ', '.join(VACANCY_COLUMNS)
+        role_cols = ', '.join(VACANCY_ROLE_COLUMNS)
+
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    self._create_staging_tables(cur)
+                    self._copy_rows(cur, 'stage_employers', EMPLOYER_COLUMNS, employer_rows)
+                    self._copy_rows(cur, 'stage_vacancies', VACANCY_COLUMNS, vacancies)
+                    self._copy_rows(cur, 'stage_vacancy_professional_roles', VACANCY_ROLE_COLUMNS, roles)
+                    self._copy_rows(cur, 'stage_vacancy_hashes', VACANCY_HASH_COLUMNS, hashes)
+
+                    # Неизменившиеся вакансии не попадают в историю версий; в пакете
+                    # может быть несколько снимков одной вакансии (загрузка архива),
+                    # поэтому хеш сравнивается у каждого снимка отдельно
+                    cur.execute("""
+                        DELETE FROM stage_vacancies s
+                        USING stage_vacancy_hashes h, vacancy_content_hashes c
+                        WHERE h.vacancy_id = s.id
+                          AND h.parsed_at = s.parsed_at
+                          AND c.vacancy_id = s.id
+                          AND c.content_hash = h.content_hash
+                    """)
+                    stats['vacancies_unchanged'] = cur.rowcount
+                    cur.execute("""
+                        DELETE FROM stage_vacancy_professional_roles s
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM stage_vacancies v
+                            WHERE v.id = s.vacancy_id AND v.parsed_at = s.vacancy_parsed_at
+                        )
+                    """)
+                    unchanged_roles = cur.rowcount
+
+                    cur.execute(f"""
+                        INSERT INTO employers ({employer_cols}, updated_at)
+                        SELECT {employer_cols}, CURRENT_TIMESTAMP FROM stage_employers
+                        ON CONFLICT (id) DO UPDATE SET
+                            {employer_updates},
+                            updated_at = CURRENT_TIMESTAMP
+                        RETURNING (xmax = 0) AS inserted
+                    """)
+                    for (inserted,) in cur.fetchall():
+                        stats['employers_inserted' if inserted else 'employers_updated'] += 1
+
+                    cur.execute(f"""
+                        INSERT INTO vacancies ({vacancy_cols})
+                        SELECT DISTINCT ON (id, published_at, created_at, parsed_at) {vacancy_cols}
+                        FROM stage_vacancies
+                        ON CONFLICT (id, published_at, created_at, parsed_at) DO NOTHING
+                    """)
+                    stats['vacancies_inserted'] = cur.rowcount
+                    stats['vacancies_skipped'] = (
+                        len(vacancies) - stats['vacancies_unchanged'] - cur.rowcount
+                    )
+
+                    cur.execute(f"""
+                        INSERT INTO vacancy_professional_roles ({role_cols})
+                        SELECT DISTINCT {role_cols} FROM stage_vacancy_professional_roles
+                        ON CONFLICT DO NOTHING
+                    """)
+                    stats['roles_inserted'] = cur.rowcount
+                    stats['roles_skipped'] = len(roles) - unchanged_roles - cur.rowcount
+
+                    # Индекс последних хешей: для неизменившихся - только отметка о наблюдении;
+                    # более старый снимок (повторная загрузка архива) последний хеш не заменяет
+                    cur.execute("""
+                        INSERT INTO vacancy_content_hashes (
+                            vacancy_id, content_hash, last_changed_at, last_seen_at
+                        )
+                        SELECT DISTINCT ON (vacancy_id) vacancy_id, content_hash, parsed_at, parsed_at
+                        FROM stage_vacancy_hashes
+                        ORDER BY vacancy_id, parsed_at DESC
+                        ON CONFLICT (vacancy_id) DO UPDATE SET
+                            last_changed_at = CASE
+                                WHEN vacancy_content_hashes.content_hash = EXCLUDED.content_hash
+                                THEN vacancy_content_hashes.last_changed_at
+                                ELSE EXCLUDED.last_changed_at
+                            END,
+                            content_hash = EXCLUDED.content_hash,
+                            last_seen_at = GREATEST(vacancy_content_hashes.last_seen_at, EXCLUDED.last_seen_at),
+                            seen_count = vacancy_content_hashes.seen_count + 1
+                        WHERE vacancy_content_hashes.last_seen_at <= EXCLUDED.last_seen_at
+                    """)
+
+                    stats['current_updated'] = self._update_current(
+                        cur, checkpoint[0] if checkpoint else None
+                    )
+
+                    if watermark:
+                        self._advance_watermark(cur, watermark)
+                    if checkpoint:
+                        self._commit_pages(cur, checkpoint)
+
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Ошибка пакетной загрузки {len(vacancies)} вакансий: {e}")
+                raise
+
+        self.employer_cache.store(pending_employers)
+        metrics.DB_ROWS.inc(stats['vacancies_inserted'], table='vacancies', result='inserted')
+        metrics.DB_ROWS.inc(stats['vacancies_skipped'], table='vacancies', result='skipped')
+        metrics.DB_ROWS.inc(stats['vacancies_unchanged'], table='vacancies', result='unchanged')
+        metrics.DB_ROWS.inc(stats['employers_inserted'], table='employers', result='inserted')
+        metrics.DB_ROWS.inc(stats['employers_updated'], table='employers', result='updated')
+        metrics.DB_ROWS.inc(stats['employers_cached'], table='employers', result='cached')
+        metrics.DB_ROWS.inc(stats['roles_inserted'], table='vacancy_professional_roles', result='inserted')
+        logger.debug(f"Пакет загружен: {stats}")
+        return stats
+
     def __enter__(self):
         self.connect()
         return self
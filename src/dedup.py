@@ -0,0 +1,126 @@
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+
+class SeenVacancies:
+    """Множество id вакансий, уже взятых в работу в текущем запуске.
+
+    Общее для всех поисков запуска, поэтому вакансия, найденная несколькими
+    запросами, нормализуется и записывается один раз.
+
+    id хранятся в отсортированном массиве 64-битных целых (8 байт на id
+    вместо ~70 у set из int) и небольшом буфере последних добавленных. Буфер
+    вливается в массив, когда вырастает до 1/8 его размера, поэтому слияния
+    амортизированно дешёвые. Представление компактное, но не ограниченное:
+    память растёт линейно с числом id запуска (около 9 байт на id, при
+    слиянии кратковременно вдвое больше). Забытые id массива не удаляются из
+    него сразу, а помечаются и выбрасываются при следующем слиянии.
+    """
+
+    MIN_BUFFER = 1024
+
+    def __init__(self):
+        self._sorted = array('q')
+        self._buffer = set()
+        # Забытые (discard) id, которые ещё остаются в _sorted
+        self._removed = set()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+        self._repeats: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self._sorted) - len(self._removed) + len(self._buffer)
+
+    def _in_sorted(self, vacancy_id: int) -> bool:
+        index = bisect_left(self._sorted, vacancy_id)
+        return index < len(self._sorted) and self._sorted[index] == vacancy_id
+
+    def _has(self, vacancy_id: int) -> bool:
+        return vacancy_id in self._buffer or (
+            self._in_sorted(vacancy_id) and vacancy_id not in self._removed
+        )
+
+    def __contains__(self, vacancy_id: int) -> bool:
+        with self._lock:
+            return self._has(vacancy_id)
+
+    def _merge(self) -> None:
+        """Вливает буфер в отсортированный массив (слиянием двух отсортированных)
+        и выбрасывает из него забытые id"""
+        pending = sorted(self._buffer)
+        merged = array('q')
+        i = 0
+        for vacancy_id in pending:
+            j = bisect_left(self._sorted, vacancy_id, i)
+            merged.extend(self._kept(i, j))
+            merged.append(vacancy_id)
+            i = j
+        merged.extend(self._kept(i, len(self._sorted)))
+        self._sorted = merged
+        self._buffer.clear()
+        self._removed.clear()
+
+    def _kept(self, start: int, end: int):
+        part = self._sorted[start:end]
+        if not self._removed:
+            return part
+        return array('q', (x for x in part if x not in self._removed))
+
+    def _maybe_merge(self) -> None:
+        if len(self._buffer) + len(self._removed) >= max(self.MIN_BUFFER, len(self._sorted) >> 3):
+            self._merge()
+
+    def add(self, vacancy_id: int) -> bool:
+        """True, если вакансия встретилась впервые"""
+        with self._lock:
+            if self._has(vacancy_id):
+                self.duplicates += 1
+                if self._repeats is not None:
+                    self._repeats.append(vacancy_id)
+                return False
+            if vacancy_id in self._removed:
+                # id ещё в массиве: достаточно снять отметку
+                self._removed.discard(vacancy_id)
+                return True
+            self._buffer.add(vacancy_id)
+            self._maybe_merge()
+            return True
+
+    def track_repeats(self) -> None:
+        """Начинает запоминать id отброшенных повторов (для одного запуска задания)"""
+        with self._lock:
+            self._repeats = array('q')
+
+    def take_repeats(self) -> array:
+        """Возвращает id повторов с track_repeats и перестаёт их запоминать.
+
+        Повтор мог быть записан другим заданием с тем же множеством: запуск,
+        который его отбросил, всё равно должен отметить вакансию найденной.
+        """
+        with self._lock:
+            repeats, self._repeats = self._repeats or array('q'), None
+            return repeats
+
+    def count(self, vacancy_ids: Iterable[int]) -> int:
+        """Сколько из vacancy_ids уже есть в множестве (без добавления)"""
+        with self._lock:
+            return sum(1 for vacancy_id in vacancy_ids if self._has(vacancy_id))
+
+    def discard(self, vacancy_ids: Iterable[int]) -> None:
+        """Забывает вакансии (например, если их пакет не записался).
+
+        Стоит O(k log n) для k id: массив не перестраивается до слияния.
+        """
+        with self._lock:
+            for vacancy_id in vacancy_ids:
+                if vacancy_id in self._buffer:
+                    self._buffer.discard(vacancy_id)
+                elif self._in_sorted(vacancy_id):
+                    self._removed.add(vacancy_id)
+            self._maybe_merge()
+
+    def nbytes(self) -> int:
+        """Примерный объём памяти под id"""
+        return self._sorted.itemsize * len(self._sorted) + 32 * (len(self._buffer) + len(self._removed))
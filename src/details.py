@@ -0,0 +1,172 @@
+"""Обогащение вакансий полными карточками /vacancies/{id}.
+
+Выдача поиска содержит только сниппеты; описание, ключевые навыки и
+контакты есть лишь в карточке вакансии. Карточки запрашиваются только для
+новых и изменившихся открытых вакансий, поэтому повторный запуск (в том
+числе после остановки) продолжает с того, что ещё не загружено.
+
+    python src/details.py
+    python src/details.py --limit 1000 --workers 4 --freshness-hours 48
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config import DETAILS_CONFIG, LOG_CONFIG
+from parser import HHParser
+from rate_limiter import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_detail(
+    vacancy_id: int, vacancy_hash: Optional[str], data: Dict, fetched_at: datetime
+) -> Tuple[tuple, List[tuple]]:
+    """Строка vacancy_details (порядок DETAIL_COLUMNS) и строки vacancy_key_skills.
+
+    Пустой data - вакансия удалена или скрыта (404).
+    """
+    if not data:
+        row = (vacancy_id, vacancy_hash, 404) + (None,) * 9 + (fetched_at,)
+        return row, []
+
+    billing_type = data.get('billing_type') or {}
+    languages = data.get('languages')
+    contacts = data.get('contacts')
+    row = (
+        vacancy_id,
+        vacancy_hash,
+        200,
+        data.get('description'),
+        data.get('branded_description'),
+        json.dumps(contacts, ensure_ascii=False) if contacts else None,
+        json.dumps(languages, ensure_ascii=False) if languages else None,
+        ', '.join(item['id'] for item in data.get('driver_license_types') or [] if item.get('id')) or None,
+        billing_type.get('id'),
+        data.get('code'),
+        data.get('allow_messages'),
+        data.get('archived'),
+        fetched_at
+    )
+    # Навыки без учёта регистра и повторов, в порядке карточки
+    skills = {}
+    for skill in data.get('key_skills') or []:
+        name = (skill.get('name') or '').strip()[:255]
+        if name:
+            skills.setdefault(name.lower(), name)
+    return row, [(vacancy_id, name) for name in skills.values()]
+
+
+class DetailFetcher:
+    """Загрузка карточек вакансий в несколько потоков в пределах общего лимитера.
+
+    Очередь строится из БД порциями по id: вакансия без карточки или
+    изменившаяся после неё (и загруженная раньше окна свежести) попадает в
+    очередь один раз за запуск. Каждая порция записывается одним пакетом,
+    поэтому при остановке теряются только карточки текущей порции, а
+    вакансии, которые не удалось загрузить, остаются в очереди следующего
+    запуска. Потоки делят парсер, но не HTTP-сессию: на время запроса поток
+    берёт свободную сессию из пула парсера.
+    """
+
+    def __init__(
+        self,
+        db,
+        parser: Optional[HHParser] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        freshness_hours: Optional[int] = None
+    ):
+        self.db = db
+        self.parser = parser or HHParser()
+        self.workers = workers or DETAILS_CONFIG['workers']
+        self.batch_size = batch_size or DETAILS_CONFIG['batch_size']
+        self.freshness = timedelta(hours=(
+            DETAILS_CONFIG['freshness_hours'] if freshness_hours is None else freshness_hours
+        ))
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set() or self.parser.stop_event.is_set()
+
+    def _fetch(self, candidate: Tuple[int, Optional[str]]) -> Tuple[int, Optional[str], Optional[Dict]]:
+        vacancy_id, vacancy_hash = candidate
+        if self.stopped:
+            return vacancy_id, vacancy_hash, None
+        try:
+            return vacancy_id, vacancy_hash, self.parser.fetch_vacancy(vacancy_id)
+        except CircuitOpenError as e:
+            # API недоступен: остальные карточки загрузит следующий запуск
+            if not self._stop.is_set():
+                logger.error(f"Остановка загрузки карточек: {e}")
+            self.stop()
+        except Exception as e:
+            logger.error(f"Ошибка загрузки карточки {vacancy_id}: {e}")
+        return vacancy_id, vacancy_hash, None
+
+    def run(self, limit: Optional[int] = None) -> Dict:
+        """Загружает карточки, ожидающие обновления; limit - не больше стольких вакансий"""
+        started = time.perf_counter()
+        fresh_since = datetime.now() - self.freshness
+        stats = {'queued': 0, 'fetched': 0, 'missing': 0, 'failed': 0, 'key_skills': 0}
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='details') as executor:
+            while not self.stopped:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - stats['queued'])
+                if size <= 0:
+                    break
+                candidates = self.db.get_detail_candidates(last_id, size, fresh_since)
+                if not candidates:
+                    break
+                last_id = candidates[-1][0]
+                stats['queued'] += len(candidates)
+
+                details, skills = [], []
+                for vacancy_id, vacancy_hash, data in executor.map(self._fetch, candidates):
+                    if data is None:
+                        stats['failed'] += 1
+                        continue
+                    row, vacancy_skills = normalize_detail(vacancy_id, vacancy_hash, data, datetime.now())
+                    details.append(row)
+                    skills.extend(vacancy_skills)
+                    stats['fetched' if data else 'missing'] += 1
+
+                # Загруженное пишется и при остановке посреди порции
+                stats['key_skills'] += self.db.upsert_vacancy_details(details, skills)['key_skills']
+                logger.info(
+                    f"Карточки до id {last_id}: загружено {stats['fetched']}, "
+                    f"удалено {stats['missing']}, ошибок {stats['failed']}"
+                )
+
+        stats['stopped'] = self.stopped
+        stats['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Загрузка карточек завершена: {stats}")
+        return stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Загрузка полных карточек вакансий')
+    arg_parser.add_argument('--limit', type=int, help='Не больше стольких вакансий за запуск')
+    arg_parser.add_argument('--workers', type=int, help='Потоки загрузки (по умолчанию DETAILS_CONFIG)')
+    arg_parser.add_argument('--freshness-hours', type=int, help='Не перезапрашивать карточки моложе этого')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_CONFIG['level']), format=LOG_CONFIG['format'])
+
+    from database import Database
+    with Database() as db:
+        DetailFetcher(db, workers=args.workers, freshness_hours=args.freshness_hours).run(args.limit)
+
+
+if __name__ == '__main__':
+    main()
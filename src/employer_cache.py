@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Sequence
+
+import metrics
+
+EMPLOYER_CACHE_LOOKUPS = metrics.REGISTRY.register(metrics.Counter(
+    'hh_employer_cache_lookups_total', 'Обращения к кешу работодателей', ('result',)
+))
+
+
+def employer_hash(employer: Dict, columns: Sequence[str]) -> str:
+    """Хеш полей работодателя, которые пишутся в employers"""
+    payload = json.dumps([employer.get(col) for col in columns], ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class EmployerCache:
+    """LRU-кеш id работодателя -> хеш последней записанной версии.
+
+    Кеш пополняется только после успешного commit (write-through), поэтому
+    попадание означает, что в employers уже лежат ровно такие данные и
+    повторная запись не нужна.
+    """
+
+    def __init__(self, columns: Sequence[str], max_size: int):
+        self.columns = tuple(columns)
+        self.max_size = max_size
+        self._entries: 'OrderedDict[int, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.changed = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def filter_changed(self, employers: Dict[int, Dict]) -> Dict[int, str]:
+        """Возвращает {id: хеш} работодателей, которые нужно записать"""
+        pending = {}
+        with self._lock:
+            for employer_id, employer in employers.items():
+                digest = employer_hash(employer, self.columns)
+                cached = self._entries.get(employer_id)
+                if cached == digest:
+                    self._entries.move_to_end(employer_id)
+                    self.hits += 1
+                    EMPLOYER_CACHE_LOOKUPS.inc(result='hit')
+                    continue
+                if cached is None:
+                    self.misses += 1
+                    EMPLOYER_CACHE_LOOKUPS.inc(result='miss')
+                else:
+                    self.changed += 1
+                    EMPLOYER_CACHE_LOOKUPS.inc(result='changed')
+                pending[employer_id] = digest
+        return pending
+
+    def store(self, entries: Dict[int, str]) -> None:
+        """Запоминает записанные версии (вызывается после commit)"""
+        with self._lock:
+            for employer_id, digest in entries.items():
+                self._entries[employer_id] = digest
+                self._entries.move_to_end(employer_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def warm(self, rows: Iterable[Dict]) -> int:
+        """Заполняет кеш строками из таблицы employers"""
+        entries = {row['id']: employer_hash(row, self.columns) for row in rows}
+        self.store(entries)
+        return len(entries)
+
+    def invalidate(self, employer_ids: List[int]) -> None:
+        with self._lock:
+            for employer_id in employer_ids:
+                self._entries.pop(employer_id, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.changed
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'changed': self.changed,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,205 @@
+"""Инкрементальная выгрузка истории вакансий в Parquet.
+
+Каждый снимок (parsed_at) выгружается один раз в файлы
+    <dir>/parsed_date=YYYY-MM-DD/area_id=N/snapshot-YYYYMMDDTHHMMSSffffff.parquet
+(раскладка Hive: pyarrow.dataset, pandas.read_parquet, Spark и DuckDB
+восстанавливают area_id из пути и отбрасывают ненужные разделы).
+
+    python src/export.py                     # все ещё не выгруженные снимки
+    python src/export.py --dir /data/hh --limit 10
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import EXPORT_CONFIG, LOG_CONFIG
+from records import VACANCY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Типы колонок, отличные от строки
+COLUMN_TYPES = {
+    'id': pa.int64(),
+    'published_at': pa.timestamp('us'),
+    'created_at': pa.timestamp('us'),
+    'parsed_at': pa.timestamp('us'),
+    'area_id': pa.int32(),
+    'employer_id': pa.int32(),
+    'salary_from': pa.int32(),
+    'salary_to': pa.int32(),
+    'address_lat': pa.float64(),
+    'address_lng': pa.float64(),
+    'address_id': pa.int64(),
+    **{
+        name: pa.bool_() for name in (
+            'premium', 'has_test', 'response_letter_required', 'archived', 'salary_gross',
+            'accept_temporary', 'accept_incomplete_resumes', 'show_logo_in_search', 'show_contacts',
+            'is_adv_vacancy', 'internship', 'night_shifts'
+        )
+    }
+}
+
+# Колонки с небольшим числом различных значений: словарное кодирование и в
+# файле, и в памяти (pandas читает их как category)
+DICTIONARY_COLUMNS = (
+    'salary_currency', 'vacancy_type', 'vacancy_type_name', 'schedule_id', 'schedule_name',
+    'experience_id', 'experience_name', 'employment_id', 'employment_name', 'employment_form_id',
+    'employment_form_name', 'address_city', 'working_days', 'working_time_intervals',
+    'working_time_modes', 'working_hours', 'work_schedule_by_days', 'fly_in_fly_out_duration',
+    'work_format'
+)
+
+# Колонка раздела хранится в пути, а не в файле
+PARTITION_COLUMN = 'area_id'
+
+# Значение раздела для NULL (как у Hive и pyarrow)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def _temp_path(path: str) -> str:
+    """Имя недописанного файла: с точкой в начале, читатели набора его пропускают"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp")
+
+
+def _column_type(name: str) -> pa.DataType:
+    if name in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    return COLUMN_TYPES.get(name, pa.string())
+
+
+FILE_COLUMNS = tuple(name for name in VACANCY_FIELDS if name != PARTITION_COLUMN)
+
+FILE_SCHEMA = pa.schema([(name, _column_type(name)) for name in FILE_COLUMNS])
+
+_PARTITION_INDEX = VACANCY_FIELDS.index(PARTITION_COLUMN)
+_FILE_INDEXES = tuple(VACANCY_FIELDS.index(name) for name in FILE_COLUMNS)
+
+
+def to_table(rows: Sequence[Tuple]) -> pa.Table:
+    """Порция строк (порядок VACANCY_FIELDS) -> таблица Arrow по FILE_SCHEMA"""
+    arrays = []
+    for index, field in zip(_FILE_INDEXES, FILE_SCHEMA):
+        values = [row[index] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=FILE_SCHEMA)
+
+
+class SnapshotExporter:
+    """Выгружает ещё не выгруженные снимки истории в Parquet.
+
+    Снимок читается серверным курсором порциями по chunk_size строк,
+    упорядоченными по региону, поэтому одновременно открыт один файл, а
+    память не зависит от размера истории. Файл пишется под временным именем
+    и переименовывается после закрытия; снимок отмечается выгруженным
+    только после всех своих файлов, а повторная выгрузка перезаписывает те
+    же файлы.
+    """
+
+    def __init__(
+        self,
+        db,
+        directory: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        compression: Optional[str] = None
+    ):
+        self.db = db
+        self.directory = directory or EXPORT_CONFIG['dir']
+        self.chunk_size = chunk_size or EXPORT_CONFIG['chunk_size']
+        self.compression = compression or EXPORT_CONFIG['compression']
+
+    def snapshot_path(self, parsed_at: datetime, area_id: Optional[int]) -> str:
+        area = NULL_PARTITION if area_id is None else area_id
+        return os.path.join(
+            self.directory,
+            f"parsed_date={parsed_at:%Y-%m-%d}",
+            f"{PARTITION_COLUMN}={area}",
+            f"snapshot-{parsed_at:%Y%m%dT%H%M%S%f}.parquet"
+        )
+
+    def _open(self, path: str) -> pq.ParquetWriter:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return pq.ParquetWriter(
+            _temp_path(path),
+            FILE_SCHEMA,
+            compression=self.compression,
+            use_dictionary=list(DICTIONARY_COLUMNS)
+        )
+
+    def export_snapshot(self, parsed_at: datetime) -> Tuple[int, int]:
+        """Выгружает один снимок; возвращает (строк, файлов)"""
+        rows_total = 0
+        files: List[str] = []
+        writer: Optional[pq.ParquetWriter] = None
+        current = None
+        try:
+            for rows in self.db.iter_snapshot(parsed_at, self.chunk_size):
+                rows_total += len(rows)
+                start = 0
+                # Порция делится на отрезки одного региона (строки упорядочены по area_id)
+                for end in range(1, len(rows) + 1):
+                    if end < len(rows) and rows[end][_PARTITION_INDEX] == rows[start][_PARTITION_INDEX]:
+                        continue
+                    area_id = rows[start][_PARTITION_INDEX]
+                    if writer is None or area_id != current:
+                        if writer is not None:
+                            writer.close()
+                            os.replace(_temp_path(files[-1]), files[-1])
+                        current = area_id
+                        files.append(self.snapshot_path(parsed_at, area_id))
+                        writer = self._open(files[-1])
+                    writer.write_table(to_table(rows[start:end]))
+                    start = end
+            if writer is not None:
+                writer.close()
+                os.replace(_temp_path(files[-1]), files[-1])
+                writer = None
+        finally:
+            if writer is not None:
+                writer.close()
+                os.remove(_temp_path(files[-1]))
+        return rows_total, len(files)
+
+    def run(self, limit: Optional[int] = None) -> Dict:
+        """Выгружает снимки, которых ещё нет в export_snapshots"""
+        started = time.perf_counter()
+        snapshots = self.db.get_export_snapshots()[:limit]
+        logger.info(f"Снимков к выгрузке: {len(snapshots)} в {self.directory}")
+        stats = {'snapshots': 0, 'rows': 0, 'files': 0}
+        for parsed_at in snapshots:
+            rows, files = self.export_snapshot(parsed_at)
+            self.db.mark_snapshot_exported(parsed_at, rows, files)
+            stats['snapshots'] += 1
+            stats['rows'] += rows
+            stats['files'] += files
+            logger.info(f"Снимок {parsed_at} выгружен: {rows} строк, {files} файлов")
+        stats['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Выгрузка завершена: {stats}")
+        return stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Выгрузка истории вакансий в Parquet')
+    arg_parser.add_argument('--dir', help='Каталог выгрузки (по умолчанию EXPORT_CONFIG)')
+    arg_parser.add_argument('--chunk-size', type=int, help='Строк в порции серверного курсора')
+    arg_parser.add_argument('--limit', type=int, help='Не больше стольких снимков за запуск')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_CONFIG['level']), format=LOG_CONFIG['format'])
+
+    from database import Database
+    with Database() as db:
+        SnapshotExporter(db, args.dir, args.chunk_size).run(args.limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+from config import PARSER_CONFIG, SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Ключи поиска, которые можно задать в задании (остальные берутся из PARSER_CONFIG)
+JOB_SEARCH_KEYS = (
+    'area', 'text', 'search_field', 'experience', 'employment', 'schedule',
+    'professional_role', 'order_by'
+)
+
+
+class CrawlJob:
+    """Сохранённый поиск: параметры, приоритет и интервал обновления"""
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        search: Optional[Dict] = None,
+        priority: int = 0,
+        interval_minutes: int = 60,
+        incremental: Optional[bool] = None,
+        partition: Optional[bool] = None
+    ):
+        self.name = name
+        self.search = search or None
+        self.priority = priority
+        self.interval_minutes = interval_minutes
+        self.incremental = PARSER_CONFIG['incremental'] if incremental is None else incremental
+        self.partition = PARSER_CONFIG['partition'] if partition is None else partition
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CrawlJob':
+        search = data.get('search') or {}
+        unknown = set(search) - set(JOB_SEARCH_KEYS)
+        if unknown:
+            raise ValueError(f"Задание {data.get('name')}: неизвестные параметры поиска {sorted(unknown)}")
+        if isinstance(search.get('area'), (str, int)):
+            search['area'] = [str(search['area'])]
+        return cls(
+            name=data['name'],
+            search=search,
+            priority=int(data.get('priority', 0)),
+            interval_minutes=int(data.get('interval_minutes', SCHEDULER_CONFIG['default_interval_minutes'])),
+            incremental=data.get('incremental'),
+            partition=data.get('partition')
+        )
+
+    def __repr__(self) -> str:
+        return f"CrawlJob({self.name!r}, priority={self.priority}, interval={self.interval_minutes}m)"
+
+
+def load_jobs(path: Optional[str] = None) -> List[CrawlJob]:
+    """Читает файл заданий (JSON: {"jobs": [...]}), сортирует по приоритету"""
+    path = path or SCHEDULER_CONFIG['jobs_file']
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    jobs = [CrawlJob.from_dict(item) for item in data.get('jobs', [])]
+    names = [job.name for job in jobs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Повторяющиеся имена заданий: {sorted(duplicates)}")
+
+    jobs.sort(key=lambda job: -job.priority)
+    logger.info(f"Загружено заданий: {len(jobs)} из {path}")
+    return jobs
@@ -0,0 +1,283 @@
+import bisect
+import functools
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм (секунды)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CPU_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01)
+
+
+def _label_key(names: Sequence[str], labels: Dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, '')) for name in names)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Монотонный счётчик с метками"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labels, labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {'/'.join(key) or 'total': value for key, value in sorted(self._values.items())}
+
+
+class Gauge(Counter):
+    """Текущее значение с метками"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labels, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (совместима с Prometheus)"""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счётчики по корзинам (+Inf последней), сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labels, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (float('inf'),), counts):
+            if seen + count >= rank and count:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for upper, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = 'le="+Inf"' if upper == float('inf') else f'le="{upper!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+    def summary(self) -> Dict:
+        result = {}
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            result['/'.join(key) or 'total'] = {
+                'count': count,
+                'sum': round(total, 3),
+                'avg': round(total / count, 6) if count else 0.0,
+                'p50': round(self._quantile(counts, count, 0.5), 6),
+                'p95': round(self._quantile(counts, count, 0.95), 6),
+                'p99': round(self._quantile(counts, count, 0.99), 6)
+            }
+        return result
+
+
+class Registry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self.started = time.monotonic()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        """Сводка за время работы процесса"""
+        elapsed = time.monotonic() - self.started
+        report = {'elapsed_seconds': round(elapsed, 1)}
+        for name, metric in self._metrics.items():
+            data = metric.summary()
+            if data:
+                report[name] = data
+        report['rows_per_sec'] = round(DB_ROWS.total() / elapsed, 1) if elapsed else 0.0
+        report['vacancies_per_sec'] = round(NORMALIZED_VACANCIES.total() / elapsed, 1) if elapsed else 0.0
+        return report
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'hh_http_request_seconds', 'Длительность запросов к HH API', ('endpoint', 'status')
+))
+HTTP_ERRORS = REGISTRY.register(Counter(
+    'hh_http_errors_total', 'Ошибки запросов к HH API', ('endpoint', 'kind')
+))
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Counter(
+    'hh_rate_limit_wait_seconds_total', 'Время ожидания токенов лимитера'
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    'hh_rate_limited_total', 'Ответы 429 Too Many Requests', ('endpoint',)
+))
+BACKOFF_SECONDS = REGISTRY.register(Counter(
+    'hh_backoff_seconds_total', 'Время ожидания после 429 и повторов', ('endpoint',)
+))
+HTTP_RETRIES = REGISTRY.register(Counter(
+    'hh_http_retries_total', 'Повторы запросов к HH API', ('endpoint', 'kind')
+))
+RATE_LIMIT_CURRENT = REGISTRY.register(Gauge(
+    'hh_rate_limit_current', 'Текущая скорость адаптивного лимитера, запросов/с'
+))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    'hh_circuit_state', 'Состояние цепи запросов: 0 - замкнута, 1 - пробная, 2 - разомкнута'
+))
+NORMALIZE_SECONDS = REGISTRY.register(Histogram(
+    'hh_normalize_seconds', 'Длительность normalize_vacancy', buckets=CPU_BUCKETS
+))
+NORMALIZED_VACANCIES = REGISTRY.register(Counter(
+    'hh_normalized_vacancies_total', 'Нормализованные вакансии'
+))
+DB_OPERATION_SECONDS = REGISTRY.register(Histogram(
+    'hh_db_operation_seconds', 'Длительность операций записи (включая commit)', ('operation',)
+))
+DB_ROWS = REGISTRY.register(Counter(
+    'hh_db_rows_total', 'Строки, обработанные при загрузке', ('table', 'result')
+))
+DB_ERRORS = REGISTRY.register(Counter(
+    'hh_db_errors_total', 'Ошибки операций с БД', ('operation',)
+))
+
+_ID_RE = re.compile(r'/\d+')
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Убирает идентификаторы из пути: /vacancies/123 -> /vacancies/{id}"""
+    return _ID_RE.sub('/{id}', endpoint)
+
+
+def timed_db(operation: str):
+    """Декоратор: время операции с БД и счётчик ошибок"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc(operation=operation)
+                raise
+            finally:
+                DB_OPERATION_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        return wrapper
+
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_http_server(port: int, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+    """Запускает локальный endpoint /metrics в фоновом потоке"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Метрики доступны на http://{host}:{server.server_address[1]}/metrics")
+    return server
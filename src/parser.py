@@ -1,64 +1,334 @@
+import hashlib
+import json
 import requests
+import threading
 import time
 import logging
-from typing import List, Dict, Optional, Generator
+from typing import List, Dict, Optional, Generator, Set, Tuple, Union
 from datetime import datetime
 from config import HH_API_CONFIG, PARSER_CONFIG
+from rate_limiter import TokenBucket, backoff_delay, get_shared_bucket, retry_after_seconds
+import metrics
+import columnar
+from archive import ResponseArchive, get_shared_archive
+from dedup import SeenVacancies
+from records import ParsedVacancy, decode_vacancy, loads
 
 logger = logging.getLogger(__name__)
 
+HEADERS = {
+    'User-Agent': 'HH Parser/1.0 (febqij@gmail.com)',
+    'HH-User-Agent': 'HHParser/1.0 (febqij@gmail.com)'
+}
+
+
+# Дополнительные фильтры /vacancies, которые передаются как есть
+EXTRA_SEARCH_PARAMS = ('professional_role', 'date_from', 'date_to', 'order_by')
+
+
+def build_search_params(page: int = 0, search: Optional[Dict] = None, per_page: Optional[int] = None) -> Dict:
+    """Формирует параметры запроса к /vacancies.
+
+    По умолчанию параметры поиска берутся из PARSER_CONFIG, но их можно
+    переопределить словарём `search` с теми же ключами, а также добавить
+    фильтры из EXTRA_SEARCH_PARAMS.
+    """
+    search = {**PARSER_CONFIG, **(search or {})}
+    params = {
+        'page': page,
+        'per_page': per_page or HH_API_CONFIG['per_page']
+    }
+    
+    # Обработка множественных регионов
+    areas = search['area']
+    if isinstance(areas, list):
+        # Для множественных регионов используем каждый отдельно
+        for area in areas:
+            area = str(area).strip()
+            if area:
+                # HH API принимает несколько area параметров
+                if 'area' not in params:
+                    params['area'] = []
+                params['area'].append(area)
+    else:
+        params['area'] = areas
+
+    # Добавление опциональных параметров
+    if search['text']:
+        params['text'] = search['text']
+        params['search_field'] = search['search_field']
+    
+    if search['experience']:
+        params['experience'] = search['experience']
+    
+    if search['employment']:
+        params['employment'] = search['employment']
+    
+    if search['schedule']:
+        params['schedule'] = search['schedule']
+    
+    for key in EXTRA_SEARCH_PARAMS:
+        if search.get(key):
+            params[key] = search[key]
+    
+    return params
+
+
+def search_identity(search: Optional[Dict] = None) -> Dict:
+    """Параметры поиска без пагинации и окна дат"""
+    params = build_search_params(0, search)
+    for key in ('page', 'per_page', 'date_from', 'date_to'):
+        params.pop(key, None)
+    return params
+
+
+def query_key(search: Optional[Dict] = None) -> str:
+    """Стабильный ключ поискового запроса (без пагинации и окна дат)"""
+    payload = json.dumps(search_identity(search), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def search_key(search: Optional[Dict] = None) -> str:
+    """Ключ конкретного поиска (включая окно дат) для контрольных точек"""
+    params = build_search_params(0, search)
+    params.pop('page', None)
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# Декодеры, которые разбирают JSON через records.loads и строят записи records
+RECORD_DECODERS = ('records', 'columnar')
+
+
+# Счётчики сдвига выдачи за запуск: страниц со сдвигом вверх, перечитанных страниц,
+# повторов между страницами, возвращённых вакансий, сдвигов, возвращённых не полностью
+DRIFT_STATS = ('pages', 'refetches', 'overlap', 'recovered', 'lost')
+
+
+def unseen_items(items: List[Dict], seen: Optional[SeenVacancies]) -> List[Dict]:
+    """Сырые вакансии страницы без уже взятых в работу в этом запуске (до нормализации)"""
+    if seen is None:
+        return items
+    return [item for item in items if seen.add(int(item['id']))]
+
+
+# Поля, не влияющие на содержимое версии вакансии
+HASH_EXCLUDED_FIELDS = ('parsed_at',)
+
+
+def content_hash(vacancy_data: Dict, professional_roles: List[int]) -> str:
+    """Стабильный хеш нормализованных полей вакансии и её ролей"""
+    payload = [
+        [key, vacancy_data[key]] for key in sorted(vacancy_data)
+        if key not in HASH_EXCLUDED_FIELDS
+    ]
+    payload.append(['professional_roles', sorted(professional_roles)])
+    encoded = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
 class HHParser:
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: Optional[TokenBucket] = None,
+        decoder: Optional[str] = None,
+        archive: Optional[ResponseArchive] = None
+    ):
         self.base_url = HH_API_CONFIG['base_url']
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'HH Parser/1.0 (febqij@gmail.com)',
-            'HH-User-Agent': 'HHParser/1.0 (febqij@gmail.com)'
-        })
+        # dict - словари normalize_vacancy, records - записи из records,
+        # columnar - постраничные колоночные пакеты из columnar
+        self.decoder = decoder or PARSER_CONFIG['decoder']
+        # Пул HTTP-сессий (см. _acquire_session)
+        self._sessions: List[requests.Session] = []
+        self._idle_sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or get_shared_bucket()
+        # Архив сырых ответов (ARCHIVE_CONFIG), None - не сохранять
+        self.archive = archive or get_shared_archive()
         self.parsed_at = datetime.now()
+        # Остановка обхода между страницами (например, по SIGTERM в демоне)
+        self.stop_event = threading.Event()
+        # Найдено вакансий по каждому поиску запуска (search_key -> found с первой страницы)
+        self.found: Dict[str, int] = {}
+        # id вакансий на уже полученных страницах каждого поиска (для обнаружения сдвига выдачи)
+        self._search_ids: Dict[str, SeenVacancies] = {}
+        # Последний found и номера полученных страниц каждого поиска
+        self._search_found: Dict[str, int] = {}
+        self._search_pages: Dict[str, Set[int]] = {}
+        self._drift_lock = threading.Lock()
+        self.drift: Dict[str, int] = dict.fromkeys(DRIFT_STATS, 0)
+    
+    def _acquire_session(self) -> requests.Session:
+        """Берёт свободную HTTP-сессию из пула парсера.
+
+        requests.Session не потокобезопасна, а один парсер используют потоки
+        конвейера и загрузки карточек, поэтому на время запроса поток
+        получает сессию в исключительное пользование. Сессии принадлежат
+        парсеру, а не потокам: новые пулы потоков в каждом цикле демона
+        получают уже открытые соединения, а сессий не больше, чем запросов,
+        выполнявшихся одновременно.
+        """
+        with self._sessions_lock:
+            if self._idle_sessions:
+                return self._idle_sessions.pop()
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            self._sessions.append(session)
+            return session
+    
+    def _release_session(self, session: requests.Session) -> None:
+        with self._sessions_lock:
+            self._idle_sessions.append(session)
+    
+    def close(self) -> None:
+        """Закрывает HTTP-сессии парсера и их соединения"""
+        with self._sessions_lock:
+            sessions, self._sessions, self._idle_sessions = self._sessions, [], []
+        for session in sessions:
+            session.close()
+    
+    def reset_run(self) -> None:
+        """Сбрасывает состояние поисков перед новым запуском"""
+        self.found = {}
+        with self._drift_lock:
+            self._search_ids = {}
+            self._search_found = {}
+            self._search_pages = {}
+            self.drift = dict.fromkeys(DRIFT_STATS, 0)
     
-    def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
-        """Выполняет GET-запрос с обработкой ошибок"""
+    def stop(self) -> None:
+        """Прекращает запрос новых страниц; уже полученные будут отданы"""
+        self.stop_event.set()
+    
+    def _make_request(
+        self, endpoint: str, params: Optional[Dict] = None, allow_missing: bool = False
+    ) -> Optional[Dict]:
+        """Выполняет GET-запрос с обработкой ошибок.
+
+        429, 5xx, таймауты и ошибки соединения повторяются не более
+        max_retries раз; при разомкнутой цепи лимитера бросает CircuitOpenError.
+        С allow_missing ответ 404 возвращается как {} (ресурс удалён), а не None.
+        """
         url = f"{self.base_url}{endpoint}"
+        label = metrics.endpoint_label(endpoint)
+        attempts = HH_API_CONFIG['max_retries'] + 1
         
-        try:
-            response = self.session.get(
-                url, 
-                params=params, 
-                timeout=HH_API_CONFIG['timeout']
-            )
-            response.raise_for_status()
-            
+        for attempt in range(attempts):
             # Соблюдение rate limit
-            time.sleep(HH_API_CONFIG['delay_between_requests'])
+            self.rate_limiter.check()
+            metrics.RATE_LIMIT_WAIT_SECONDS.inc(self.rate_limiter.acquire())
+            started = time.perf_counter()
             
-            return response.json()
-            
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:
-                logger.warning("Rate limit превышен, ожидание 60 секунд...")
-                time.sleep(60)
-                return self._make_request(endpoint, params)
-            elif response.status_code == 400:
-                logger.error(f"HTTP 400 Bad Request: {response.text}")
-                logger.error(f"Request URL: {response.url}")
-                logger.error(f"Request params: {params}\n")
+            session = self._acquire_session()
+            try:
+                response = session.get(
+                    url, 
+                    params=params, 
+                    timeout=HH_API_CONFIG['timeout']
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                kind = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection'
+                data, delay = None, self._failed_attempt(
+                    url, label, kind, time.perf_counter() - started, attempt, attempts, e
+                )
+            except requests.exceptions.RequestException as e:
+                metrics.HTTP_ERRORS.inc(endpoint=label, kind='request')
+                logger.error(f"Ошибка запроса: {e}")
                 return None
             else:
-                logger.error(f"\nHTTP ошибка {response.status_code}: {e}\n")
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"Ошибка подключения: {e}")
-            return None
-            
-        except requests.exceptions.Timeout:
-            logger.error(f"Таймаут запроса к {url}")
-            return None
+                data, delay = self._handle_response(
+                    endpoint, params, label, response.status_code, time.perf_counter() - started,
+                    response.content, response.headers.get('Retry-After'), attempt, attempts, allow_missing
+                )
+            finally:
+                # Тело ответа уже прочитано, соединение вернулось в пул сессии
+                self._release_session(session)
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка запроса: {e}")
+            # Ожидание прерывается остановкой обхода
+            if delay is None or self.stop_event.wait(delay):
+                return data
+        
+        return None
+    
+    def _failed_attempt(
+        self, url: str, label: str, kind: str, elapsed: float, attempt: int, attempts: int, error: Exception
+    ) -> Optional[float]:
+        """Учитывает таймаут или ошибку соединения; задержка перед повтором (None - не повторять)"""
+        metrics.HTTP_ERRORS.inc(endpoint=label, kind=kind)
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=label, status=kind)
+        self.rate_limiter.record(None, elapsed)
+        logger.warning(f"Ошибка запроса к {url} ({kind}, попытка {attempt + 1} из {attempts}): {error}")
+        return self._retry_delay(attempt, attempts, label, kind)
+    
+    def _handle_response(
+        self,
+        endpoint: str,
+        params: Optional[Dict],
+        label: str,
+        status: int,
+        elapsed: float,
+        body: bytes,
+        retry_after_header: Optional[str],
+        attempt: int,
+        attempts: int,
+        allow_missing: bool = False
+    ) -> Tuple[Optional[Dict], Optional[float]]:
+        """Разбирает ответ API, общий для синхронного и асинхронного клиента.
+
+        Возвращает (данные, None), если ответ окончательный (None - ошибка),
+        и (None, задержка), если запрос нужно повторить после задержки.
+        """
+        url = f"{self.base_url}{endpoint}"
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, endpoint=label, status=status)
+        self.rate_limiter.record(status, elapsed)
+        
+        if status < 400:
+            if self.archive:
+                self.archive.append(endpoint, params, body, self.parsed_at)
+            if self.decoder in RECORD_DECODERS:
+                return loads(body), None
+            return json.loads(body), None
+        
+        metrics.HTTP_ERRORS.inc(endpoint=label, kind=f"http_{status}")
+        if status == 429 or status >= 500:
+            retry_after = retry_after_seconds(retry_after_header)
+            if status == 429:
+                metrics.RATE_LIMITED.inc(endpoint=label)
+            logger.warning(
+                f"HTTP {status} от {url} (попытка {attempt + 1} из {attempts}"
+                f"{f', Retry-After {retry_after:g} с' if retry_after is not None else ''})"
+            )
+            return None, self._retry_delay(attempt, attempts, label, f"http_{status}", retry_after)
+        if status == 404 and allow_missing:
+            return {}, None
+        if status == 400:
+            logger.error(f"HTTP 400 Bad Request: {body.decode('utf-8', 'replace')}")
+            logger.error(f"Request URL: {url}")
+            logger.error(f"Request params: {params}\n")
+        else:
+            logger.error(f"\nHTTP ошибка {status}: {url}\n")
+        return None, None
+    
+    def _retry_delay(
+        self, attempt: int, attempts: int, label: str, kind: str, retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """Собственная задержка перед повтором (None - попытки исчерпаны).
+
+        Retry-After относится ко всем запросам процесса, поэтому он
+        приостанавливает общий лимитер, и отдельно ждать не нужно.
+        """
+        if attempt + 1 >= attempts:
+            logger.error(f"Исчерпаны попытки запроса ({kind})")
             return None
+        metrics.HTTP_RETRIES.inc(endpoint=label, kind=kind)
+        if retry_after is not None:
+            delay = min(retry_after, HH_API_CONFIG['retry_after_max_seconds'])
+            self.rate_limiter.pause(delay)
+            metrics.BACKOFF_SECONDS.inc(delay, endpoint=label)
+            return 0.0
+        delay = backoff_delay(attempt)
+        metrics.BACKOFF_SECONDS.inc(delay, endpoint=label)
+        return delay
     
     def fetch_areas(self) -> List[Dict]:
         """Получает список всех регионов с дополнительными данными"""
@@ -120,78 +390,240 @@ class HHParser:
         logger.info(f"Загружено {len(categories)} категорий и {len(roles)} ролей")
         return categories, roles
     
-    def fetch_vacancies(self, page: int = 0) -> Optional[Dict]:
+    def fetch_vacancies(self, page: int = 0, search: Optional[Dict] = None) -> Optional[Dict]:
         """Получает страницу вакансий"""
-        params = {
-            'page': page,
-            'per_page': HH_API_CONFIG['per_page']
-        }
-        
-        # Обработка множественных регионов
-        areas = PARSER_CONFIG['area']
-        if isinstance(areas, list):
-            # Для множественных регионов используем каждый отдельно
-            for area in areas:
-                area = area.strip()
-                if area:
-                    # HH API принимает несколько area параметров
-                    if 'area' not in params:
-                        params['area'] = []
-                    params['area'].append(area)
-        else:
-            params['area'] = areas
-
-        # Добавление опциональных параметров
-        if PARSER_CONFIG['text']:
-            params['text'] = PARSER_CONFIG['text']
-            params['search_field'] = PARSER_CONFIG['search_field']
-        
-        if PARSER_CONFIG['experience']:
-            params['experience'] = PARSER_CONFIG['experience']
-        
-        if PARSER_CONFIG['employment']:
-            params['employment'] = PARSER_CONFIG['employment']
-        
-        if PARSER_CONFIG['schedule']:
-            params['schedule'] = PARSER_CONFIG['schedule']
-        
+        params = build_search_params(page, search)
         logger.info(f"Загрузка страницы {page} с параметрами: {params}")
-        return self._make_request(HH_API_CONFIG['vacancies_endpoint'], params)
+        data = self._make_request(HH_API_CONFIG['vacancies_endpoint'], params)
+        if page == 0 and data:
+            self.found[search_key(search)] = data.get('found', 0)
+        return data
     
-    def parse_all_vacancies(self) -> Generator[Dict, None, None]:
-        """Парсит все вакансии постранично"""
-        page = 0
-        total_found = None
+    def fetch_found(self, search: Optional[Dict] = None) -> Optional[int]:
+        """Число найденных по поиску вакансий (запрос одной вакансии); None - ошибка"""
+        params = build_search_params(0, search, per_page=1)
+        data = self._make_request(HH_API_CONFIG['vacancies_endpoint'], params)
+        if not data:
+            return None
+        return data.get('found', 0)
+    
+    def _accept_page(self, search: Optional[Dict], page: int, data: Dict) -> int:
+        """Запоминает полученную страницу поиска.
+
+        Возвращает, на сколько вакансий выдача сдвинулась вверх, на уже
+        полученные страницы: повторы с ними означают сдвиг вниз, и если found
+        вырос меньше, чем на число повторов (или уменьшился), столько же
+        вакансий ушло на предыдущие страницы и было бы пропущено.
+        """
+        key = search_key(search)
+        ids = [int(item['id']) for item in data['items']]
+        with self._drift_lock:
+            search_ids = self._search_ids.setdefault(key, SeenVacancies())
+            overlap = search_ids.count(ids)
+            found = data.get('found', 0)
+            previous = self._search_found.get(key, found)
+            self._search_found[key] = found
+            self._search_pages.setdefault(key, set()).add(page)
+            for vacancy_id in ids:
+                search_ids.add(vacancy_id)
+            self.drift['overlap'] += overlap
+            shifted = overlap + previous - found
+            if shifted <= 0:
+                return 0
+            self.drift['pages'] += 1
+        logger.warning(
+            f"Сдвиг выдачи на странице {page}: около {shifted} вакансий ушли на предыдущие страницы, "
+            f"повторный обход"
+        )
+        return shifted
+
+    def _rewalk_pages(self, search: Optional[Dict], page: int) -> Tuple[List[int], bool]:
+        """Уже полученные страницы перед page, ближайшие первыми (не больше drift_retries).
+
+        Вторым значением - осталась ли за лимитом ещё полученная страница.
+        Страницы, которые ещё не запрошены, сдвинутые вакансии получат сами.
+        """
+        with self._drift_lock:
+            fetched = set(self._search_pages.get(search_key(search), ()))
+        pages = []
+        previous = page - 1
+        while previous in fetched and len(pages) < PARSER_CONFIG['drift_retries']:
+            pages.append(previous)
+            previous -= 1
+        return pages, previous in fetched
+
+    def _take_shifted(self, search: Optional[Dict], data: Dict) -> List[Dict]:
+        """Вакансии перечитанной страницы, которых ещё не было на страницах поиска"""
+        key = search_key(search)
+        with self._drift_lock:
+            search_ids = self._search_ids[key]
+            items = [item for item in data['items'] if search_ids.add(int(item['id']))]
+            self._search_found[key] = data.get('found', 0)
+            self.drift['refetches'] += 1
+            self.drift['recovered'] += len(items)
+        return items
+
+    def _lost_shift(self, page: int, shifted: int, recovered: int) -> None:
+        with self._drift_lock:
+            self.drift['lost'] += 1
+        logger.warning(
+            f"Сдвиг выдачи на странице {page}: возвращено {recovered} из ~{shifted} вакансий, "
+            f"часть могла быть пропущена"
+        )
+
+    def finish_search(self, search: Optional[Dict] = None) -> None:
+        """Освобождает id страниц завершённого поиска"""
+        key = search_key(search)
+        with self._drift_lock:
+            self._search_ids.pop(key, None)
+            self._search_found.pop(key, None)
+            self._search_pages.pop(key, None)
+
+    def fetch_page(self, page: int, search: Optional[Dict] = None) -> Optional[Dict]:
+        """Страница поиска с возвратом вакансий, пропущенных из-за сдвига выдачи.
+
+        Если выдача сдвинулась вверх (см. _accept_page), уже полученные
+        предыдущие страницы перечитываются, начиная с ближайшей, пока на них
+        находятся новые вакансии; найденные добавляются к items страницы.
+        """
+        data = self.fetch_vacancies(page, search)
+        if not data or not data.get('items'):
+            return data
+        shifted = self._accept_page(search, page, data)
+        if not shifted or self.stop_event.is_set():
+            return data
+
+        recovered = []
+        pages, truncated = self._rewalk_pages(search, page)
+        for previous in pages:
+            previous_data = self.fetch_vacancies(previous, search)
+            if not previous_data or not previous_data.get('items'):
+                truncated = True
+                break
+            items = self._take_shifted(search, previous_data)
+            recovered.extend(items)
+            if not items or len(recovered) >= shifted:
+                truncated = False
+                break
+        if truncated:
+            self._lost_shift(page, shifted, len(recovered))
+        data['items'] = data['items'] + recovered
+        return data
+    
+    def fetch_vacancy(self, vacancy_id: int) -> Optional[Dict]:
+        """Полная карточка вакансии; {} - вакансия удалена или скрыта, None - ошибка"""
+        endpoint = f"{HH_API_CONFIG['vacancies_endpoint']}/{vacancy_id}"
+        return self._make_request(endpoint, allow_missing=True)
+    
+    def parse_all_vacancies(self, searches: Optional[List[Dict]] = None) -> Generator[Dict, None, None]:
+        """Парсит все вакансии постранично.
+
+        Если передан список поисков (например, срезы из PartitionPlanner),
+        каждый из них обходится как независимая единица работы.
+        """
+        for _, _, _, records in self.iter_pages(searches):
+            yield from records
+
+    def iter_pages(
+        self,
+        searches: Optional[List[Dict]] = None,
+        committed: Optional[Dict[str, Dict]] = None,
+        seen: Optional[SeenVacancies] = None
+    ) -> Generator[Tuple[Optional[Dict], int, int, list], None, None]:
+        """Постранично обходит поиски: (поиск, страница, всего страниц, записи).
+
+        committed - записанные страницы прерванного запуска
+        ({search_key: {'pages': n, 'done': {страницы}}}), они не запрашиваются.
+        Вакансии, уже попавшие в seen, отбрасываются до нормализации.
+        """
+        for search in searches or [None]:
+            if self.stop_event.is_set():
+                break
+            done = (committed or {}).get(search_key(search))
+            yield from self._parse_search(search, done, seen)
+
+    def _parse_search(
+        self,
+        search: Optional[Dict] = None,
+        done: Optional[Dict] = None,
+        seen: Optional[SeenVacancies] = None
+    ) -> Generator[Tuple[Optional[Dict], int, int, list], None, None]:
+        """Постранично парсит один поиск"""
+        skip = done['done'] if done else set()
         total_parsed = 0
-        
-        while page < HH_API_CONFIG['max_pages']:
-            data = self.fetch_vacancies(page)
-            
+
+        if 0 in skip:
+            # Первая страница уже записана: число страниц известно из контрольной точки
+            pages = done['pages']
+            logger.info(f"Продолжение поиска {search or 'по умолчанию'}: записано {len(skip)} из {pages} страниц")
+        else:
+            data = self.fetch_page(0, search)
+            if not data or 'items' not in data:
+                logger.warning("Нет данных на странице 0")
+                return
+            total_found = data.get('found', 0)
+            pages = min(data.get('pages', 1), HH_API_CONFIG['max_pages'])
+            logger.info(f"Всего найдено вакансий: {total_found}")
+            records = self.normalize_page(data['items'], seen)
+            total_parsed += len(records)
+            yield search, 0, pages, records
+
+        page = 0
+        while page + 1 < pages:
+            page += 1
+            if page in skip:
+                continue
+            if self.stop_event.is_set():
+                logger.info(f"Обход остановлен на странице {page} из {pages}")
+                break
+            data = self.fetch_page(page, search)
+
             if not data or 'items' not in data:
                 logger.warning(f"Нет данных на странице {page}")
                 break
-            
-            if total_found is None:
-                total_found = data.get('found', 0)
-                logger.info(f"Всего найдено вакансий: {total_found}")
-            
+
             items = data['items']
             if not items:
                 logger.info("Больше нет вакансий")
                 break
-            
-            for vacancy in items:
-                yield self.normalize_vacancy(vacancy)
-                total_parsed += 1
-            
-            logger.info(f"Обработано {total_parsed} из {min(total_found, 2000)} вакансий")
-            page += 1
-        
+
+            # Новые вакансии сдвигают выдачу вниз: хвост дочитывается, если страниц стало больше
+            pages = max(pages, min(data.get('pages', pages), HH_API_CONFIG['max_pages']))
+            records = self.normalize_page(items, seen)
+            total_parsed += len(records)
+            yield search, page, pages, records
+            logger.info(f"Обработано {total_parsed} вакансий, страница {page + 1} из {pages}")
+
+        self.finish_search(search)
         logger.info(f"Парсинг завершен. Всего обработано: {total_parsed} вакансий")
-    
+
+    def normalize_page(
+        self, items: List[Dict], seen: Optional[SeenVacancies] = None
+    ) -> Union[List, columnar.VacancyBatch]:
+        """Нормализует все вакансии страницы.
+
+        В режиме columnar возвращает VacancyBatch (при итерации - записи
+        ParsedVacancy), иначе список результатов to_record. Вакансии из seen
+        (уже взятые в работу) не нормализуются.
+        """
+        items = unseen_items(items, seen)
+        if self.decoder == 'columnar':
+            batch = columnar.normalize_page(items, self.parsed_at)
+            metrics.NORMALIZED_VACANCIES.inc(len(batch))
+            return batch
+        return [self.to_record(vacancy) for vacancy in items]
+
+    def to_record(self, vacancy: Dict) -> Union[Dict, ParsedVacancy]:
+        """Нормализует вакансию выбранным декодером"""
+        if self.decoder in RECORD_DECODERS:
+            record = decode_vacancy(vacancy, self.parsed_at)
+            metrics.NORMALIZED_VACANCIES.inc()
+            return record
+        return self.normalize_vacancy(vacancy)
 
     def normalize_vacancy(self, vacancy: Dict) -> Dict:
         """Нормализует данные вакансии для вставки в БД"""
+        started = time.perf_counter()
         
         def join_list(items, key='name'):
             """Объединяет список словарей в строку через запятую"""
@@ -321,8 +753,13 @@ class HHParser:
             'work_format': join_list(vacancy.get('work_format', []))
         }
         
-        return {
+        result = {
             'vacancy': vacancy_data,
             'employer': employer_data,
-            'professional_roles': professional_roles
+            'professional_roles': professional_roles,
+            'content_hash': content_hash(vacancy_data, professional_roles)
         }
+        
+        metrics.NORMALIZE_SECONDS.observe(time.perf_counter() - started)
+        metrics.NORMALIZED_VACANCIES.inc()
+        return result
@@ -0,0 +1,356 @@
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from columnar import VacancyBatch
+from config import HH_API_CONFIG, INGEST_CONFIG, PIPELINE_CONFIG
+from database import Database
+from dedup import SeenVacancies
+from parser import HHParser, search_key, unseen_items
+from rate_limiter import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Маркер завершения работы воркера
+_STOP = object()
+
+
+class StageStats:
+    """Счётчики одной стадии конвейера"""
+
+    def __init__(self, name: str, workers: int, output: Optional[queue.Queue] = None):
+        self.name = name
+        self.workers = workers
+        self.output = output
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def error(self, count: int = 1) -> None:
+        with self._lock:
+            self.errors += count
+
+    def sample_depth(self) -> None:
+        """Запоминает глубину выходной очереди стадии"""
+        if self.output is None:
+            return
+        depth = self.output.qsize()
+        with self._lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def as_dict(self, elapsed: float) -> Dict:
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy, 3),
+            'items_per_sec': round(self.items / elapsed, 1) if elapsed else 0.0,
+            'queue_max': self.depth_max,
+            'queue_avg': round(self.depth_total / self.depth_samples, 1) if self.depth_samples else 0.0
+        }
+
+
+class PipelineRunner:
+    """Конвейер загрузка -> нормализация -> запись в БД.
+
+    Стадии работают в отдельных пулах потоков и связаны ограниченными
+    очередями, поэтому медленная стадия притормаживает предыдущие
+    (backpressure), а не накапливает данные в памяти. При остановке
+    (ошибка, KeyboardInterrupt, stop()) новые страницы больше не
+    запрашиваются, но всё уже загруженное нормализуется и записывается.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        parser: Optional[HHParser] = None,
+        fetchers: Optional[int] = None,
+        normalizers: Optional[int] = None,
+        writers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        seen: Optional[SeenVacancies] = None
+    ):
+        self.db = db
+        # Вакансии, уже взятые в работу в этом запуске (в том числе другими заданиями)
+        self.seen = seen if seen is not None else SeenVacancies()
+        self.parser = parser or HHParser()
+        self.batch_size = batch_size or INGEST_CONFIG['batch_size']
+        queue_size = queue_size or PIPELINE_CONFIG['queue_size']
+
+        self._tasks: queue.Queue = queue.Queue()
+        self._pages: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._records: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+
+        self.stats = {
+            'fetch': StageStats('fetch', fetchers or PIPELINE_CONFIG['fetchers'], self._pages),
+            'normalize': StageStats('normalize', normalizers or PIPELINE_CONFIG['normalizers'], self._records),
+            'write': StageStats('write', writers or PIPELINE_CONFIG['writers']),
+        }
+        self.run_id: Optional[int] = None
+        self.committed: Dict[str, Dict] = {}
+        self.inserted = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self._counters_lock = threading.Lock()
+
+    def stop(self) -> None:
+        """Прекращает загрузку новых страниц; загруженное будет записано"""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        """Остановлен сам конвейер или его парсер (parser.stop())"""
+        return self._stop.is_set() or self.parser.stop_event.is_set()
+
+    def _enqueue_pages(self, search: Optional[Dict], key: str, pages: int, first: int) -> None:
+        """Ставит в очередь страницы поиска, кроме уже записанных"""
+        done = self.committed.get(key, {}).get('done', ())
+        for page in range(first, pages):
+            if page not in done:
+                self._tasks.put((search, page, pages))
+
+    # --- Стадии ---
+
+    def _fetch_worker(self) -> None:
+        stats = self.stats['fetch']
+        while True:
+            task = self._tasks.get()
+            try:
+                if task is _STOP:
+                    return
+                if self.stopped:
+                    continue
+                search, page, pages = task
+                started = time.perf_counter()
+                data = self.parser.fetch_page(page, search)
+                if not data or not data.get('items'):
+                    if data is None:
+                        stats.error()
+                    continue
+                key = search_key(search)
+                if page == 0:
+                    pages = min(data.get('pages', 1), HH_API_CONFIG['max_pages'])
+                    logger.info(f"Поиск {search or 'по умолчанию'}: найдено {data.get('found', 0)}, страниц {pages}")
+                    self._enqueue_pages(search, key, pages, 1)
+                stats.record(1, time.perf_counter() - started)
+                self._pages.put(((key, page, pages), data['items']))
+                stats.sample_depth()
+            except CircuitOpenError as e:
+                # API недоступен: оставшиеся страницы дозагрузит --resume
+                stats.error()
+                if not self._stop.is_set():
+                    logger.error(f"Остановка загрузки: {e}")
+                self.stop()
+            except Exception as e:
+                stats.error()
+                logger.error(f"Ошибка загрузки страницы: {e}")
+            finally:
+                self._tasks.task_done()
+
+    def _normalize_worker(self) -> None:
+        stats = self.stats['normalize']
+        while True:
+            page = self._pages.get()
+            if page is _STOP:
+                return
+            ref, items = page
+            try:
+                self._normalize_page(stats, ref, items)
+            except Exception as e:
+                # Страница не записывается и не отмечается: её дозагрузит --resume
+                stats.error()
+                logger.error(f"Ошибка нормализации страницы {ref[1]} поиска {ref[0]}: {e}")
+
+    def _normalize_page(self, stats: StageStats, ref: Tuple[str, int, int], items: List[Dict]) -> None:
+        started = time.perf_counter()
+        # Повторы (другие поиски, сдвиг выдачи) отбрасываются до нормализации
+        items = unseen_items(items, self.seen)
+        if self.parser.decoder == 'columnar':
+            try:
+                records = self._normalize_columns(items)
+                stats.record(len(records), time.perf_counter() - started)
+                self._records.put((ref, records))
+                stats.sample_depth()
+                return
+            except Exception as e:
+                # Страница с битой вакансией нормализуется построчно
+                logger.warning(f"Колоночная нормализация страницы не удалась ({e}), построчный режим")
+        records = []
+        for vacancy in items:
+            try:
+                data = self.parser.to_record(vacancy)
+            except Exception as e:
+                stats.error()
+                logger.error(f"Ошибка нормализации вакансии {vacancy.get('id', 'unknown')}: {e}")
+                continue
+            # Вакансии без работодателя пропускаем
+            if not data['employer']['id']:
+                logger.warning(f"Вакансия {data['vacancy']['id']} без работодателя")
+                with self._counters_lock:
+                    self.skipped += 1
+                continue
+            records.append(data)
+        stats.record(len(records), time.perf_counter() - started)
+        self._records.put((ref, records))
+        stats.sample_depth()
+
+    def _normalize_columns(self, items: List[Dict]) -> VacancyBatch:
+        """Колоночная нормализация страницы без вакансий без работодателя"""
+        batch = self.parser.normalize_page(items)
+        keep = []
+        missing = 0
+        for i, (vacancy_id, employer_id) in enumerate(zip(batch.vacancy['id'], batch.employer['id'])):
+            if not employer_id:
+                logger.warning(f"Вакансия {vacancy_id} без работодателя")
+                missing += 1
+            else:
+                keep.append(i)
+        if missing:
+            with self._counters_lock:
+                self.skipped += missing
+        return batch if len(keep) == len(batch) else batch.take(keep)
+
+    def _write_batch(
+        self,
+        db: Database,
+        batch: Union[List[Dict], VacancyBatch],
+        pages: List[Tuple[str, int, int, int]]
+    ) -> None:
+        stats = self.stats['write']
+        started = time.perf_counter()
+        checkpoint = (self.run_id, pages) if self.run_id else None
+        try:
+            result = db.ingest_batch(batch, checkpoint=checkpoint)
+        except Exception as e:
+            stats.error(len(batch))
+            logger.error(f"Ошибка загрузки пакета из {len(batch)} вакансий: {e}")
+            # Незаписанные вакансии могут быть записаны следующими поисками
+            self.seen.discard(record['vacancy']['id'] for record in batch)
+            return
+        stats.record(len(batch), time.perf_counter() - started)
+        with self._counters_lock:
+            self.inserted += result['vacancies_inserted']
+            self.unchanged += result['vacancies_unchanged']
+            self.skipped += result['vacancies_skipped']
+        logger.info(f"Записан пакет: {result}")
+
+    def _write_worker(self) -> None:
+        batch = None
+        pages: List[Tuple[str, int, int, int]] = []
+        while True:
+            page = self._records.get()
+            if page is _STOP:
+                break
+            (key, number, total), records = page
+            # Страница целиком попадает в один пакет, поэтому отмечается вместе с ним
+            pages.append((key, number, total, len(records)))
+            # Список записей или VacancyBatch; пакет наследует тип первой страницы
+            if batch is None:
+                batch = records
+            else:
+                batch.extend(records)
+            if len(batch) >= self.batch_size:
+                self._write_batch(self.db, batch, pages)
+                batch = None
+                pages = []
+        if batch is not None:
+            self._write_batch(self.db, batch, pages)
+
+    # --- Запуск ---
+
+    @staticmethod
+    def _start(target, count: int, name: str) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=target, name=f"{name}-{i}", daemon=True)
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _drain(self, threads: List[threading.Thread], inbox: queue.Queue) -> None:
+        """Посылает стадии маркеры остановки и ждёт завершения её потоков"""
+        for _ in threads:
+            inbox.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def run(
+        self,
+        searches: Optional[List[Dict]] = None,
+        watermark: Optional[Tuple[str, Dict, object]] = None,
+        run_id: Optional[int] = None,
+        committed: Optional[Dict[str, Dict]] = None
+    ) -> Dict:
+        """Запускает конвейер и возвращает статистику по стадиям.
+
+        При заданном run_id записанные страницы отмечаются контрольными
+        точками; committed - уже записанные страницы прерванного запуска.
+        """
+        started = time.perf_counter()
+        self.run_id = run_id
+        self.committed = committed or {}
+        duplicates_before = self.seen.duplicates
+        fetchers = self._start(self._fetch_worker, self.stats['fetch'].workers, 'fetch')
+        normalizers = self._start(self._normalize_worker, self.stats['normalize'].workers, 'normalize')
+        writers = self._start(self._write_worker, self.stats['write'].workers, 'write')
+
+        for search in searches or [None]:
+            key = search_key(search)
+            done = self.committed.get(key)
+            if done and 0 in done['done']:
+                self._enqueue_pages(search, key, done['pages'], 1)
+            else:
+                self._tasks.put((search, 0, None))
+
+        try:
+            # Ожидание всех задач загрузки (с возможностью прерывания)
+            while self._tasks.unfinished_tasks:
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            logger.warning("Остановка конвейера: загруженные страницы будут записаны")
+            self.stop()
+            self._tasks.join()
+        finally:
+            self._drain(fetchers, self._tasks)
+            self._drain(normalizers, self._pages)
+            self._drain(writers, self._records)
+
+        errors = sum(stage.errors for stage in self.stats.values())
+        if watermark and not errors and not self.stopped:
+            self.db.advance_watermark(*watermark)
+        elif watermark:
+            logger.warning("Водяной знак не сдвинут из-за ошибок или остановки")
+
+        elapsed = time.perf_counter() - started
+        report = {
+            'elapsed_seconds': round(elapsed, 3),
+            'inserted': self.inserted,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'duplicates': self.seen.duplicates - duplicates_before,
+            'drift': dict(self.parser.drift),
+            'seen_bytes': self.seen.nbytes(),
+            'errors': errors,
+            'stopped': self.stopped,
+            'stages': {name: stage.as_dict(elapsed) for name, stage in self.stats.items()},
+            'db_pool': self.db.pool_stats(),
+            'rate_limiter': self.parser.rate_limiter.state()
+        }
+        logger.info(f"Конвейер завершён: {report}")
+        return report
@@ -0,0 +1,165 @@
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import HH_API_CONFIG, PARSER_CONFIG
+from parser import HHParser
+
+logger = logging.getLogger(__name__)
+
+# API отдаёт не больше max_pages * per_page результатов на один поиск
+SEARCH_DEPTH_LIMIT = HH_API_CONFIG['max_pages'] * HH_API_CONFIG['per_page']
+
+
+class PartitionPlanner:
+    """Разбивает поиск на срезы, каждый из которых укладывается в лимит глубины.
+
+    Срез с found > SEARCH_DEPTH_LIMIT делится рекурсивно: сначала по дереву
+    регионов (fetch_areas), затем пополам по временному окну
+    date_from/date_to. По professional_role срез не делится: вакансия с
+    несколькими ролями попадает в несколько частей, и по их found нельзя
+    проверить, что части покрывают весь срез. Листья плана обходятся как
+    независимые единицы работы.
+    """
+
+    def __init__(
+        self,
+        parser: Optional[HHParser] = None,
+        window_days: int = 30,
+        min_window: timedelta = timedelta(minutes=10)
+    ):
+        self.parser = parser or HHParser()
+        self.window_days = window_days
+        self.min_window = min_window
+        self.probes = 0
+        self._children: Dict[str, List[str]] = {}
+
+    def _load_reference(self) -> None:
+        """Загружает дерево регионов для разбиения"""
+        for area in self.parser.fetch_areas():
+            if area['parent_id'] is not None:
+                self._children.setdefault(str(area['parent_id']), []).append(str(area['id']))
+
+    def probe(self, search: Dict) -> int:
+        """Возвращает found для среза (запрос одной вакансии)"""
+        self.probes += 1
+        found = self.parser.fetch_found(search)
+        if found is None:
+            logger.warning(f"Не удалось получить found для среза {search}")
+            return 0
+        return found
+
+    def _split(self, search: Dict) -> tuple[Optional[str], List[Dict]]:
+        """Делит срез на более мелкие. Возвращает способ разбиения и части"""
+        areas = search['area'] if isinstance(search['area'], list) else [search['area']]
+        areas = [str(area).strip() for area in areas if str(area).strip()]
+
+        # 1. По дереву регионов
+        if len(areas) > 1:
+            return 'area', [{**search, 'area': [area]} for area in areas]
+        children = self._children.get(areas[0]) if areas else None
+        if children:
+            return 'area', [{**search, 'area': [child]} for child in children]
+
+        # 2. По временному окну
+        return self._split_dates(search)
+
+    def _split_dates(self, search: Dict) -> tuple[Optional[str], List[Dict]]:
+        """Делит срез пополам по временному окну (части покрывают весь срез)"""
+        if search.get('date_from') and search.get('date_to'):
+            date_from = datetime.fromisoformat(search['date_from'])
+            date_to = datetime.fromisoformat(search['date_to'])
+        else:
+            date_to = datetime.now().astimezone().replace(microsecond=0)
+            date_from = (
+                datetime.fromisoformat(search['date_from']) if search.get('date_from')
+                else date_to - timedelta(days=self.window_days)
+            )
+        if date_to - date_from <= self.min_window:
+            return None, []
+        middle = date_from + (date_to - date_from) / 2
+        return 'date', [
+            {**search, 'date_from': date_from.isoformat(timespec='seconds'), 'date_to': middle.isoformat(timespec='seconds')},
+            {**search, 'date_from': middle.isoformat(timespec='seconds'), 'date_to': date_to.isoformat(timespec='seconds')},
+        ]
+
+    def _plan_slice(self, search: Dict, found: int, leaves: List[Dict], depth: int = 0) -> None:
+        if found == 0:
+            return
+        if found <= SEARCH_DEPTH_LIMIT:
+            leaves.append(self._leaf(search, found))
+            return
+
+        kind, parts = self._split(search)
+        if not parts:
+            logger.warning(
+                f"Срез {search} нельзя разбить дальше: {found} > {SEARCH_DEPTH_LIMIT}, "
+                f"будет потеряно {found - SEARCH_DEPTH_LIMIT} вакансий"
+            )
+            leaves.append(self._leaf(search, found))
+            return
+
+        logger.debug(f"{'  ' * depth}Разбиение среза {search} ({found}) по {kind} на {len(parts)} частей")
+        parts_found = [self.probe(part) for part in parts]
+        # Вакансии, привязанные к самому региону, а не к дочерним, не попадут
+        # ни в один срез: такой срез делится по времени, а не по регионам
+        if kind == 'area' and sum(parts_found) < found:
+            logger.warning(
+                f"Срезы {search} по {kind} покрывают {sum(parts_found)} из {found} вакансий, "
+                f"разбиение по времени"
+            )
+            kind, parts = self._split_dates(search)
+            if not parts:
+                leaves.append(self._leaf(search, found))
+                return
+            parts_found = [self.probe(part) for part in parts]
+        for part, part_found in zip(parts, parts_found):
+            self._plan_slice(part, part_found, leaves, depth + 1)
+
+    @staticmethod
+    def _leaf(search: Dict, found: int) -> Dict:
+        fetched = min(found, SEARCH_DEPTH_LIMIT)
+        return {
+            'search': search,
+            'found': found,
+            'requests': max(1, math.ceil(fetched / HH_API_CONFIG['per_page']))
+        }
+
+    def plan(self, search: Optional[Dict] = None) -> Dict:
+        """Строит план обхода с оценкой количества запросов"""
+        root = {'area': PARSER_CONFIG['area'], **(search or {})}
+
+        self.probes = 0
+        found = self.probe(root)
+        logger.info(f"Всего найдено вакансий: {found}")
+        leaves: List[Dict] = []
+        if found > SEARCH_DEPTH_LIMIT:
+            self._load_reference()
+        self._plan_slice(root, found, leaves)
+
+        crawl_requests = sum(leaf['requests'] for leaf in leaves)
+        plan = {
+            'found': found,
+            'slices': leaves,
+            'probe_requests': self.probes,
+            'crawl_requests': crawl_requests,
+            'estimated_requests': self.probes + crawl_requests,
+            'estimated_seconds': round(crawl_requests / HH_API_CONFIG['rate_limit'], 1)
+        }
+        logger.info(
+            f"План: {len(leaves)} срезов, {crawl_requests} запросов на обход "
+            f"(+{self.probes} на разбиение), ~{plan['estimated_seconds']} с"
+        )
+        return plan
+
+    @staticmethod
+    def searches(plan: Dict) -> List[Dict]:
+        """Список поисков для HHParser.parse_all_vacancies"""
+        return [leaf['search'] for leaf in plan['slices']]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(PartitionPlanner().plan(), ensure_ascii=False, indent=2))
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from config import HH_API_CONFIG
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Значения метрики hh_circuit_state
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+
+class CircuitOpenError(Exception):
+    """Запросы к API приостановлены после серии отказов"""
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Разбирает Retry-After: число секунд или HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Экспоненциальная задержка перед повтором со случайным разбросом (full jitter)"""
+    base = HH_API_CONFIG['retry_base_seconds'] if base is None else base
+    cap = HH_API_CONFIG['retry_max_seconds'] if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket.
+
+    Один экземпляр разделяется всеми запросами процесса (синхронными и
+    асинхронными), поэтому общий темп обращений к API не превышает `rate`
+    запросов в секунду с всплесками до `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate должен быть положительным")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Резервирует токены и возвращает время ожидания до их появления.
+
+        Токены списываются сразу (баланс может уйти в минус), поэтому
+        конкурирующие вызовы выстраиваются в очередь без гонок.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            pause = max(0.0, self._paused_until - now)
+            if self._tokens >= 0:
+                return pause
+            return max(pause, -self._tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Приостанавливает выдачу токенов всем потребителям (например, по Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def check(self) -> None:
+        """Проверка перед запросом; у простого лимитера запросы всегда разрешены"""
+
+    def record(self, status: Optional[int], seconds: float) -> None:
+        """Результат запроса (status None - таймаут или ошибка соединения).
+
+        Простой лимитер его не учитывает, см. AdaptiveRateController.
+        """
+
+    def state(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {'rate': self.rate, 'tokens': round(self._tokens, 2)}
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Блокирующее ожидание токенов. Возвращает фактическое время ожидания"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Асинхронное ожидание токенов. Возвращает фактическое время ожидания"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class AdaptiveRateController(TokenBucket):
+    """Token bucket, подстраивающий скорость под ответы API (AIMD).
+
+    Ответы 429/5xx, таймауты и ошибки соединения уменьшают скорость в
+    `decrease` раз (не чаще раза в DECREASE_INTERVAL секунд, чтобы пачка
+    одновременных отказов не обрушила её до минимума), медленные ответы
+    (дольше `latency_target`) - в `latency_decrease` раз, а каждый быстрый
+    успешный ответ прибавляет `increase / rate`, то есть около `increase`
+    запросов/с за секунду чистого трафика.
+
+    После `failure_threshold` отказов подряд (5xx, таймауты, ошибки
+    соединения) цепь размыкается: check() бросает CircuitOpenError в течение
+    `open_seconds`, затем пропускает один проверочный запрос (остальным до
+    его результата - CircuitOpenError), и его результат либо замыкает цепь,
+    либо снова размыкает её. Проверочный запрос без результата (например,
+    с ошибкой вне HTTP) через `open_seconds` уступает место следующему.
+    """
+
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+        latency_decrease: float = 0.9,
+        failure_threshold: Optional[int] = None,
+        open_seconds: Optional[float] = None
+    ):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate or HH_API_CONFIG['rate_min']
+        self.max_rate = max(max_rate or HH_API_CONFIG['rate_max'], self.rate)
+        self.increase = HH_API_CONFIG['rate_increase'] if increase is None else increase
+        self.decrease = decrease
+        self.latency_target = latency_target or HH_API_CONFIG['latency_target']
+        self.latency_decrease = latency_decrease
+        self.failure_threshold = failure_threshold or HH_API_CONFIG['circuit_failures']
+        self.open_seconds = HH_API_CONFIG['circuit_open_seconds'] if open_seconds is None else open_seconds
+        self.circuit = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._decreased_at = 0.0
+        metrics.RATE_LIMIT_CURRENT.set(self.rate)
+        metrics.CIRCUIT_STATE.set(CIRCUIT_STATES[self.circuit])
+
+    def _set_rate(self, rate: float, now: float) -> None:
+        # Токены до текущего момента начисляются по прежней скорости
+        self._refill(now)
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        metrics.RATE_LIMIT_CURRENT.set(self.rate)
+
+    def _set_circuit(self, circuit: str) -> None:
+        if circuit != self.circuit:
+            log = logger.warning if circuit == 'open' else logger.info
+            log(f"Цепь запросов к API: {self.circuit} -> {circuit} (отказов подряд: {self.failures})")
+            self.circuit = circuit
+            metrics.CIRCUIT_STATE.set(CIRCUIT_STATES[circuit])
+
+    def _decrease_rate(self, factor: float, now: float) -> None:
+        if now - self._decreased_at >= self.DECREASE_INTERVAL:
+            self._decreased_at = now
+            self._set_rate(self.rate * factor, now)
+
+    def check(self) -> None:
+        with self._lock:
+            if self.circuit == 'closed':
+                return
+            now = time.monotonic()
+            if self.circuit == 'half_open':
+                if self._probe_started is not None and now - self._probe_started < self.open_seconds:
+                    raise CircuitOpenError("Запросы к API приостановлены до результата проверочного запроса")
+                self._probe_started = now
+                return
+            remaining = self._opened_at + self.open_seconds - now
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Запросы к API приостановлены ещё на {remaining:.0f} с "
+                    f"после {self.failures} отказов подряд"
+                )
+            self._set_circuit('half_open')
+            self._probe_started = now
+
+    def record(self, status: Optional[int], seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            failed = status is None or status >= 500
+            # Любой результат завершает проверочный запрос (при 429 цепь ждёт следующего)
+            self._probe_started = None
+            if failed:
+                self.failures += 1
+                if self.circuit == 'half_open' or self.failures >= self.failure_threshold:
+                    self._opened_at = now
+                    self._set_circuit('open')
+            elif status != 429:
+                self.failures = 0
+                self._set_circuit('closed')
+
+            if failed or status == 429:
+                self._decrease_rate(self.decrease, now)
+            elif seconds > self.latency_target:
+                self._decrease_rate(self.latency_decrease, now)
+            elif status < 400:
+                self._set_rate(self.rate + self.increase / self.rate, now)
+
+    def state(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'rate': round(self.rate, 3),
+                'min_rate': self.min_rate,
+                'max_rate': self.max_rate,
+                'tokens': round(self._tokens, 2),
+                'paused_seconds': round(max(0.0, self._paused_until - now), 1),
+                'circuit': self.circuit,
+                'failures': self.failures,
+                'open_seconds_left': round(max(0.0, self._opened_at + self.open_seconds - now), 1)
+                if self.circuit == 'open' else 0.0
+            }
+
+
+_shared_bucket: Optional[TokenBucket] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_bucket() -> TokenBucket:
+    """Возвращает общий для процесса лимитер из HH_API_CONFIG"""
+    global _shared_bucket
+    with _shared_lock:
+        if _shared_bucket is None:
+            bucket_class = AdaptiveRateController if HH_API_CONFIG['adaptive'] else TokenBucket
+            _shared_bucket = bucket_class(
+                HH_API_CONFIG['rate_limit'],
+                HH_API_CONFIG['rate_burst']
+            )
+        return _shared_bucket
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import operator
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:  # orjson не обязателен, стандартный json медленнее в 2-3 раза
+    loads = json.loads
+
+
+def _get(self, key: str, default: Any = None) -> Any:
+    return getattr(self, key, default)
+
+
+def _getitem(self, key):
+    # Доступ по имени поля, как у словарей из normalize_vacancy
+    if isinstance(key, str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    return tuple.__getitem__(self, key)
+
+
+class EmployerRecord(NamedTuple):
+    """Работодатель; порядок полей совпадает с колонками employers"""
+    id: Optional[int]
+    name: Optional[str]
+    url: Optional[str]
+    alternate_url: Optional[str]
+    logo_original: Optional[str]
+    logo_90: Optional[str]
+    logo_240: Optional[str]
+    vacancies_url: Optional[str]
+    country_id: Optional[int]
+    accredited_it_employer: Optional[bool]
+    trusted: Optional[bool]
+
+    get = _get
+    __getitem__ = _getitem
+
+
+class VacancyRecord(NamedTuple):
+    """Вакансия; порядок полей совпадает с колонками vacancies"""
+    id: int
+    published_at: str
+    created_at: str
+    parsed_at: datetime
+    name: str
+    premium: Optional[bool]
+    has_test: Optional[bool]
+    response_letter_required: Optional[bool]
+    archived: Optional[bool]
+    area_id: Optional[int]
+    employer_id: Optional[int]
+    salary_from: Optional[int]
+    salary_to: Optional[int]
+    salary_currency: Optional[str]
+    salary_gross: Optional[bool]
+    vacancy_type: Optional[str]
+    vacancy_type_name: Optional[str]
+    schedule_id: Optional[str]
+    schedule_name: Optional[str]
+    experience_id: Optional[str]
+    experience_name: Optional[str]
+    employment_id: Optional[str]
+    employment_name: Optional[str]
+    employment_form_id: Optional[str]
+    employment_form_name: Optional[str]
+    address_city: Optional[str]
+    address_street: Optional[str]
+    address_building: Optional[str]
+    address_lat: Optional[float]
+    address_lng: Optional[float]
+    address_raw: Optional[str]
+    address_id: Optional[str]
+    url: Optional[str]
+    alternate_url: Optional[str]
+    apply_alternate_url: Optional[str]
+    response_url: Optional[str]
+    snippet_requirement: Optional[str]
+    snippet_responsibility: Optional[str]
+    accept_temporary: Optional[bool]
+    accept_incomplete_resumes: Optional[bool]
+    show_logo_in_search: Optional[bool]
+    show_contacts: Optional[bool]
+    is_adv_vacancy: Optional[bool]
+    internship: Optional[bool]
+    night_shifts: Optional[bool]
+    working_days: Optional[str]
+    working_time_intervals: Optional[str]
+    working_time_modes: Optional[str]
+    working_hours: Optional[str]
+    work_schedule_by_days: Optional[str]
+    fly_in_fly_out_duration: Optional[str]
+    work_format: Optional[str]
+
+    get = _get
+    __getitem__ = _getitem
+
+
+class ParsedVacancy(NamedTuple):
+    """Результат декодирования; совместим по ключам с normalize_vacancy"""
+    vacancy: VacancyRecord
+    employer: EmployerRecord
+    professional_roles: List[int]
+    content_hash: str
+
+    get = _get
+    __getitem__ = _getitem
+
+
+EMPLOYER_FIELDS = EmployerRecord._fields
+VACANCY_FIELDS = VacancyRecord._fields
+
+# Порядок полей в хеше тот же, что у parser.content_hash (отсортированные ключи)
+_HASH_FIELDS = tuple(name for name in sorted(VACANCY_FIELDS) if name != 'parsed_at')
+_hash_values = operator.itemgetter(*(VACANCY_FIELDS.index(name) for name in _HASH_FIELDS))
+# Кортежи кодируются в JSON так же, как списки
+_hash_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+_EMPTY: Dict = {}
+
+
+def record_hash(values: Tuple, professional_roles: List[int]) -> str:
+    """Хеш содержимого, совпадающий с parser.content_hash для тех же данных"""
+    payload = list(zip(_HASH_FIELDS, _hash_values(values)))
+    payload.append(('professional_roles', sorted(professional_roles)))
+    encoded = _hash_encoder.encode(payload)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def _join(items) -> Optional[str]:
+    if not items:
+        return None
+    return ', '.join([item['name'] for item in items if item.get('name')])
+
+
+def decode_vacancy(vacancy: Dict, parsed_at: datetime) -> ParsedVacancy:
+    """Строит записи из элемента items ответа /vacancies (логика normalize_vacancy)"""
+    get = vacancy.get
+
+    employer = get('employer') or _EMPTY
+    employer_get = employer.get
+    logo_urls = employer_get('logo_urls')
+    employer_id = int(employer['id']) if employer_get('id') else None
+    employer_record = EmployerRecord(
+        employer_id,
+        employer_get('name'),
+        employer_get('url'),
+        employer_get('alternate_url'),
+        logo_urls.get('original') if logo_urls else None,
+        logo_urls.get('90') if logo_urls else None,
+        logo_urls.get('240') if logo_urls else None,
+        employer_get('vacancies_url'),
+        employer_get('country_id'),
+        employer_get('accredited_it_employer', False),
+        employer_get('trusted', False)
+    )
+
+    salary = get('salary_range') or get('salary')
+    if salary:
+        salary_from = salary.get('from')
+        salary_to = salary.get('to')
+        if salary_from is None:
+            salary_from = salary_to
+        elif salary_to is None:
+            salary_to = salary_from
+        salary_currency = salary.get('currency')
+        salary_gross = salary.get('gross')
+    else:
+        salary_from = salary_to = salary_currency = salary_gross = None
+
+    address = get('address') or _EMPTY
+    snippet = get('snippet') or _EMPTY
+    vacancy_type = get('type') or _EMPTY
+    schedule = get('schedule') or _EMPTY
+    experience = get('experience') or _EMPTY
+    employment = get('employment') or _EMPTY
+    employment_form = get('employment_form') or _EMPTY
+    area = get('area') or _EMPTY
+
+    professional_roles = [
+        int(role['id']) for role in get('professional_roles', [])
+        if role and role.get('id')
+    ]
+
+    values = (
+        int(vacancy['id']),
+        vacancy['published_at'],
+        vacancy['created_at'],
+        parsed_at,
+        vacancy['name'],
+        get('premium', False),
+        get('has_test', False),
+        get('response_letter_required', False),
+        get('archived', False),
+        int(area['id']) if area.get('id') else None,
+        employer_id,
+        salary_from,
+        salary_to,
+        salary_currency,
+        salary_gross,
+        vacancy_type.get('id'),
+        vacancy_type.get('name'),
+        schedule.get('id'),
+        schedule.get('name'),
+        experience.get('id'),
+        experience.get('name'),
+        employment.get('id'),
+        employment.get('name'),
+        employment_form.get('id'),
+        employment_form.get('name'),
+        address.get('city'),
+        address.get('street'),
+        address.get('building'),
+        address.get('lat'),
+        address.get('lng'),
+        address.get('raw'),
+        address.get('id'),
+        get('url'),
+        get('alternate_url'),
+        get('apply_alternate_url'),
+        get('response_url'),
+        snippet.get('requirement'),
+        snippet.get('responsibility'),
+        get('accept_temporary', False),
+        get('accept_incomplete_resumes', False),
+        get('show_logo_in_search'),
+        get('show_contacts', False),
+        get('is_adv_vacancy', False),
+        get('internship', False),
+        get('night_shifts', False),
+        _join(get('working_days')),
+        _join(get('working_time_intervals')),
+        _join(get('working_time_modes')),
+        _join(get('working_hours')),
+        _join(get('work_schedule_by_days')),
+        _join(get('fly_in_fly_out_duration')),
+        _join(get('work_format'))
+    )
+
+    return ParsedVacancy(
+        VacancyRecord._make(values),
+        employer_record,
+        professional_roles,
+        record_hash(values, professional_roles)
+    )
+
+
+def decode_vacancies_page(
+    payload: Union[bytes, str, Dict],
+    parsed_at: datetime
+) -> Tuple[List[ParsedVacancy], Dict]:
+    """Декодирует ответ /vacancies в записи.
+
+    Возвращает записи и метаданные страницы (found, pages, page, per_page).
+    """
+    data = loads(payload) if isinstance(payload, (bytes, str)) else payload
+    items = data.get('items') or []
+    meta = {key: data.get(key) for key in ('found', 'pages', 'page', 'per_page')}
+    return [decode_vacancy(item, parsed_at) for item in items], meta
@@ -0,0 +1,126 @@
+"""Офлайн-пересборка БД из архива сырых ответов (без обращений к API).
+
+    python src/replay.py --since 2025-01-01 --decoder columnar
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from archive import ArchiveReader
+from config import HH_API_CONFIG, INGEST_CONFIG, LOG_CONFIG
+from crawl import load_reference_data
+from database import Database
+from parser import HHParser
+from rate_limiter import TokenBucket
+from records import loads
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayParser(HHParser):
+    """HHParser, который отвечает последними сохранёнными ответами архива"""
+
+    def __init__(self, reader: ArchiveReader, decoder: Optional[str] = None):
+        super().__init__(rate_limiter=TokenBucket(1e9, 1e9), decoder=decoder)
+        self.reader = reader
+        self.archive = None
+
+    def _make_request(
+        self, endpoint: str, params: Optional[Dict] = None, allow_missing: bool = False
+    ) -> Optional[Dict]:
+        # Ответы 404 в архив не попадают, поэтому allow_missing ничего не меняет
+        body = self.reader.latest(endpoint)
+        if body is None:
+            logger.warning(f"В архиве нет ответов {endpoint}")
+            return None
+        return loads(body)
+
+
+def replay(
+    db: Database,
+    reader: ArchiveReader,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    query_key: Optional[str] = None,
+    decoder: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    reference: bool = True
+) -> Dict:
+    """Прогоняет архивные страницы /vacancies через нормализацию и ingest_batch.
+
+    Страницы идут в порядке загрузки, parsed_at берётся из исходного
+    запуска, поэтому история версий совпадает с исходной.
+    """
+    parser = ReplayParser(reader, decoder)
+    batch_size = batch_size or INGEST_CONFIG['batch_size']
+
+    if reference:
+        # Вместе с иерархией регионов (area_closure), как при обычной загрузке справочников
+        load_reference_data(db, parser)
+
+    entries = reader.entries(HH_API_CONFIG['vacancies_endpoint'], query_key, since, until)
+    logger.info(f"Воспроизведение {len(entries)} страниц из архива {reader.directory}")
+
+    stats = {'pages': 0, 'vacancies': 0, 'inserted': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+    batch = []
+    started = time.perf_counter()
+
+    def flush():
+        if not batch:
+            return
+        try:
+            result = db.ingest_batch(batch)
+            stats['inserted'] += result['vacancies_inserted']
+            stats['unchanged'] += result['vacancies_unchanged']
+            stats['skipped'] += result['vacancies_skipped']
+        except Exception as e:
+            stats['errors'] += len(batch)
+            logger.error(f"Ошибка загрузки пакета из {len(batch)} вакансий: {e}")
+        batch.clear()
+
+    for entry, body in reader.stream(entries):
+        data = loads(body)
+        parser.parsed_at = datetime.fromisoformat(entry['parsed_at'] or entry['fetched_at'])
+        stats['pages'] += 1
+        for record in parser.normalize_page(data.get('items') or []):
+            stats['vacancies'] += 1
+            # Вакансии без работодателя пропускаем, как и при обычном парсинге
+            if not record['employer']['id']:
+                stats['skipped'] += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 1)
+    stats['vacancies_per_sec'] = round(stats['vacancies'] / elapsed, 1) if elapsed else 0.0
+    logger.info(f"Воспроизведение завершено: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пересборка БД из архива сырых ответов')
+    parser.add_argument('--dir', help='Каталог архива (по умолчанию ARCHIVE_CONFIG)')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Загружено не раньше (ISO)')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='Загружено раньше (ISO)')
+    parser.add_argument('--query-key', help='Только один поисковый запрос')
+    parser.add_argument('--decoder', choices=['dict', 'records', 'columnar'])
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--no-reference', action='store_true', help='Не обновлять справочники')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_CONFIG['level']), format=LOG_CONFIG['format'])
+
+    with Database() as db:
+        replay(
+            db, ArchiveReader(args.dir), args.since, args.until, args.query_key,
+            args.decoder, args.batch_size, reference=not args.no_reference
+        )
+
+
+if __name__ == '__main__':
+    main()
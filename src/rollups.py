@@ -0,0 +1,184 @@
+"""Сводки зарплат и спроса по таблицам salary_rollups и salary_rollup_buckets.
+
+    python src/rollups.py --backfill                          # пересобрать из текущих версий
+    python src/rollups.py --area 1 --since 2025-01-01 --group-by day
+    python src/rollups.py --role 96 --experience between1And3 --currency RUR
+    python src/rollups.py --area 113 --group-by area_id --area-depth 1   # по округам России
+"""
+import argparse
+import json
+import logging
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from config import LOG_CONFIG, ROLLUP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Измерения сводок (ключ таблиц) в порядке первичного ключа
+ROLLUP_DIMENSIONS = ('day', 'area_id', 'professional_role_id', 'experience_id', 'currency')
+
+# Аддитивные колонки salary_rollups
+ROLLUP_TOTALS = (
+    'vacancies', 'salary_from_count', 'salary_from_sum', 'salary_to_count', 'salary_to_sum'
+)
+
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Скетч с относительной ошибкой alpha (как DDSketch): значение v попадает в
+# корзину ceil(log_gamma(v)), оценка корзины отличается от любого её значения
+# не более чем на alpha. Корзины - обычные счётчики, поэтому скетчи разных
+# пакетов складываются, а старые версии вакансий вычитаются.
+SKETCH_ALPHA = ROLLUP_CONFIG['relative_accuracy']
+SKETCH_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+SKETCH_LN_GAMMA = math.log(SKETCH_GAMMA)
+
+
+def bucket_index(value: float) -> int:
+    """Корзина скетча для положительного значения (как в SQL загрузки)"""
+    return math.ceil(math.log(value) / SKETCH_LN_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Оценка значений корзины с относительной ошибкой не более alpha"""
+    return 2 * SKETCH_GAMMA ** index / (SKETCH_GAMMA + 1)
+
+
+def sketch_quantiles(buckets: Dict[int, int], quantiles: Iterable[float]) -> Dict[float, Optional[float]]:
+    """Квантили по скетчу {корзина: число значений}"""
+    items = sorted((index, count) for index, count in buckets.items() if count > 0)
+    total = sum(count for _, count in items)
+    result = {}
+    for q in quantiles:
+        if not total:
+            result[q] = None
+            continue
+        rank = q * (total - 1)
+        seen = 0
+        for index, count in items:
+            seen += count
+            if seen > rank:
+                result[q] = round(bucket_value(index))
+                break
+    return result
+
+
+class SalaryRollups:
+    """Чтение сводок: спрос и квантили зарплат с фильтрами и группировкой"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def summary(
+        self,
+        group_by: Sequence[str] = (),
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        area_id: Optional[int] = None,
+        professional_role_id: Optional[int] = None,
+        experience_id: Optional[str] = None,
+        currency: Optional[str] = None,
+        include_subareas: bool = True,
+        area_depth: Optional[int] = None
+    ) -> List[Dict]:
+        """Группы сводок: число вакансий, средние и квантили salary_from/salary_to.
+
+        Вакансия с несколькими ролями учитывается в каждой из них, поэтому
+        без фильтра или группировки по роли такие вакансии считаются несколько
+        раз. Средние и квантили имеют смысл только в пределах одной валюты.
+        Фильтр area_id по умолчанию включает вложенные регионы; при группировке
+        по area_id с area_depth регионы сворачиваются до предка на этой
+        глубине (0 - страна), более мелкие остаются как есть.
+        """
+        filters = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'area_id': area_id,
+            'professional_role_id': professional_role_id,
+            'experience_id': experience_id,
+            'currency': currency,
+            'include_subareas': include_subareas
+        }
+        totals, buckets = self.db.query_rollups(group_by, filters)
+
+        tree = self.db.get_area_tree() if area_depth is not None and 'area_id' in group_by else None
+
+        def group_key(row: Dict) -> tuple:
+            key = []
+            for dim in group_by:
+                value = row[dim]
+                if tree is not None and dim == 'area_id' and value in tree:
+                    value = tree.ancestor_at(value, area_depth) or value
+                key.append(value)
+            return tuple(key)
+
+        sketches: Dict[tuple, Dict[str, Dict[int, int]]] = {}
+        for row in buckets:
+            counts = sketches.setdefault(group_key(row), {}).setdefault(row['field'], {})
+            counts[row['bucket']] = counts.get(row['bucket'], 0) + row['count']
+
+        merged: Dict[tuple, Dict] = {}
+        for row in totals:
+            group = merged.setdefault(group_key(row), dict.fromkeys(ROLLUP_TOTALS, 0))
+            for column in ROLLUP_TOTALS:
+                group[column] += row[column]
+
+        result = []
+        for key, row in sorted(merged.items()) if tree is not None else merged.items():
+            sketch = sketches.get(key, {})
+            group = dict(zip(group_by, key))
+            group['vacancies'] = row['vacancies']
+            for field in ('from', 'to'):
+                count = row[f'salary_{field}_count']
+                group[f'salary_{field}_count'] = count
+                group[f'salary_{field}_avg'] = round(row[f'salary_{field}_sum'] / count) if count else None
+                group[f'salary_{field}_quantiles'] = sketch_quantiles(sketch.get(field, {}), quantiles)
+            result.append(group)
+        return result
+
+    def backfill(self) -> Dict[str, int]:
+        """Пересобирает сводки из vacancies_current"""
+        return self.db.rebuild_rollups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сводки зарплат и спроса')
+    parser.add_argument('--backfill', action='store_true', help='Пересобрать сводки из текущих версий вакансий')
+    parser.add_argument('--since', type=date.fromisoformat, help='День публикации не раньше (ISO)')
+    parser.add_argument('--until', type=date.fromisoformat, help='День публикации не позже (ISO)')
+    parser.add_argument('--area', type=int, help='Регион вместе с вложенными')
+    parser.add_argument('--exact-area', action='store_true', help='Только сам регион --area, без вложенных')
+    parser.add_argument('--area-depth', type=int, help='Свернуть группы area_id до предка на этой глубине')
+    parser.add_argument('--role', type=int)
+    parser.add_argument('--experience')
+    parser.add_argument('--currency', default='RUR')
+    parser.add_argument('--group-by', nargs='*', default=[], choices=ROLLUP_DIMENSIONS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, LOG_CONFIG['level']), format=LOG_CONFIG['format'])
+
+    from database import Database
+    with Database() as db:
+        rollups = SalaryRollups(db)
+        if args.backfill:
+            rollups.backfill()
+            return
+        rows = rollups.summary(
+            args.group_by,
+            date_from=args.since,
+            date_to=args.until,
+            area_id=args.area,
+            professional_role_id=args.role,
+            experience_id=args.experience,
+            currency=args.currency,
+            include_subareas=not args.exact_area,
+            area_depth=args.area_depth
+        )
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Планировщик сохранённых поисков из файла заданий.
+
+    python src/scheduler.py                  # выполнить задания, которым пора обновиться
+    python src/scheduler.py --force          # выполнить все задания
+    python src/scheduler.py --list           # показать задания и время следующего запуска
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import metrics
+from config import METRICS_CONFIG
+from crawl import CRAWL_LOCK, configure_logging, create_parser, parse_vacancies
+from database import Database
+from dedup import SeenVacancies
+from jobs import CrawlJob, load_jobs
+from parser import HHParser
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlScheduler:
+    """Выполняет задания в одном процессе по приоритету.
+
+    Все задания используют один парсер (общие HTTP-сессия и token bucket,
+    то есть единый бюджет запросов к API) и одно множество вакансий запуска:
+    вакансия, найденная несколькими поисками, записывается один раз.
+    """
+
+    def __init__(self, db: Database, jobs: List[CrawlJob], parser: Optional[HHParser] = None):
+        self.db = db
+        self.jobs = sorted(jobs, key=lambda job: -job.priority)
+        self.parser = parser or create_parser()
+
+    def next_run_at(self, job: CrawlJob, states: Dict[str, Dict]) -> Optional[datetime]:
+        """Время следующего запуска задания (None - ещё не запускалось)"""
+        state = states.get(job.name)
+        if not state or not state.get('last_started_at'):
+            return None
+        # Остановленное задание продолжается в следующем цикле, не дожидаясь интервала
+        if state.get('last_status') == 'stopped':
+            return None
+        return state['last_started_at'] + timedelta(minutes=job.interval_minutes)
+
+    def due_jobs(self, now: Optional[datetime] = None) -> List[CrawlJob]:
+        now = now or datetime.now()
+        states = self.db.get_job_states()
+        due = []
+        for job in self.jobs:
+            next_run = self.next_run_at(job, states)
+            if next_run is None or next_run <= now:
+                due.append(job)
+        return due
+
+    def run_once(self, force: bool = False, resume: bool = False) -> Dict[str, Dict]:
+        """Выполняет задания, которым пора обновиться (или все при force)"""
+        jobs = self.jobs if force else self.due_jobs()
+        if not jobs:
+            logger.info("Нет заданий, которым пора обновиться")
+            return {}
+
+        seen = SeenVacancies()
+        results = {}
+        for job in jobs:
+            if self.parser.stop_event.is_set():
+                logger.info("Планировщик остановлен, оставшиеся задания пропущены")
+                break
+            started_at = datetime.now()
+            # Каждое задание - отдельный запуск со своим parsed_at
+            self.parser.parsed_at = started_at
+            self.db.update_job_state(job.name, started_at)
+            try:
+                stats = parse_vacancies(self.db, self.parser, resume, job, seen)
+                status = 'failed' if stats.get('errors') else 'stopped' if stats.get('stopped') else 'finished'
+            except Exception as e:
+                logger.error(f"Ошибка задания {job.name}: {e}", exc_info=True)
+                stats = {'error': str(e)}
+                status = 'failed'
+            self.db.update_job_state(job.name, started_at, datetime.now(), status, stats)
+            results[job.name] = {'status': status, **stats}
+
+        logger.info(
+            f"Выполнено заданий: {len(results)}, уникальных вакансий: {len(seen)}, "
+            f"повторов между поисками: {seen.duplicates}"
+        )
+        return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Планировщик поисков HH.ru')
+    arg_parser.add_argument('--jobs', help='Файл заданий (по умолчанию SCHEDULER_CONFIG)')
+    arg_parser.add_argument('--force', action='store_true', help='Выполнить все задания')
+    arg_parser.add_argument('--resume', action='store_true', help='Продолжить прерванные запуски заданий')
+    arg_parser.add_argument('--list', action='store_true', help='Показать задания и выйти')
+    args = arg_parser.parse_args()
+
+    configure_logging()
+    jobs = load_jobs(args.jobs)
+    metrics.start_http_server(METRICS_CONFIG['port'], METRICS_CONFIG['host'])
+    try:
+        with Database() as db, db.advisory_lock(CRAWL_LOCK) as acquired:
+            scheduler = CrawlScheduler(db, jobs)
+            if args.list:
+                states = db.get_job_states()
+                for job in scheduler.jobs:
+                    next_run = scheduler.next_run_at(job, states)
+                    print(f"{job.priority:>4}  {job.name:30} каждые {job.interval_minutes} мин, "
+                          f"следующий запуск: {next_run or 'сейчас'}")
+                return 0
+            if not acquired:
+                logger.warning("Предыдущий запуск ещё выполняется, выход")
+                return 0
+            db.warm_employer_cache()
+            scheduler.run_once(force=args.force, resume=args.resume)
+            db.apply_retention()
+    except Exception as e:
+        logger.critical(f"Критическая ошибка: {e}", exc_info=True)
+        return 1
+    finally:
+        logger.info(f"Итоговые метрики: {metrics.REGISTRY.summary()}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
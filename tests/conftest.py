@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from benchmarks.synthetic import SyntheticVacancies, load_fixture  # noqa: E402
+from config import HH_API_CONFIG  # noqa: E402
+from parser import HHParser  # noqa: E402
+
+
+class FixtureParser(HHParser):
+    """Парсер, отвечающий на запросы справочников записанными ответами benchmarks/fixtures"""
+
+    FIXTURES = {
+        '/areas': 'areas',
+        HH_API_CONFIG['professional_roles_endpoint']: 'professional_roles',
+    }
+
+    def _make_request(self, endpoint, params=None, allow_missing=False):
+        return load_fixture(self.FIXTURES[endpoint])
+
+
+@pytest.fixture
+def parser():
+    return FixtureParser()
+
+
+@pytest.fixture
+def synthetic():
+    return SyntheticVacancies(200, employers=20)
+
+
+@pytest.fixture
+def vacancy_items(synthetic):
+    """Синтетические вакансии и их варианты без необязательных полей"""
+    items = synthetic.items(0, 50)
+    for index, item in enumerate(synthetic.items(50, 10)):
+        for key in ('salary', 'salary_range', 'address', 'snippet', 'work_format')[index % 5:]:
+            item.pop(key, None)
+        items.append(item)
+    return items
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Database на пустой схеме отдельной тестовой БД TEST_DB_NAME.
+
+    Схема пересоздаётся для каждого теста, поэтому рабочая БД (DB_NAME) не
+    используется; без TEST_DB_NAME тесты с БД пропускаются.
+    """
+    name = os.getenv('TEST_DB_NAME')
+    if not name:
+        pytest.skip('TEST_DB_NAME не задан')
+    from config import DB_CONFIG, DB_SCHEMA, SCHEMA_FILE
+    from database import Database
+
+    monkeypatch.setitem(DB_CONFIG, 'dbname', name)
+    database = Database()
+    database.connect()
+    with database.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {DB_SCHEMA} CASCADE; CREATE SCHEMA {DB_SCHEMA}")
+        conn.commit()
+    database.execute_script(SCHEMA_FILE)
+    yield database
+    database.disconnect()
+
+
+@pytest.fixture
+def reference_db(db, parser):
+    """Тестовая БД со справочниками регионов и ролей"""
+    db.upsert_areas(parser.fetch_areas())
+    db.rebuild_area_closure()
+    db.upsert_professional_roles(*parser.fetch_professional_roles())
+    return db
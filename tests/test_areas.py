@@ -0,0 +1,50 @@
+import random
+
+from areas import AreaTree
+
+
+def walked_closure(parents):
+    """Замыкание подъёмом по parent_id, без интервалов обхода"""
+    rows = set()
+    for area_id in parents:
+        node, distance = area_id, 0
+        while node is not None:
+            rows.add((node, area_id, distance))
+            node, distance = parents.get(node), distance + 1
+    return rows
+
+
+def test_intervals_agree_with_closure_rows(parser):
+    areas = parser.fetch_areas()
+    # Регион с неизвестным родителем становится корнем
+    areas.append({'id': 999999, 'parent_id': 888888})
+    tree = AreaTree(areas)
+    parents = {area_id: (parent if parent in tree.parents else None) for area_id, parent in tree.parents.items()}
+    closure = walked_closure(parents)
+
+    assert set(tree.closure_rows()) == closure
+    assert 999999 in tree.roots()
+
+    descendants = {}
+    for ancestor_id, area_id, distance in closure:
+        descendants.setdefault(ancestor_id, set()).add(area_id)
+        assert tree.ancestor_at(area_id, tree.depth(area_id) - distance) == ancestor_id
+    for area_id in tree.parents:
+        assert set(tree.descendants(area_id)) == descendants[area_id]
+        assert tree.subtree_size(area_id) == len(descendants[area_id])
+
+    rng = random.Random(5)
+    ids = list(tree.parents)
+    for _ in range(5000):
+        ancestor_id, area_id = rng.choice(ids), rng.choice(ids)
+        assert tree.is_ancestor(ancestor_id, area_id) == (area_id in descendants[ancestor_id])
+
+
+def test_area_closure_table_matches_tree(reference_db):
+    with reference_db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT ancestor_id, descendant_id, depth FROM area_closure")
+            stored = set(cur.fetchall())
+
+    assert stored == set(reference_db.get_area_tree().closure_rows())
+    assert len(stored) > len(reference_db.get_area_tree())
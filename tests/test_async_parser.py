@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+import crawl
+from async_parser import AsyncHHParser
+from benchmarks.synthetic import SyntheticVacancies
+from config import PARSER_CONFIG, PIPELINE_CONFIG
+from rate_limiter import TokenBucket
+
+PER_PAGE = 20
+
+
+class GrowingParser(AsyncHHParser):
+    """Первая страница видит 40 вакансий, следующие - уже 80 (выдача выросла)"""
+
+    def __init__(self, synthetic, found=None, **kwargs):
+        super().__init__(rate_limiter=TokenBucket(1e9, 1e9), **kwargs)
+        self.synthetic = synthetic
+        self.fixed_found = found
+        self.requested = []
+
+    async def fetch_vacancies_async(self, page=0, search=None):
+        self.requested.append(page)
+        found = self.fixed_found or (40 if page == 0 else 80)
+        return self.synthetic.page(0, page, PER_PAGE, found)
+
+
+def test_async_crawl_reads_pages_added_during_crawl(synthetic):
+    pages = list(GrowingParser(synthetic).iter_pages())
+
+    assert sorted(page for _, page, _, _ in pages) == [0, 1, 2, 3]
+
+
+def test_sync_adapter_stops_producer_when_consumer_leaves():
+    parser = GrowingParser(SyntheticVacancies(2000, employers=20), found=2000, concurrency=1)
+    pages = parser.iter_pages()
+    next(pages)
+    closer = threading.Thread(target=pages.close, daemon=True)
+    closer.start()
+    closer.join(timeout=10)
+
+    assert not closer.is_alive(), 'синхронный адаптер завис после остановки потребителя'
+    assert len(parser.requested) < 100
+
+
+def test_async_mode_is_rejected_with_pipeline(monkeypatch):
+    monkeypatch.setitem(PARSER_CONFIG, 'mode', 'async')
+    monkeypatch.setitem(PIPELINE_CONFIG, 'enabled', True)
+
+    with pytest.raises(ValueError):
+        crawl.create_parser()
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from columnar import normalize_page
+from parser import HHParser
+
+PARSED_AT = datetime(2026, 10, 17, 12, 0)
+
+
+def test_columnar_page_matches_normalize_vacancy(vacancy_items):
+    parser = HHParser(decoder='dict')
+    parser.parsed_at = PARSED_AT
+    items = vacancy_items
+    batch = normalize_page(items, PARSED_AT)
+
+    assert len(batch) == len(items)
+    for item, record in zip(items, batch):
+        expected = parser.normalize_vacancy(item)
+        assert record.vacancy._asdict() == expected['vacancy']
+        assert record.employer._asdict() == expected['employer']
+        assert record.professional_roles == expected['professional_roles']
+        assert record.content_hash == expected['content_hash']
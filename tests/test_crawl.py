@@ -0,0 +1,55 @@
+import importlib
+import logging
+import os
+from datetime import datetime
+
+import pytest
+
+from config import LOG_CONFIG
+from crawl import is_full_crawl, parse_vacancies
+from parser import HHParser, search_key
+from rate_limiter import CircuitOpenError
+
+WINDOWS = [
+    {'area': ['1'], 'date_from': '2026-09-17T00:00:00+03:00', 'date_to': '2026-10-02T00:00:00+03:00'},
+    {'area': ['1'], 'date_from': '2026-10-02T00:00:00+03:00', 'date_to': '2026-10-17T00:00:00+03:00'},
+]
+
+
+def test_entry_point_modules_do_not_configure_logging_on_import():
+    for name in ('crawl', 'scheduler', 'daemon', 'main'):
+        importlib.import_module(name)
+    log_file = os.path.abspath(LOG_CONFIG['file'])
+    assert not any(getattr(handler, 'baseFilename', None) == log_file
+                   for handler in logging.getLogger().handlers)
+
+
+def test_planner_date_windows_still_make_a_full_crawl():
+    parser = HHParser()
+    for window in WINDOWS:
+        parser.found[search_key(window)] = 1500
+
+    assert is_full_crawl(parser, WINDOWS)
+    assert not is_full_crawl(parser, WINDOWS, incremental=True)
+
+
+def test_resumed_run_keeps_incremental_flag(db):
+    db.start_run(datetime(2026, 10, 17, 12, 0), WINDOWS, job_name='moscow', incremental=True)
+    assert db.find_resumable_run('moscow')['incremental'] is True
+
+
+def test_pages_fetched_before_circuit_opens_are_written(reference_db, synthetic):
+    class BrokenParser(HHParser):
+        def iter_pages(self, searches=None, committed=None, seen=None):
+            yield None, 0, 2, self.normalize_page(synthetic.items(0, 20), seen)
+            raise CircuitOpenError('API недоступен')
+
+    with pytest.raises(CircuitOpenError):
+        parse_vacancies(reference_db, BrokenParser())
+
+    run = reference_db.find_resumable_run()
+    assert run['committed'][search_key(None)]['done'] == {0}
+    with reference_db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM vacancies_current")
+            assert cur.fetchone()[0] == 20
@@ -0,0 +1,38 @@
+import random
+
+from dedup import SeenVacancies
+
+
+def test_repeats_are_tracked_per_run():
+    seen = SeenVacancies()
+    assert [seen.add(vacancy_id) for vacancy_id in (1, 2)] == [True, True]
+
+    seen.track_repeats()
+    assert seen.add(2) is False
+    assert seen.add(3) is True
+    assert list(seen.take_repeats()) == [2]
+
+    # После take_repeats повторы больше не запоминаются
+    assert seen.add(3) is False
+    assert list(seen.take_repeats()) == []
+    assert seen.duplicates == 2
+
+
+def test_discard_matches_plain_set():
+    rng = random.Random(7)
+    seen = SeenVacancies()
+    seen.MIN_BUFFER = 8
+    expected = set()
+    for _ in range(5000):
+        vacancy_id = rng.randrange(500)
+        if rng.random() < 0.2:
+            batch = [vacancy_id, rng.randrange(500)]
+            seen.discard(batch)
+            expected.difference_update(batch)
+        else:
+            assert seen.add(vacancy_id) is (vacancy_id not in expected)
+            expected.add(vacancy_id)
+        assert len(seen) == len(expected)
+
+    assert [vacancy_id in seen for vacancy_id in range(500)] == [vacancy_id in expected for vacancy_id in range(500)]
+    assert seen.count(range(500)) == len(expected)
@@ -0,0 +1,73 @@
+import math
+
+from config import HH_API_CONFIG
+from parser import HHParser
+
+PER_PAGE = HH_API_CONFIG['per_page']
+
+
+class ShiftingParser(HHParser):
+    """Выдача из списка id, который меняется после первой выдачи страницы shift_after"""
+
+    def __init__(self, ids, shift_after, shift):
+        super().__init__()
+        self.ids = list(ids)
+        self.shift_after = shift_after
+        self.shift = shift
+        self.requests = []
+
+    def fetch_vacancies(self, page=0, search=None):
+        self.requests.append(page)
+        items = [{'id': str(vacancy_id)} for vacancy_id in self.ids[page * PER_PAGE:(page + 1) * PER_PAGE]]
+        data = {'items': items, 'found': len(self.ids), 'pages': math.ceil(len(self.ids) / PER_PAGE)}
+        if page == self.shift_after and self.shift:
+            self.shift(self.ids)
+            self.shift = None
+        return data
+
+
+def crawl(parser):
+    """Обходит поиск постранично, как HHParser._parse_search"""
+    collected = []
+    page, pages = 0, 1
+    while page < pages:
+        data = parser.fetch_page(page)
+        collected.extend(int(item['id']) for item in data['items'])
+        pages = max(pages, data['pages'])
+        page += 1
+    return collected
+
+
+def test_vacancies_shifted_to_fetched_pages_are_recovered():
+    ids = list(range(1, 1001))
+    removed = ids[10:40]
+
+    def close_vacancies(current):
+        # Закрытые вакансии с первой страницы сдвигают выдачу вверх
+        for vacancy_id in removed:
+            current.remove(vacancy_id)
+
+    parser = ShiftingParser(ids, shift_after=3, shift=close_vacancies)
+    collected = crawl(parser)
+
+    expected = set(ids) - set(removed)
+    assert expected <= set(collected)
+    assert parser.drift['recovered'] == len(removed)
+    assert parser.drift['lost'] == 0
+    # Перечитана только страница перед сдвинутой
+    assert parser.drift['refetches'] == 1
+
+
+def test_new_vacancies_shift_down_without_refetch():
+    ids = list(range(1, 1001))
+
+    def publish_vacancies(current):
+        current[:0] = range(2001, 2031)
+
+    parser = ShiftingParser(ids, shift_after=3, shift=publish_vacancies)
+    collected = crawl(parser)
+
+    assert set(ids) <= set(collected)
+    assert parser.drift['overlap'] == 30
+    assert parser.drift['refetches'] == 0
+    assert parser.drift['lost'] == 0
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from config import INGEST_CONFIG
+from database import EMPLOYER_COLUMNS
+from employer_cache import EmployerCache
+from parser import HHParser
+
+FIRST_SEEN = datetime(2026, 10, 1, 12, 0)
+
+
+def snapshot(parser: HHParser, item, parsed_at: datetime):
+    parser.parsed_at = parsed_at
+    return parser.normalize_vacancy(item)
+
+
+def history(db, vacancy_id):
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT parsed_at FROM vacancies WHERE id = %s ORDER BY parsed_at", (vacancy_id,))
+            return [row[0] for row in cur.fetchall()]
+
+
+def test_changed_snapshot_is_kept_next_to_unchanged_one(reference_db, parser, synthetic):
+    item = synthetic.item(0)
+    vacancy_id = int(item['id'])
+    reference_db.ingest_batch([snapshot(parser, item, FIRST_SEEN)])
+
+    changed = synthetic.item(0)
+    changed['name'] = f"{changed['name']} (удалённо)"
+    stats = reference_db.ingest_batch([
+        snapshot(parser, item, FIRST_SEEN + timedelta(days=1)),
+        snapshot(parser, changed, FIRST_SEEN + timedelta(days=2)),
+    ])
+
+    assert stats['vacancies_unchanged'] == 1
+    assert stats['vacancies_inserted'] == 1
+    assert history(reference_db, vacancy_id) == [FIRST_SEEN, FIRST_SEEN + timedelta(days=2)]
+
+
+def table_rows(db, query):
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query)
+            return sorted(cur.fetchall(), key=repr)
+
+
+def stored_rows(db):
+    return {
+        'vacancies': table_rows(db, "SELECT * FROM vacancies"),
+        'roles': table_rows(db, "SELECT * FROM vacancy_professional_roles"),
+        'employers': table_rows(db, """
+            SELECT id, name, url, alternate_url, logo_original, logo_90, logo_240,
+                   vacancies_url, country_id, accredited_it_employer, trusted
+            FROM employers
+        """),
+    }
+
+
+def test_batch_ingest_stores_same_rows_as_row_upserts(reference_db, parser, synthetic):
+    records = [snapshot(parser, item, FIRST_SEEN) for item in synthetic.items(0, 50)]
+    for record in records:
+        reference_db.upsert_employer(record['employer'])
+        reference_db.upsert_vacancy(record['vacancy'], record['professional_roles'])
+    expected = stored_rows(reference_db)
+    assert expected['roles'] and len(expected['employers']) == 20
+
+    with reference_db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE vacancies, vacancy_professional_roles, employers CASCADE")
+        conn.commit()
+    reference_db.employer_cache = EmployerCache(EMPLOYER_COLUMNS, INGEST_CONFIG['employer_cache_size'])
+    stats = reference_db.ingest_batch(records)
+
+    assert stats['vacancies_inserted'] == 50
+    assert stored_rows(reference_db) == expected
+
+
+def test_unchanged_snapshot_only_marks_vacancy_seen(reference_db, parser, synthetic):
+    items = synthetic.items(0, 10)
+    reference_db.ingest_batch([snapshot(parser, item, FIRST_SEEN) for item in items])
+    later = FIRST_SEEN + timedelta(days=1)
+    stats = reference_db.ingest_batch([snapshot(parser, item, later) for item in items])
+
+    assert stats['vacancies_unchanged'] == 10
+    assert stats['vacancies_inserted'] == 0
+    assert stats['roles_inserted'] == 0
+    for item in items:
+        assert history(reference_db, int(item['id'])) == [FIRST_SEEN]
+    assert table_rows(reference_db, """
+        SELECT DISTINCT last_changed_at, last_seen_at, seen_count FROM vacancy_content_hashes
+    """) == [(FIRST_SEEN, later, 2)]
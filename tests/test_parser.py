@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_server import StubHHServer
+from parser import HHParser
+from rate_limiter import TokenBucket
+
+
+def test_sessions_outlive_worker_threads():
+    parser = HHParser(rate_limiter=TokenBucket(1e9, 1e9))
+    with StubHHServer(total=2000) as stub:
+        parser.base_url = stub.url
+        # Каждый цикл демона создаёт новый пул потоков загрузки
+        for _ in range(3):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                pages = list(executor.map(parser.fetch_page, [0, 1] * 4))
+            assert all(page['items'] for page in pages)
+
+        assert 1 <= len(parser._sessions) <= 4
+        sessions = list(parser._sessions)
+        parser.close()
+
+    assert not parser._sessions
+    assert all(not adapter.poolmanager.pools for session in sessions for adapter in session.adapters.values())
@@ -0,0 +1,31 @@
+import threading
+
+from parser import HHParser
+from pipeline import PipelineRunner
+
+
+class StubParser(HHParser):
+    """Пять страниц по одной вакансии без id: нормализация каждой падает"""
+
+    def fetch_page(self, page, search=None):
+        return {'items': [{'name': f'broken {page}'}], 'found': 5, 'pages': 5}
+
+
+class StubDB:
+    def ingest_batch(self, batch, watermark=None, checkpoint=None):
+        raise AssertionError('битые страницы не записываются')
+
+    def pool_stats(self):
+        return {}
+
+
+def test_malformed_pages_are_counted_as_errors():
+    runner = PipelineRunner(StubDB(), StubParser(), fetchers=1, normalizers=1, writers=1, queue_size=1)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(runner.run()), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive(), 'конвейер завис после ошибки нормализации'
+    assert result['stages']['normalize']['errors'] == 5
+    assert result['errors'] == 5
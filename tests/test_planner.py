@@ -0,0 +1,89 @@
+import random
+from datetime import datetime, timedelta
+
+from planner import SEARCH_DEPTH_LIMIT, PartitionPlanner
+
+START = datetime(2025, 1, 1).astimezone()
+
+
+def make_vacancies(seed: int = 1, areas=('1', '2', '1', '2', '113')):
+    """Вакансии (id, регион, роли, время): часть привязана к самому региону 113,
+    часть - с несколькими ролями или без роли"""
+    rng = random.Random(seed)
+    vacancies = []
+    for vacancy_id in range(7000):
+        area = rng.choice(areas)
+        roles = rng.choice([{'10'}, {'20'}, {'10', '20'}, {'10', '20'}, set()])
+        published = START + timedelta(seconds=rng.randrange(30 * 86400))
+        vacancies.append((vacancy_id, area, roles, published))
+    return vacancies
+
+
+class StubPlanner(PartitionPlanner):
+    def __init__(self, vacancies):
+        super().__init__(parser=object())
+        self.vacancies = vacancies
+        self._children = {'113': ['1', '2']}
+
+    def matches(self, search):
+        # Регион в поиске включает и свои дочерние регионы
+        areas = {str(area) for area in search['area']}
+        for area in list(areas):
+            areas.update(self._children.get(area, []))
+        date_from = datetime.fromisoformat(search['date_from'])
+        date_to = datetime.fromisoformat(search['date_to'])
+        return {
+            vacancy_id for vacancy_id, area, roles, published in self.vacancies
+            if area in areas
+            and (not search.get('professional_role') or search['professional_role'] in roles)
+            and date_from <= published <= date_to
+        }
+
+    def probe(self, search):
+        self.probes += 1
+        return len(self.matches(search))
+
+
+def plan_covers_all(vacancies, area):
+    planner = StubPlanner(vacancies)
+    root = {
+        'area': [area],
+        'date_from': START.isoformat(timespec='seconds'),
+        'date_to': (START + timedelta(days=30)).isoformat(timespec='seconds'),
+    }
+    leaves = []
+    planner._plan_slice(root, planner.probe(root), leaves)
+
+    covered = set()
+    for leaf in leaves:
+        assert leaf['found'] <= SEARCH_DEPTH_LIMIT
+        covered |= planner.matches(leaf['search'])
+    return covered == {vacancy[0] for vacancy in vacancies}
+
+
+def test_plan_covers_vacancies_outside_child_areas():
+    assert plan_covers_all(make_vacancies(), '113')
+
+
+def test_plan_covers_vacancies_with_several_roles_or_none():
+    # Вакансии с двумя ролями считаются в обоих срезах по ролям, и сумма их found
+    # больше found региона, хотя вакансии без роли не попадают ни в один
+    assert plan_covers_all(make_vacancies(areas=('1',)), '1')
+
+
+class FoundParser:
+    def __init__(self, found):
+        self.found = found
+        self.searches = []
+
+    def fetch_found(self, search=None):
+        self.searches.append(search)
+        return self.found
+
+
+def test_plan_probes_through_fetch_found():
+    parser = FoundParser(SEARCH_DEPTH_LIMIT)
+    plan = PartitionPlanner(parser).plan({'area': ['1']})
+
+    assert parser.searches == [{'area': ['1']}]
+    assert PartitionPlanner.searches(plan) == [{'area': ['1']}]
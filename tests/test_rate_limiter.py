@@ -0,0 +1,45 @@
+import pytest
+
+from rate_limiter import AdaptiveRateController, CircuitOpenError
+
+
+def open_circuit(open_seconds):
+    controller = AdaptiveRateController(10, failure_threshold=1, open_seconds=open_seconds)
+    controller.record(None, 0.1)
+    assert controller.circuit == 'open'
+    return controller
+
+
+def test_half_open_lets_through_a_single_probe(monkeypatch):
+    controller = open_circuit(open_seconds=30)
+    clock = [controller._opened_at + 31]
+    monkeypatch.setattr('rate_limiter.time.monotonic', lambda: clock[0])
+
+    controller.check()
+    assert controller.circuit == 'half_open'
+    with pytest.raises(CircuitOpenError):
+        controller.check()
+
+    controller.record(200, 0.1)
+    assert controller.circuit == 'closed'
+    controller.check()
+
+
+def test_failed_probe_reopens_and_lost_probe_expires(monkeypatch):
+    controller = open_circuit(open_seconds=30)
+    clock = [controller._opened_at + 31]
+    monkeypatch.setattr('rate_limiter.time.monotonic', lambda: clock[0])
+
+    controller.check()
+    controller.record(None, 0.1)
+    assert controller.circuit == 'open'
+    with pytest.raises(CircuitOpenError):
+        controller.check()
+
+    # Проверочный запрос без результата уступает место следующему
+    clock[0] += 31
+    controller.check()
+    clock[0] += 31
+    controller.check()
+    with pytest.raises(CircuitOpenError):
+        controller.check()
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from parser import HHParser, content_hash
+from records import decode_vacancy, record_hash
+
+PARSED_AT = datetime(2026, 10, 17, 12, 0)
+
+
+def test_record_hash_matches_content_hash(vacancy_items):
+    parser = HHParser(decoder='dict')
+    parser.parsed_at = PARSED_AT
+    for item in vacancy_items:
+        expected = parser.normalize_vacancy(item)
+        record = decode_vacancy(item, PARSED_AT)
+
+        assert record.vacancy._asdict() == expected['vacancy']
+        assert record_hash(record.vacancy, record.professional_roles) == content_hash(
+            expected['vacancy'], expected['professional_roles']
+        )
+        assert record.content_hash == expected['content_hash']
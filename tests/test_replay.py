@@ -0,0 +1,92 @@
+import json
+from datetime import datetime
+
+from archive import ArchiveReader, ResponseArchive, params_key
+from benchmarks.stub_server import StubHHServer
+from benchmarks.synthetic import load_fixture
+from config import HH_API_CONFIG
+from crawl import load_reference_data, parse_vacancies
+from parser import HHParser
+from rate_limiter import TokenBucket
+from replay import replay
+
+PARSED_AT = datetime(2026, 10, 1, 12, 0)
+
+
+def test_replay_rebuilds_reference_and_area_closure(tmp_path, db, synthetic):
+    with ResponseArchive(str(tmp_path)) as archive:
+        for endpoint, fixture in (('/areas', 'areas'), (HH_API_CONFIG['professional_roles_endpoint'], 'professional_roles')):
+            archive.append(endpoint, None, json.dumps(load_fixture(fixture)).encode('utf-8'), PARSED_AT)
+        page = synthetic.page(0, 0, HH_API_CONFIG['per_page'], 50)
+        archive.append(
+            HH_API_CONFIG['vacancies_endpoint'], {'page': 0, 'area': '113'},
+            json.dumps(page, ensure_ascii=False).encode('utf-8'), PARSED_AT
+        )
+
+    stats = replay(db, ArchiveReader(str(tmp_path)))
+
+    assert stats['inserted'] == 50
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM area_closure WHERE ancestor_id = 113")
+            assert cur.fetchone()[0] > 1
+    # Фильтр по стране включает вакансии вложенных регионов
+    rows, _ = db.query_rollups([], {'area_id': 113})
+    assert rows[0]['vacancies'] > 0
+
+
+def test_replay_parser_accepts_card_requests(tmp_path):
+    from replay import ReplayParser
+
+    # fetch_vacancy передаёт allow_missing, как и HHParser
+    assert ReplayParser(ArchiveReader(str(tmp_path))).fetch_vacancy(1) is None
+
+
+def test_archive_returns_appended_bodies_across_segments(tmp_path):
+    bodies = [
+        json.dumps({'page': page, 'name': f'Разработчик {page}'}, ensure_ascii=False).encode('utf-8')
+        for page in range(5)
+    ]
+    with ResponseArchive(str(tmp_path)) as archive:
+        # Каждая запись начинает новый сегмент
+        archive.segment_bytes = 1
+        for page, body in enumerate(bodies):
+            archive.append(HH_API_CONFIG['vacancies_endpoint'], {'page': page, 'area': ['1', '2']}, body, PARSED_AT)
+        archive.append('/areas', None, b'[]', PARSED_AT)
+
+    reader = ArchiveReader(str(tmp_path))
+    entries = reader.entries(HH_API_CONFIG['vacancies_endpoint'])
+
+    assert len({entry['segment'] for entry in entries}) == 5
+    assert [body for _, body in reader.stream(entries)] == bodies
+    assert [reader.read(entry) for entry in entries] == bodies
+    assert {entry['query_key'] for entry in entries} == {params_key({'area': ['1', '2']})}
+    assert entries[0]['parsed_at'] == PARSED_AT.isoformat()
+    assert reader.latest('/areas') == b'[]'
+
+
+def history_rows(db):
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM vacancies ORDER BY id, parsed_at")
+            vacancies = cur.fetchall()
+            cur.execute("SELECT * FROM vacancy_professional_roles ORDER BY 1, 4, 5")
+            return vacancies, cur.fetchall()
+
+
+def test_replayed_archive_reproduces_live_crawl(tmp_path, db):
+    with StubHHServer(total=300, per_search=300) as stub, ResponseArchive(str(tmp_path)) as archive:
+        parser = HHParser(rate_limiter=TokenBucket(1e9, 1e9), decoder='dict', archive=archive)
+        parser.base_url = stub.url
+        load_reference_data(db, parser)
+        report = parse_vacancies(db, parser)
+    crawled = history_rows(db)
+
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE vacancies, vacancy_professional_roles, vacancy_content_hashes, vacancies_current CASCADE")
+        conn.commit()
+    stats = replay(db, ArchiveReader(str(tmp_path)))
+
+    assert report['inserted'] == stats['inserted'] == 300
+    assert history_rows(db) == crawled
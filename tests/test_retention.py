@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from parser import HHParser
+
+FIRST_SEEN = datetime(2026, 10, 1, 12, 0)
+
+
+def current_ids(db):
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM vacancies_current WHERE closed_at IS NULL")
+            return {row[0] for row in cur.fetchall()}
+
+
+def test_purged_vacancy_returns_to_current_when_seen_unchanged(reference_db, parser: HHParser, synthetic):
+    item = synthetic.item(0)
+    vacancy_id = int(item['id'])
+    parser.parsed_at = FIRST_SEEN
+    reference_db.ingest_batch([parser.normalize_vacancy(item)])
+    with reference_db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE vacancies_current SET closed_at = %s WHERE id = %s", (datetime(2020, 1, 1), vacancy_id))
+        conn.commit()
+
+    reference_db.apply_retention(keep_months=12)
+    assert vacancy_id not in current_ids(reference_db)
+
+    parser.parsed_at = FIRST_SEEN + timedelta(days=1)
+    stats = reference_db.ingest_batch([parser.normalize_vacancy(item)])
+
+    assert stats['vacancies_unchanged'] == 0
+    assert vacancy_id in current_ids(reference_db)
@@ -0,0 +1,49 @@
+import math
+import random
+from collections import Counter
+from datetime import datetime
+
+from rollups import DEFAULT_QUANTILES, SKETCH_ALPHA, SalaryRollups, bucket_index, sketch_quantiles
+
+
+def exact_quantile(values, q):
+    """Квантиль того же ранга, что выбирает sketch_quantiles"""
+    values = sorted(values)
+    return values[math.floor(q * (len(values) - 1))]
+
+
+def assert_within_alpha(estimate, exact):
+    # round() в sketch_quantiles добавляет не больше половины рубля
+    assert abs(estimate - exact) <= SKETCH_ALPHA * exact + 0.5
+
+
+def test_sketch_quantiles_are_within_relative_accuracy():
+    rng = random.Random(3)
+    values = [round(rng.lognormvariate(11.5, 0.6)) for _ in range(20000)]
+    buckets = Counter(bucket_index(value) for value in values)
+    quantiles = (0.0, 0.01, *DEFAULT_QUANTILES, 0.99, 1.0)
+
+    estimates = sketch_quantiles(buckets, quantiles)
+
+    for q in quantiles:
+        assert_within_alpha(estimates[q], exact_quantile(values, q))
+    assert sketch_quantiles({}, (0.5,)) == {0.5: None}
+
+
+def test_stored_sketch_matches_ingested_salaries(reference_db, parser, synthetic):
+    parser.parsed_at = datetime(2026, 10, 1, 12, 0)
+    records = [parser.normalize_vacancy(item) for item in synthetic.items(0, 200)]
+    reference_db.ingest_batch(records)
+
+    role = Counter(role for record in records for role in record['professional_roles']).most_common(1)[0][0]
+    values = [
+        record['vacancy']['salary_from'] for record in records
+        if role in record['professional_roles']
+        and record['vacancy']['salary_currency'] == 'RUR' and record['vacancy']['salary_from']
+    ]
+    [group] = SalaryRollups(reference_db).summary(professional_role_id=role, currency='RUR')
+
+    assert len(values) > 20
+    assert group['salary_from_count'] == len(values)
+    for q, estimate in group['salary_from_quantiles'].items():
+        assert_within_alpha(estimate, exact_quantile(values, q))